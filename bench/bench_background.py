@@ -0,0 +1,65 @@
+""" Static heat source rejection by the background model.
+
+A lamp and a warm table edge stay put while a person walks across the
+field of view. Temperatures arrive one chess pattern subpage at a time.
+The blobs found with and without the foreground mask are counted:
+
+    MICROPYPATH=src micropython bench/bench_background.py
+"""
+
+import array
+import utime
+from background import BackgroundModel
+from blobs import BlobLabeler
+from mlx90640.image import ChessPattern
+from mlx90640.calibration import NUM_ROWS, NUM_COLS, IMAGE_SIZE
+from benchutil import lcg_words
+
+SUBPAGES = 60
+THRESHOLD = 30.0
+
+def render(frame, person_x, noise):
+    idx = 0
+    for row in range(NUM_ROWS):
+        for col in range(NUM_COLS):
+            v = 22.0 + ((next(noise) & 0xFF) - 128) / 512
+            if (row - 4)**2 + (col - 26)**2 <= 4:
+                v = 45.0        # lamp
+            elif row >= 22:
+                v = 31.0        # warm table edge
+            elif abs(col - person_x) <= 2 and 8 <= row <= 18:
+                v = 33.0        # person
+            frame[idx] = v
+            idx += 1
+
+if __name__ == "__main__":
+    model = BackgroundModel()
+    plain = BlobLabeler()
+    masked = BlobLabeler()
+    frame = array.array('f', (0.0 for _ in range(IMAGE_SIZE)))
+    noise = lcg_words((SUBPAGES + 8) * IMAGE_SIZE, 5)
+
+    # learn the empty room first
+    for n in range(8):
+        render(frame, -10, noise)
+        model.update(frame, ChessPattern.sp_range(n & 1))
+
+    elapsed = 0
+    plain_blobs = masked_blobs = on_person = 0
+    for n in range(SUBPAGES):
+        person_x = 3 + n * 26 // SUBPAGES
+        render(frame, person_x, noise)
+        start = utime.ticks_us()
+        model.update(frame, ChessPattern.sp_range(n & 1))
+        elapsed += utime.ticks_diff(utime.ticks_us(), start)
+
+        plain_blobs += plain.label(frame, THRESHOLD)
+        masked_blobs += masked.label(frame, THRESHOLD, model.mask)
+        k = masked.largest()
+        if k >= 0 and abs(masked.cx[k] - person_x) < 1.5:
+            on_person += 1
+
+    print(f"blobs per subpage without the mask: {plain_blobs / SUBPAGES:.2f}")
+    print(f"blobs per subpage with the mask:    {masked_blobs / SUBPAGES:.2f}")
+    print(f"largest masked blob on the person in {on_person} of {SUBPAGES} subpages")
+    print(f"update() takes {elapsed / SUBPAGES:.0f} us per subpage")
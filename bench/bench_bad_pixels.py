@@ -0,0 +1,91 @@
+""" Compare the old bad pixel interpolation with the precomputed repair map.
+
+The old loop checked every neighbour against range(IMAGE_SIZE) and scanned
+the tuple of bad pixels for each one, and its flat offsets wrapped from one
+row's edge to the next. Interior pixels must get the same values; pixels at
+the left and right edges no longer take values from the far side. A raw
+reading at the rail must give NaN, not a math domain error, and the repair
+map must replace it:
+
+    MICROPYPATH=src micropython bench/bench_bad_pixels.py
+"""
+
+from array import array
+from mlx90640 import MLX90640
+from mlx90640.image import RepairMap, ImageStats, PIX_DATA_ADDRESS
+from mlx90640.calibration import NUM_COLS, IMAGE_SIZE
+from benchutil import lcg_words, time_us, fake_camera
+
+REPEAT = 50
+STATUS_ADDRESS = 0x8000
+DATA_AVAILABLE = 0x0008
+
+# a cluster, pixels on the left and right edges and in the corners
+BAD_PIXELS = (0, 31, 100, 101, 133, 160, 223, 400, 767)
+
+_OLD_NEIGHBOURS = tuple(
+    row * NUM_COLS + col
+    for row in (-1, 0, 1)
+    for col in (-1, 0, 1)
+    if row != 0 or col != 0
+)
+
+def old_interpolate(buf, bad_pixels):
+    for bad_idx in bad_pixels:
+        count = 0
+        total = 0
+        for offset in _OLD_NEIGHBOURS:
+            idx = bad_idx + offset
+            if idx in range(IMAGE_SIZE) and idx not in bad_pixels:
+                count += 1
+                total += buf[idx]
+        if count > 0:
+            buf[bad_idx] = total/count
+
+def edge(idx):
+    return idx % NUM_COLS in (0, NUM_COLS - 1)
+
+def rail_temperatures(rail_idx, raw, extended):
+    # temperatures of a frame with one raw reading pinned at the rail
+    bus = fake_camera()
+    camera = MLX90640(bus, bus.addr)
+    camera.setup()
+    bus.mem[PIX_DATA_ADDRESS + rail_idx] = raw & 0xFFFF
+    temps = array('f', (0.0 for _ in range(IMAGE_SIZE)))
+    for sp_id in (0, 1):
+        bus.mem[STATUS_ADDRESS] = DATA_AVAILABLE | sp_id
+        camera.read_image(sp_id)
+        state = camera.read_state()
+        camera.process_image(sp_id, state)
+    return camera.image.calc_temperature_frame(state, temps, extended=extended)
+
+def check_rail(rail_idx=300):
+    for extended in (False, True):
+        temps = rail_temperatures(rail_idx, -32768, extended)
+        assert temps[rail_idx] != temps[rail_idx], "rail pixel is not NaN"
+        assert all(temps[idx] == temps[idx] for idx in range(IMAGE_SIZE)
+                   if idx != rail_idx), "NaN outside the rail pixel"
+        stats = ImageStats().update(temps)
+        assert stats.count == IMAGE_SIZE - 1
+        RepairMap((rail_idx,)).repair(temps)
+        assert temps[rail_idx] == temps[rail_idx], "rail pixel not repaired"
+    print(f"pixel {rail_idx} at the rail: NaN, skipped by ImageStats, repaired")
+
+if __name__ == "__main__":
+    frame = array('f', (20 + (w & 0xFF)/64 for w in lcg_words(IMAGE_SIZE, 3)))
+    old = array('f', frame)
+    new = array('f', frame)
+    old_interpolate(old, BAD_PIXELS)
+    repair_map = RepairMap(BAD_PIXELS)
+    repair_map.repair(new)
+
+    for idx in BAD_PIXELS:
+        if not edge(idx):
+            assert abs(old[idx] - new[idx]) < 1e-4, "interior repair differs"
+        print(f"pixel {idx:3d}: old {old[idx]:7.3f}  new {new[idx]:7.3f}"
+              f"{'  (edge)' if edge(idx) else ''}")
+
+    check_rail()
+
+    print(f"old loop        {time_us(old_interpolate, array('f', frame), BAD_PIXELS, repeat=REPEAT): 8.0f} us")
+    print(f"RepairMap       {time_us(repair_map.repair, new, repeat=REPEAT): 8.0f} us")
@@ -0,0 +1,129 @@
+""" Compare the BlobLabeler against the old mlx_cam.dfs blob search.
+
+Checks the labels against a simple 2-D flood fill on random scenes and
+that NaN and inf pixels are background, then times both on a frame with a
+few warm blobs:
+
+    MICROPYPATH=src micropython bench/bench_blobs.py
+
+mlx_cam needs machine.Pin and machine.I2C, which some ports lack; the dfs
+timing is skipped there.
+"""
+
+import array
+import utime
+from blobs import BlobLabeler
+from mlx90640.calibration import NUM_ROWS, NUM_COLS, IMAGE_SIZE
+from benchutil import lcg_words
+
+try:
+    from mlx_cam import dfs
+except ImportError:
+    dfs = None
+
+REPEAT = 20
+THRESHOLD = 30.0
+
+def blob_scene(seed=1):
+    # room temperature background with a few warm discs
+    frame = array.array('f', (20.0 + (w & 0xFF)/256 for w in lcg_words(IMAGE_SIZE, seed)))
+    for cx, cy, r in ((6, 5, 3), (20, 12, 4), (28, 20, 2)):
+        for row in range(NUM_ROWS):
+            for col in range(NUM_COLS):
+                if (row - cy)**2 + (col - cx)**2 <= r*r:
+                    frame[row*NUM_COLS + col] = 35.0
+    return frame
+
+def random_scene(seed):
+    return array.array('f', (40.0 if w & 3 == 0 else 20.0 for w in lcg_words(IMAGE_SIZE, seed)))
+
+def flood_fill(values, threshold, diagonal):
+    # reference: set of pixel sets, found by breadth-first flood fill
+    seen = set()
+    blobs = set()
+    for start in range(IMAGE_SIZE):
+        if start in seen or values[start] < threshold:
+            continue
+        blob = set()
+        todo = [start]
+        seen.add(start)
+        while todo:
+            idx = todo.pop()
+            blob.add(idx)
+            row, col = divmod(idx, NUM_COLS)
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    if (dr or dc) and (diagonal or not (dr and dc)):
+                        r, c = row + dr, col + dc
+                        n = r*NUM_COLS + c
+                        if 0 <= r < NUM_ROWS and 0 <= c < NUM_COLS and n not in seen and values[n] >= threshold:
+                            seen.add(n)
+                            todo.append(n)
+        blobs.add(frozenset(blob))
+    return blobs
+
+def labeled_blobs(labeler):
+    blobs = {}
+    for idx, lbl in enumerate(labeler.labels):
+        if lbl:
+            blobs.setdefault(lbl, set()).add(idx)
+    return set(frozenset(b) for b in blobs.values())
+
+def check(connectivity):
+    labeler = BlobLabeler(connectivity=connectivity, capacity=IMAGE_SIZE)
+    for seed in range(1, 6):
+        values = random_scene(seed)
+        labeler.label(values, THRESHOLD)
+        ref = flood_fill(values, THRESHOLD, connectivity == 8)
+        assert labeled_blobs(labeler) == ref, "labels differ from flood fill"
+        assert labeler.count == len(ref)
+        for k in range(labeler.count):
+            assert labeler.area[k] == sum(1 for lbl in labeler.labels if lbl == k + 1)
+
+def check_nonfinite():
+    # NaN at the first pixel of a blob in raster order, and NaN and inf on
+    # the background
+    frame = blob_scene()
+    top = 8*NUM_COLS + 20
+    frame[top] = float('nan')
+    frame[2*NUM_COLS + 15] = float('nan')
+    frame[22*NUM_COLS + 10] = float('inf')
+    labeler = BlobLabeler()
+    assert labeler.label(frame, THRESHOLD) == 3, "NaN or inf made a blob"
+    assert labeler.labels[top] == 0
+    for k in range(labeler.count):
+        assert labeler.peak[k] == 35.0, "NaN pixel spoiled a blob's peak"
+
+def run_dfs(frame):
+    data = array.array('B', (1 if v >= THRESHOLD else 0 for v in frame))
+    blobs = []
+    for i in range(IMAGE_SIZE):
+        if data[i]:
+            blobs.append(dfs(i, data))
+    return blobs
+
+def time_us(fun, *args):
+    start = utime.ticks_us()
+    for _ in range(REPEAT):
+        result = fun(*args)
+    return utime.ticks_diff(utime.ticks_us(), start) / REPEAT, result
+
+if __name__ == "__main__":
+    for connectivity in (4, 8):
+        check(connectivity)
+    print("labels match a 2-D flood fill (4 and 8 connectivity)")
+    check_nonfinite()
+    print("NaN and inf pixels are background")
+
+    frame = blob_scene()
+    labeler = BlobLabeler()
+    elapsed, count = time_us(labeler.label, frame, THRESHOLD)
+    print(f"BlobLabeler       {elapsed: 10.0f} us  {count} blobs")
+    for k in range(count):
+        print(
+            f"  blob {k}: area {labeler.area[k]:3d}  centroid ({labeler.cx[k]:5.2f}, {labeler.cy[k]:5.2f})"
+            f"  cols {labeler.min_col[k]}-{labeler.max_col[k]}  rows {labeler.min_row[k]}-{labeler.max_row[k]}"
+        )
+    if dfs is not None:
+        elapsed, blobs = time_us(run_dfs, frame)
+        print(f"mlx_cam.dfs       {elapsed: 10.0f} us  {len(blobs)} row runs (1-D only)")
@@ -0,0 +1,49 @@
+""" Measure camera start-up cost: per-register EEPROM reads, the EEPROM
+memory image, and a cold versus cached boot with the calibration cache.
+
+    MICROPYPATH=src micropython bench/bench_boot.py
+"""
+
+import os
+from mlx90640 import MLX90640
+from benchutil import fake_camera, time_us
+
+def boot(bus, **kwargs):
+    camera = MLX90640(bus, bus.addr)
+    camera.setup(**kwargs)
+    return camera
+
+def run(label, **kwargs):
+    bus = fake_camera()
+    elapsed = time_us(lambda: boot(bus, **kwargs))
+    print(f"{label:<20s}{bus.transactions: 8d}{bus.bytes_read: 8d}"
+          f"{bus.bus_time_us(): 10d}{elapsed / 1000: 10.1f}")
+    return bus
+
+CACHE_PATH = "bench_calib.bin"
+
+def same_calibration(a, b):
+    return all(
+        x == y for x, y in zip(a.get_arrays(), b.get_arrays())
+    )
+
+if __name__ == "__main__":
+    print("BOOT                  XFERS   BYTES  BUS (us)  CPU (ms)")
+    run("register reads", eeprom_image=False)
+    run("eeprom image", eeprom_image=True)
+
+    try:
+        os.remove(CACHE_PATH)
+    except OSError:
+        pass
+    run("cold (cache miss)", calib_cache=CACHE_PATH)
+    run("cached", calib_cache=CACHE_PATH)
+
+    cold = boot(fake_camera(), eeprom_image=True)
+    cached = boot(fake_camera(), calib_cache=CACHE_PATH)
+    assert same_calibration(cold.calib, cached.calib), "cached calibration differs"
+
+    # a different camera must not pick up the cache
+    other = boot(fake_camera(seed=7), calib_cache=CACHE_PATH)
+    assert not same_calibration(cold.calib, other.calib), "stale cache was used"
+    os.remove(CACHE_PATH)
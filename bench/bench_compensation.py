@@ -0,0 +1,73 @@
+""" Check and time the subpage compensation pass.
+
+Compares ProcessedImage.update() (scalar kernel, and the ulab/NumPy kernel
+when one is available) against the original per-pixel implementation. The
+kernels must agree with it within TOLERANCE relative error on every pixel.
+
+    MICROPYPATH=src micropython bench/bench_compensation.py
+"""
+
+from mlx90640 import MLX90640
+from mlx90640.image import (
+    ProcessedImage,
+    Subpage,
+    ChessPattern,
+    InterleavedPattern,
+)
+from mlx90640.calibration import NUM_COLS
+from benchutil import fake_camera, time_us
+
+TOLERANCE = 1e-5
+REPEAT = 10
+
+def reference_update(image, raw_image, subpage, state):
+    # ProcessedImage.update() before the compensation kernel, without tgc
+    calib = image.calib
+    for idx in subpage.sp_range():
+        raw = raw_image.pix[idx]
+        kta = calib.pix_kta[idx]
+        row, col = divmod(idx, NUM_COLS)
+        kv = calib.kv_avg[row % 2][col % 2]
+        offset = calib.pix_os_ref[idx]
+        offset *= (1 + kta*state.ta)*(1 + kv*state.vdd)
+        v_os = raw*state.gain - offset
+        if subpage.pattern is InterleavedPattern:
+            v_os += calib.il_offset[idx]
+        v_ir = v_os / calib.emissivity
+        image.v_ir[idx] = v_ir
+        alpha = calib.pix_alpha[idx]*(1 + calib.ksta*state.ta)
+        image.buf[idx] = v_ir/alpha
+
+def max_rel_error(ref, values):
+    return max(abs(a - b)/max(abs(a), 1e-12) for a, b in zip(ref, values))
+
+def run_frame(update, image, raw, subpages, state):
+    for subpage in subpages:
+        update(image, raw, subpage, state)
+
+if __name__ == "__main__":
+    bus = fake_camera()
+    camera = MLX90640(bus, bus.addr)
+    camera.setup()
+    state = camera.read_state()
+    raw = camera.raw
+    raw.read(camera.iface)
+
+    kernels = [("scalar", ProcessedImage(camera.calib))]
+    try:
+        kernels.append(("vector", ProcessedImage(camera.calib, vectorize=True)))
+    except ImportError:
+        print("no ulab or numpy, skipping vectorized kernel")
+
+    print(f"KERNEL              PATTERN              TIME (us)  MAX REL ERR  (tolerance {TOLERANCE})")
+    for pattern in (ChessPattern, InterleavedPattern):
+        subpages = (Subpage(pattern, 0), Subpage(pattern, 1))
+        ref = ProcessedImage(camera.calib)
+        elapsed = time_us(run_frame, reference_update, ref, raw, subpages, state, repeat=REPEAT)
+        print(f"{'reference':<20s}{pattern.__name__:<20s}{elapsed: 10.0f}")
+
+        for name, image in kernels:
+            elapsed = time_us(run_frame, ProcessedImage.update, image, raw, subpages, state, repeat=REPEAT)
+            error = max(max_rel_error(ref.v_ir, image.v_ir), max_rel_error(ref.buf, image.buf))
+            print(f"{name:<20s}{pattern.__name__:<20s}{elapsed: 10.0f}{error: 13.2e}")
+            assert error < TOLERANCE, f"{name} kernel outside tolerance"
@@ -0,0 +1,110 @@
+""" Latency of handing a new aim angle from the camera task to the yaw task.
+
+The camera task puts an angle into a share after processing each frame, and
+the yaw task picks it up. Polled, the yaw task only sees the angle at its
+next run time; subscribed to the share, it's made ready by put() and runs
+as soon as the camera task yields. The tasks run for ten minutes in virtual
+time:
+
+    MICROPYPATH=src micropython bench/bench_handoff.py
+
+The camera task steps its acquisition in short runs, as MLX_Cam.acquire()
+does, and a frame is ready every 247 ms, so the put() falls at any time
+relative to the yaw task's run times. The put() happens at the start of the
+camera task's last, short run for a frame; the latency counts from there to
+the yaw task's get(), so it includes the rest of that run.
+"""
+
+import cotask
+import task_share
+
+SECONDS = 600
+OVERHEAD_US = 40
+FRAME_US = 247000       # time between frames from the camera
+STEPS = 6               # processing runs per frame
+PUT_RUN_US = 200        # the rest of the run which puts the angle
+
+_seed = [405]
+
+def camera_us(task, state):
+    # polling the status register, a bounded processing step of 1.5 to 4 ms,
+    # or the end of the run which puts the angle
+    if state == 1:
+        return 300
+    if state == 3:
+        _seed[0] = (_seed[0] * 1103515245 + 12345) & 0x7FFFFFFF
+        return 1500 + (_seed[0] >> 8) % 2501
+    return PUT_RUN_US
+
+MODEL = {"Thermal Camera": camera_us, "Yaw Control": (250, 900)}
+
+def camera(shares):
+    angle, clock, stamp = shares
+    frames = 0
+    next_frame = clock.ticks_add(clock.ticks_us(), FRAME_US)
+    while True:
+        if clock.ticks_diff(clock.ticks_us(), next_frame) < 0:
+            yield 1
+            continue
+        next_frame = clock.ticks_add(next_frame, FRAME_US)
+        for _ in range(STEPS):
+            yield 3
+        # a new frame has been processed: aim somewhere else
+        frames += 1
+        stamp[0] = clock.ticks_us()
+        angle.put(frames % 90 + 1)
+        yield 4
+
+def yaw(shares):
+    angle, clock, stamp, stats = shares
+    last = 0
+    while True:
+        new = angle.get()
+        if new != last:
+            last = new
+            latency = clock.ticks_diff(clock.ticks_us(), stamp[0])
+            stats[0] += 1
+            stats[1] += latency
+            if latency > stats[2]:
+                stats[2] = latency
+        yield 3
+
+def run(yaw_period, subscribe):
+    _seed[0] = 405
+    clock = cotask.VirtualClock(MODEL, overhead_us=OVERHEAD_US, seed=405)
+    task_list = cotask.TaskList(clock)
+    angle = task_share.Share('f', thread_protect=False, name="Yaw Angle")
+    stamp = [0]
+    stats = [0, 0, 0]       # handoffs, total and longest latency
+    task_list.append(cotask.Task(camera, name="Thermal Camera", priority=2,
+                                 period=5, profile=True,
+                                 shares=(angle, clock, stamp)))
+    yaw_task = cotask.Task(yaw, name="Yaw Control", priority=4,
+                           period=yaw_period, profile=True,
+                           shares=(angle, clock, stamp, stats))
+    task_list.append(yaw_task)
+    if subscribe:
+        angle.subscribe(yaw_task)
+    while clock.elapsed < SECONDS * 1000000:
+        task_list.deadline_sched()
+    count, total, longest = stats
+    return count, total / count, longest, yaw_task._runs
+
+if __name__ == "__main__":
+    print("yaw task              handoffs  mean ms   max ms  yaw runs")
+    results = {}
+    for label, period, subscribe in (("polled, 100 ms", 100, False),
+                                     ("polled, 10 ms", 10, False),
+                                     ("subscribed, 100 ms", 100, True),
+                                     ("subscribed only", None, True)):
+        count, mean, longest, runs = results[label] = run(period, subscribe)
+        print(f"{label:<20s}{count: 10d}{mean / 1000: 9.2f}"
+              f"{longest / 1000: 9.2f}{runs: 10d}")
+
+    # Subscribed, the yaw task runs right after the camera task yields; polled,
+    # it waits for a run time, on average about half a period
+    for label in ("subscribed, 100 ms", "subscribed only"):
+        assert results[label][2] <= PUT_RUN_US + OVERHEAD_US, label
+    assert 2000 < results["polled, 10 ms"][1] < 10000
+    assert 20000 < results["polled, 100 ms"][1] < 100000
+    assert results["subscribed only"][3] < results["polled, 10 ms"][3] / 10
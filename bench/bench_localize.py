@@ -0,0 +1,70 @@
+""" Accuracy and run time of the sub-pixel hot spot localizer.
+
+Renders Gaussian hot spots at random sub-pixel positions on a noisy room
+temperature background and compares the position errors of the hottest
+pixel, the binary centroid of targeting.find_target(), the weighted
+centroid and the quadratic and Gaussian peak fits:
+
+    MICROPYPATH=src micropython bench/bench_localize.py
+"""
+
+import array
+import math
+import utime
+import targeting
+from blobs import BlobLabeler
+from localize import Localizer, QUADRATIC, GAUSSIAN, X, Y, MX, MY
+from mlx90640.calibration import NUM_ROWS, NUM_COLS, IMAGE_SIZE
+from benchutil import lcg_words
+
+SCENES = 50
+THRESHOLD = 26.0
+SIGMA = 1.2
+
+def scene(x, y, seed):
+    noise = lcg_words(IMAGE_SIZE, seed)
+    frame = array.array('f', (0.0 for _ in range(IMAGE_SIZE)))
+    idx = 0
+    for row in range(NUM_ROWS):
+        for col in range(NUM_COLS):
+            d2 = (col - x)**2 + (row - y)**2
+            frame[idx] = 22.0 + 12.0*math.exp(-d2/(2*SIGMA*SIGMA)) + (next(noise) & 0xFF)/1280
+            idx += 1
+    return frame
+
+if __name__ == "__main__":
+    labeler = BlobLabeler()
+    fits = (("quadratic", Localizer(fit=QUADRATIC)), ("gaussian", Localizer(fit=GAUSSIAN)))
+    target = targeting.new_result()
+    errors = {}
+    elapsed = 0
+    positions = lcg_words(2*SCENES, 7)
+    for n in range(SCENES):
+        x = 3 + (next(positions) % 2600)/100
+        y = 3 + (next(positions) % 1800)/100
+        frame = scene(x, y, n + 1)
+
+        labeler.label(frame, THRESHOLD)
+        k = labeler.hottest()
+        peak_idx = labeler.peak_idx[k]
+        targeting.find_target(frame, THRESHOLD, target)
+        estimates = [
+            ("hottest pixel", peak_idx % NUM_COLS, peak_idx // NUM_COLS),
+            ("binary centroid", target[targeting.CX], target[targeting.CY]),
+        ]
+        for name, localizer in fits:
+            start = utime.ticks_us()
+            localizer.locate(frame, peak_idx, THRESHOLD, labeler.labels, k + 1)
+            elapsed += utime.ticks_diff(utime.ticks_us(), start)
+            result = localizer.result
+            if name == "quadratic":
+                estimates.append(("weighted centroid", result[MX], result[MY]))
+            estimates.append((name + " fit", result[X], result[Y]))
+
+        for name, ex, ey in estimates:
+            errors[name] = errors.get(name, 0.0) + (ex - x)**2 + (ey - y)**2
+
+    print("ESTIMATE             RMS ERROR (pixels)")
+    for name, total in errors.items():
+        print(f"{name:<20s}{math.sqrt(total/SCENES): 10.3f}")
+    print(f"locate() takes {elapsed/(2*SCENES):.0f} us")
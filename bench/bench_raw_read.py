@@ -0,0 +1,51 @@
+""" Compare per-pixel and block reads of a subpage from pixel RAM.
+
+Runs on the MicroPython unix port against the counting FakeI2C bus:
+
+    MICROPYPATH=src micropython bench/bench_raw_read.py
+"""
+
+import utime
+from mlx90640.regmap import CameraInterface
+from fakebus import FakeI2C
+from mlx90640.image import (
+    RawImage,
+    ChessPattern,
+    InterleavedPattern,
+    PIX_DATA_ADDRESS,
+)
+from mlx90640.calibration import IMAGE_SIZE
+from benchutil import lcg_words
+
+REPEAT = 20
+
+def fill_ram(bus, seed=1):
+    bus.load(PIX_DATA_ADDRESS, lcg_words(IMAGE_SIZE, seed))
+
+def run(label, raw, pattern):
+    bus = FakeI2C()
+    fill_ram(bus)
+    iface = CameraInterface(bus, bus.addr)
+
+    start = utime.ticks_us()
+    for _ in range(REPEAT):
+        for sp_id in (0, 1):
+            raw.read(iface, pattern.sp_range(sp_id))
+    elapsed = utime.ticks_diff(utime.ticks_us(), start) / (REPEAT * 2)
+
+    subpages = REPEAT * 2
+    print(
+        f"{label:<28s}{bus.transactions // subpages: 8d}"
+        f"{bus.bytes_read // subpages: 8d}{bus.bus_time_us() // subpages: 10d}"
+        f"{elapsed: 12.0f}"
+    )
+    return raw.pix
+
+if __name__ == "__main__":
+    print("MODE                          XFERS   BYTES  BUS (us)  DECODE (us)   per subpage")
+    for pattern in (ChessPattern, InterleavedPattern):
+        name = pattern.__name__
+        ref = run(f"{name} per-pixel", RawImage(block_rows=0), pattern)
+        for rows in (1, 4, 24):
+            pix = run(f"{name} {rows} row(s)", RawImage(block_rows=rows), pattern)
+            assert pix == ref, "block read differs from per-pixel read"
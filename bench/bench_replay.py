@@ -0,0 +1,110 @@
+""" Record a synthetic scene, then replay it through the whole pipeline.
+
+A fake camera shows a warm spot crossing a room temperature scene; each
+subpage is read by MLX90640 and saved by the Recorder. The recording is
+then replayed through ReplayI2C twice, timing every stage from the I2C
+reads to the tracker, and the two replays must agree exactly:
+
+    MICROPYPATH=src micropython bench/bench_replay.py
+"""
+
+import os
+import utime
+from array import array
+from mlx90640 import MLX90640
+from mlx90640.recorder import Recorder, STATUS_ADDRESS
+from replay import ReplayI2C
+from mlx90640.image import PIX_DATA_ADDRESS, ChessPattern
+from mlx90640.calibration import NUM_COLS, IMAGE_SIZE
+from background import BackgroundModel
+from blobs import BlobLabeler
+from localize import Localizer
+from tracker import Tracker
+from benchutil import fake_camera, pixel_words
+
+PATH = "bench_replay.bin"
+SUBPAGES = 40
+SUBPAGE_US = 250000
+THRESHOLD = 30.0
+
+STAGES = ("read_image", "read_state", "process_image", "temperatures",
+          "background", "blobs", "localize", "tracker")
+
+def record(path):
+    bus = fake_camera()
+    camera = MLX90640(bus, bus.addr)
+    camera.set_pattern(ChessPattern)
+    camera.setup()
+    room = list(pixel_words())
+    with open(path, 'wb') as stream:
+        recorder = Recorder(camera, stream)
+        for n in range(SUBPAGES):
+            # a 3 x 3 spot of strong readings moving along row 12
+            col = 4 + n * 24 // SUBPAGES
+            bus.load(PIX_DATA_ADDRESS, room)
+            for row in (11, 12, 13):
+                bus.load(PIX_DATA_ADDRESS + row * NUM_COLS + col - 1, (1500, 1500, 1500))
+            bus.mem[STATUS_ADDRESS] = 0x0008 | (n & 1)
+            camera.read_image(n & 1)
+            camera.read_state()
+            recorder.record(camera, n * SUBPAGE_US)
+    return recorder.records
+
+def replay(path):
+    bus = ReplayI2C(path)
+    camera = MLX90640(bus, bus.addr)
+    camera.setup()
+    temps = array('f', (0.0 for _ in range(IMAGE_SIZE)))
+    model = BackgroundModel()
+    labeler = BlobLabeler()
+    localizer = Localizer()
+    tracker = Tracker()
+    times = [0] * len(STAGES)
+    track = []
+
+    while True:
+        t = [utime.ticks_us()]
+        sp_id = camera.poll()
+        if sp_id < 0:
+            break
+        camera.read_image(sp_id)
+        t.append(utime.ticks_us())
+        state = camera.read_state()
+        t.append(utime.ticks_us())
+        camera.process_image(sp_id, state)
+        t.append(utime.ticks_us())
+        camera.image.calc_temperature_frame(state, temps)
+        t.append(utime.ticks_us())
+        model.update(temps, camera.last_read.sp_range())
+        t.append(utime.ticks_us())
+        labeler.label(temps, THRESHOLD, model.mask)
+        t.append(utime.ticks_us())
+        k = labeler.hottest()
+        if k >= 0:
+            localizer.locate(temps, labeler.peak_idx[k], THRESHOLD, labeler.labels, k + 1)
+        t.append(utime.ticks_us())
+        tracker.update(bus.stamp, labeler.cx, labeler.cy, labeler.count)
+        tracker.aim()
+        t.append(utime.ticks_us())
+
+        for i in range(len(STAGES)):
+            times[i] += utime.ticks_diff(t[i + 1], t[i])
+        track.append((bus.index, tracker.aim_x, tracker.aim_y, sum(temps)))
+    return times, track, bus.transactions
+
+if __name__ == "__main__":
+    records = record(PATH)
+    print(f"recorded {records} subpages, {os.stat(PATH)[6]} bytes")
+    try:
+        times, first, xfers = replay(PATH)
+        _, second, _ = replay(PATH)
+    finally:
+        os.remove(PATH)
+    assert len(first) == records, "not every subpage was replayed"
+    assert first == second, "replays differ"
+
+    print("STAGE            us per subpage")
+    for name, total in zip(STAGES, times):
+        print(f"{name:<16s}{total / records: 10.0f}")
+    print(f"{'total':<16s}{sum(times) / records: 10.0f}   ({xfers} bus transactions)")
+    print(f"final aim point ({first[-1][1]:.2f}, {first[-1][2]:.2f})")
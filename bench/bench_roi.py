@@ -0,0 +1,67 @@
+""" Bus cost of a full subpage versus a region-of-interest window.
+
+Reads and processes subpages of a fake camera with and without a window
+around a target and reports the I2C traffic per subpage and the highest
+subpage rate the bus allows at 400 kHz. Windowed pixels must match the
+full read and pixels outside the window must be left alone:
+
+    MICROPYPATH=src micropython bench/bench_roi.py
+"""
+
+from array import array
+from mlx90640 import MLX90640
+from mlx90640.image import ChessPattern, InterleavedPattern
+from benchutil import fake_camera
+
+# status register bits: new data available, subpage 0 or 1
+STATUS_ADDRESS = 0x8000
+DATA_AVAILABLE = 0x0008
+
+WINDOWS = (
+    ("full subpage", None, None),
+    ("7 x 11 window", (9, 15), (10, 20)),
+    ("3 rows", (11, 13), None),
+)
+
+def read_subpage(bus, camera, sp_id):
+    bus.mem[STATUS_ADDRESS] = DATA_AVAILABLE | sp_id
+    state = camera.read_state()
+    bus.reset_counters()
+    camera.read_image(sp_id)
+    camera.process_image(sp_id, state)
+    return bus.transactions, bus.bytes_read, bus.bus_time_us()
+
+def run(pattern):
+    bus = fake_camera()
+    full = MLX90640(bus, bus.addr)
+    full.set_pattern(pattern)
+    full.setup()
+    for sp_id in (0, 1):
+        read_subpage(bus, full, sp_id)
+
+    for label, rows, cols in WINDOWS:
+        camera = MLX90640(bus, bus.addr)
+        camera.set_pattern(pattern)
+        camera.setup(calib=full.calib)
+        camera.set_window(rows, cols)
+        totals = [0, 0, 0]
+        for sp_id in (0, 1):
+            for i, value in enumerate(read_subpage(bus, camera, sp_id)):
+                totals[i] += value
+
+        inside = 0
+        for idx in range(len(full.image.buf)):
+            if camera.window is None or idx in camera.window:
+                assert camera.image.buf[idx] == full.image.buf[idx], "window differs"
+                inside += 1
+            else:
+                assert camera.image.buf[idx] == 1.0, "pixel outside window changed"
+
+        xfers, nbytes, bus_us = (t // 2 for t in totals)
+        print(f"{pattern.__name__:<20s}{label:<16s}{inside: 6d}{xfers: 7d}{nbytes: 7d}"
+              f"{bus_us: 9d}{1000000 / bus_us: 10.1f}")
+
+if __name__ == "__main__":
+    print("PATTERN             WINDOW          PIXELS  XFERS  BYTES  BUS (us)  MAX SP/s")
+    for pattern in (ChessPattern, InterleavedPattern):
+        run(pattern)
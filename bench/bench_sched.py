@@ -0,0 +1,48 @@
+""" Polling priority scheduler against the deadline scheduler.
+
+Five tasks with the periods of a small control system each spin for a
+fixed time per run. Each scheduler runs them for the same time; the
+number of scheduler calls shows how much time pri_sched() spends polling
+tasks which aren't due, and the task list printout shows the lateness of
+each task and, for deadline_sched(), the idle time and overhead:
+
+    MICROPYPATH=src micropython bench/bench_sched.py
+"""
+
+import utime
+import cotask
+
+RUN_MS = 2000
+# (name, priority, period in ms, busy time per run in us)
+TASKS = (("Button", 1, 50, 50),
+         ("Camera", 2, 20, 2000),
+         ("Pitch", 3, 10, 300),
+         ("Yaw", 4, 10, 300),
+         ("Gun", 5, 100, 100))
+
+def busy(shares):
+    spin_us, = shares
+    while True:
+        start = utime.ticks_us()
+        while utime.ticks_diff(utime.ticks_us(), start) < spin_us:
+            pass
+        yield 0
+
+def run(sched_name):
+    task_list = cotask.TaskList()
+    for name, priority, period, spin_us in TASKS:
+        task_list.append(cotask.Task(busy, name=name, priority=priority,
+                                     period=period, profile=True,
+                                     shares=(spin_us,)))
+    sched = getattr(task_list, sched_name)
+    calls = 0
+    start = utime.ticks_ms()
+    while utime.ticks_diff(utime.ticks_ms(), start) < RUN_MS:
+        sched()
+        calls += 1
+    print(f"{sched_name}: {calls} scheduler calls in {RUN_MS} ms")
+    print(task_list)
+
+if __name__ == "__main__":
+    run("pri_sched")
+    run("deadline_sched")
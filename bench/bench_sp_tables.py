@@ -0,0 +1,40 @@
+""" Per-frame cost of enumerating subpage pixels: the old generator over
+get_sp() against the precomputed index tables.
+
+    MICROPYPATH=src micropython bench/bench_sp_tables.py
+"""
+
+from mlx90640.image import ChessPattern, InterleavedPattern
+from mlx90640.calibration import IMAGE_SIZE
+from benchutil import time_us
+
+REPEAT = 20
+
+def generator_range(pattern, sp_id):
+    # sp_range() as it was before the index tables
+    return (
+        idx for idx, sp in enumerate(pattern.get_sp(i) for i in range(IMAGE_SIZE))
+        if sp == sp_id
+    )
+
+def walk(ranges):
+    total = 0
+    for sp_range in ranges:
+        for idx in sp_range:
+            total += idx
+    return total
+
+def frame_generator(pattern):
+    # read_image() and process_image() each walked the range once per subpage
+    return walk(generator_range(pattern, sp) for sp in (0, 0, 1, 1))
+
+def frame_tables(pattern):
+    return walk(pattern.sp_range(sp) for sp in (0, 0, 1, 1))
+
+if __name__ == "__main__":
+    print("PATTERN             GENERATOR (us)  TABLES (us)   per frame")
+    for pattern in (ChessPattern, InterleavedPattern):
+        assert frame_generator(pattern) == frame_tables(pattern)
+        gen = time_us(frame_generator, pattern, repeat=REPEAT)
+        tab = time_us(frame_tables, pattern, repeat=REPEAT)
+        print(f"{pattern.__name__:<20s}{gen: 15.0f}{tab: 13.0f}")
@@ -0,0 +1,118 @@
+""" Compare CSV text output with binary frame streaming.
+
+Streams a sequence of slowly changing images with MLX_Cam.get_csv()-style
+text lines and with FrameWriter in several modes, checks that the decoder
+rebuilds every image within half a quantization step (at most 0.05 C in
+these modes), and reports the bytes
+and time per image. Also checks that junk with a false magic in it doesn't
+hold up the decoder, and that a NaN pixel can be streamed:
+
+    MICROPYPATH=src micropython bench/bench_stream.py
+"""
+
+import io
+import struct
+import utime
+from array import array
+from ucollections import namedtuple
+from frame_stream import FrameWriter, FrameDecoder, MAGIC, VERSION, HEADER_FMT, HEADER_SIZE
+from mlx90640.calibration import IMAGE_SIZE
+from benchutil import lcg_words
+
+FRAMES = 20
+State = namedtuple('State', ('vdd', 'ta', 'ta_r', 'gain', 'gain_cp'))
+STATE = State(3.3, 10.0, 1e10, 1.0, (-60.0, -61.0))
+
+MODES = (
+    ("uint8 auto range", dict()),
+    ("uint8 fixed, delta", dict(limits=(15.0, 40.0), delta=True)),
+    ("int16 0.01 C", dict(int16=True)),
+    ("int16 0.01 C, delta", dict(int16=True, delta=True)),
+    ("int16, delta, no RLE", dict(int16=True, delta=True, rle=False)),
+)
+
+def images():
+    frame = array('f', (20 + (w & 0xFF)/64 for w in lcg_words(IMAGE_SIZE, 2)))
+    noise = lcg_words(2 * FRAMES * IMAGE_SIZE, 9)
+    for n in range(FRAMES):
+        # a warm spot moves while a few pixels flicker
+        for idx in range(IMAGE_SIZE):
+            if next(noise) & 0x3F == 0:
+                frame[idx] += ((next(noise) & 0xFF) - 128) / 2560
+        frame[(12 * 32 + n) % IMAGE_SIZE] = 34.0
+        yield array('f', frame)
+
+def csv_lines(in_array, width=32, height=24):
+    # the old get_csv() loop, without limits
+    for row in range(height):
+        line = ""
+        for col in range(width):
+            pix = int(in_array[row * width + (width - col - 1)])
+            if col:
+                line += ","
+            line += f"{pix}"
+        yield line
+
+def check_false_magic(frames):
+    # text and a header-like run of bytes claiming a 60000 byte payload
+    # come before real frames; the decoder must not wait for that payload
+    stream = io.BytesIO()
+    writer = FrameWriter(stream, IMAGE_SIZE)
+    for seq, frame in enumerate(frames):
+        writer.write(frame, seq + 1, seq * 250000, STATE, seq & 1)
+    fake = bytearray(HEADER_SIZE)
+    struct.pack_into(HEADER_FMT, fake, 0, MAGIC, VERSION, 0, 0, 0, 1, 0, 0,
+                     IMAGE_SIZE, 60000, 0, 0, 0, 0, 0, 0, 0, 0)
+    junk = b"boot MLXF text\r\n" + bytes(fake) + b"MLXF\x01\xff junk"
+    decoder = FrameDecoder()
+    decoded = decoder.feed(junk + stream.getvalue())
+    assert len(decoded) == FRAMES, "false magic held up the decoder"
+    assert decoded[0].seq == 1 and decoder.skipped >= len(junk)
+    print(f"false magic skipped, {len(decoded)} frames decoded")
+
+def check_nan(frame):
+    frame = array('f', frame)
+    frame[5] = float('nan')
+    stream = io.BytesIO()
+    FrameWriter(stream, IMAGE_SIZE).write(frame, 1, 0, STATE)
+    got = FrameDecoder().feed(stream.getvalue())[0].values
+    assert abs(got[6] - frame[6]) <= 0.05, "NaN pixel spoiled the range"
+
+if __name__ == "__main__":
+    frames = list(images())
+    check_false_magic(frames)
+    check_nan(frames[0])
+
+    out = io.StringIO()
+    start = utime.ticks_us()
+    for frame in frames:
+        for line in csv_lines(frame):
+            out.write(line + "\r\n")
+    elapsed = utime.ticks_diff(utime.ticks_us(), start) / FRAMES
+    print("MODE                    BYTES/IMAGE  WRITE (us)  DECODE (us)  MAX ERROR")
+    print(f"{'CSV text (whole C)':<24s}{len(out.getvalue()) // FRAMES: 11d}{elapsed: 12.0f}")
+
+    for label, kwargs in MODES:
+        stream = io.BytesIO()
+        writer = FrameWriter(stream, IMAGE_SIZE, **kwargs)
+        start = utime.ticks_us()
+        for seq, frame in enumerate(frames):
+            writer.write(frame, seq + 1, seq * 250000, STATE, seq & 1)
+        write_us = utime.ticks_diff(utime.ticks_us(), start) / FRAMES
+
+        data = stream.getvalue()
+        decoder = FrameDecoder()
+        start = utime.ticks_us()
+        decoded = []
+        # feed in odd-sized pieces, as a serial port would deliver them
+        for pos in range(0, len(data), 1000):
+            decoded += decoder.feed(data[pos:pos + 1000])
+        decode_us = utime.ticks_diff(utime.ticks_us(), start) / FRAMES
+        assert len(decoded) == FRAMES and decoder.dropped == 0, "frames lost"
+
+        worst = 0.0
+        for frame, got in zip(frames, decoded):
+            for idx in range(IMAGE_SIZE):
+                worst = max(worst, abs(frame[idx] - got.values[idx]))
+        assert worst <= 0.05, "decoded image is off by more than half a step"
+        print(f"{label:<24s}{len(data) // FRAMES: 11d}{write_us: 12.0f}{decode_us: 13.0f}{worst: 11.4f}")
@@ -0,0 +1,77 @@
+""" Compare the fused targeting kernel with the old four-pass target search.
+
+The old search scaled the frame to 0..255 by appending to an array, then
+built a list-of-lists image and a binary image, then found the row centroid:
+
+    MICROPYPATH=src micropython bench/bench_targeting.py
+"""
+
+import array
+import gc
+import utime
+import targeting
+from mlx90640.calibration import NUM_ROWS, NUM_COLS, IMAGE_SIZE
+from benchutil import lcg_words
+
+REPEAT = 20
+THRESHOLD = 30.0
+
+def scene(cx, cy, r=3, seed=1):
+    frame = array.array('f', (20.0 + (w & 0xFF)/256 for w in lcg_words(IMAGE_SIZE, seed)))
+    for row in range(NUM_ROWS):
+        for col in range(NUM_COLS):
+            if (row - cy)**2 + (col - cx)**2 <= r*r:
+                frame[row*NUM_COLS + col] = 34.0
+    return frame
+
+def old_search(in_array, threshold=75):
+    # MLX_Cam.get_array() followed by task2_thermal_camera state 4
+    minny = min(in_array)
+    scale = 255.0 / (max(in_array) - minny)
+    pix_array = array.array('B')
+    for row in range(NUM_ROWS):
+        for col in range(NUM_COLS):
+            pix = int((in_array[row * NUM_COLS + (NUM_COLS - col - 1)] - minny) * scale)
+            pix_array.append(pix)
+    img = [pix_array[i:i+NUM_COLS] for i in range(0, len(pix_array), NUM_COLS)]
+    binary_img = [[1 if pixel > threshold else 0 for pixel in row] for row in img]
+    total_mass = 0
+    center_mass = 0
+    for y, row in enumerate(binary_img):
+        mass = sum(row)
+        total_mass += mass
+        center_mass += y * mass
+    return center_mass / total_mass if total_mass else None
+
+def measure(fun, *args):
+    mem_alloc = getattr(gc, 'mem_alloc', None)
+    gc.collect()
+    if mem_alloc:
+        gc.disable()
+        before = mem_alloc()
+    start = utime.ticks_us()
+    for _ in range(REPEAT):
+        fun(*args)
+    elapsed = utime.ticks_diff(utime.ticks_us(), start) / REPEAT
+    churn = None
+    if mem_alloc:
+        churn = (mem_alloc() - before) // REPEAT
+        gc.enable()
+    return elapsed, churn
+
+def show(label, elapsed, churn):
+    churn = "n/a" if churn is None else f"{churn} B"
+    print(f"{label:<20s}{elapsed: 10.0f} us {churn:>10s} per frame")
+
+if __name__ == "__main__":
+    result = targeting.new_result()
+    for cx, cy in ((5, 4), (16, 12), (27, 19)):
+        frame = scene(cx, cy)
+        targeting.find_target(frame, THRESHOLD, result)
+        assert abs(result[targeting.CX] - cx) < 1e-3 and abs(result[targeting.CY] - cy) < 1e-3
+        assert result[targeting.PEAK] == 34.0
+    print("centroid found at the centre of the target for all test scenes")
+
+    frame = scene(20, 12)
+    show("four-pass search", *measure(old_search, frame))
+    show("find_target", *measure(targeting.find_target, frame, THRESHOLD, result))
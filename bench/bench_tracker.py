@@ -0,0 +1,65 @@
+""" Synthetic moving-target test of the tracker.
+
+A target walks across the field of view at constant speed, turns around
+and walks back, while a warm lamp stays put. Blob positions get a little
+noise and arrive once per subpage. The error of the predicted aim point at
+the time the gun gets there is compared with aiming at the latest blob:
+
+    MICROPYPATH=src micropython bench/bench_tracker.py
+
+The image times start just before the ticks_us() counter wraps around.
+"""
+
+import array
+import math
+import utime
+from tracker import Tracker
+from benchutil import lcg_words
+
+SUBPAGE_US = 250000
+LATENCY_US = 200000
+STEPS = 80
+SPEED = 6.0             # pixels per second
+TICKS_MAX = 1 << 30     # period of ticks_us() on most ports
+
+def target_x(t):
+    # back and forth between columns 4 and 28
+    span = 24.0
+    d = (SPEED * t) % (2*span)
+    return 4.0 + (d if d < span else 2*span - d)
+
+if __name__ == "__main__":
+    tracker = Tracker(latency_us=LATENCY_US)
+    xs = array.array('f', (0.0, 0.0))
+    ys = array.array('f', (0.0, 0.0))
+    noise = lcg_words(4*STEPS, 3)
+    start = TICKS_MAX - 5*SUBPAGE_US
+    raw_err = pred_err = 0.0
+    scored = 0
+    elapsed = 0
+    for step in range(STEPS):
+        t = step * SUBPAGE_US / 1000000
+        stamp = (start + step*SUBPAGE_US) % TICKS_MAX
+        # the person first, then the lamp
+        xs[0] = target_x(t) + ((next(noise) & 0xFF) - 128) / 1280
+        ys[0] = 12.0 + ((next(noise) & 0xFF) - 128) / 1280
+        xs[1] = 25.0 + ((next(noise) & 0xFF) - 128) / 1280
+        ys[1] = 5.0 + ((next(noise) & 0xFF) - 128) / 1280
+
+        begin = utime.ticks_us()
+        tracker.update(stamp, xs, ys, 2)
+        k = tracker.aim()
+        elapsed += utime.ticks_diff(utime.ticks_us(), begin)
+
+        truth = target_x(t + LATENCY_US / 1000000)
+        if step >= 4:
+            # the person's track was started first, so it wins the tie
+            # with the lamp's track
+            assert k >= 0 and abs(tracker.y[k] - 12.0) < 1.0, "aimed at the lamp"
+            raw_err += (xs[0] - truth)**2
+            pred_err += (tracker.aim_x - truth)**2
+            scored += 1
+
+    print(f"RMS aim error, latest blob:     {math.sqrt(raw_err/scored):6.3f} px")
+    print(f"RMS aim error, tracker:         {math.sqrt(pred_err/scored):6.3f} px")
+    print(f"update() and aim() take {elapsed/STEPS:.0f} us per image")
@@ -0,0 +1,68 @@
+""" Shared helpers for the host benchmarks.
+
+Builds a FakeI2C bus holding a synthetic but self-consistent MLX90640: random
+pixel calibration and pixel data around realistic header and auxiliary
+register values, so the whole driver runs without divisions by zero.
+"""
+
+import utime
+from fakebus import FakeI2C
+from mlx90640.regmap import EEPROM_ADDRESS, EEPROM_SIZE
+from mlx90640.image import PIX_DATA_ADDRESS
+from mlx90640.calibration import IMAGE_SIZE, PIX_CALIB_ADDRESS
+
+# EEPROM words which must hold sane values for the calculations to work
+_EEPROM_HEADER = {
+    0x2410 : 0x4210,    # k_ptat, occ scales
+    0x2411 : 0xFFB8,    # pix_os_average
+    0x2420 : 0x2211,    # alpha_scale, acc scales
+    0x2421 : 0x2E00,    # pix_sensitivity_average
+    0x2430 : 0x18EF,    # gain
+    0x2431 : 0x2FF1,    # ptat_25
+    0x2432 : 0x5950,    # kv_ptat, kt_ptat
+    0x2433 : 0x9C5F,    # k_vdd, vdd_25
+    0x2438 : 0x2363,    # res_ctrl_cal, kv_scale, kta scales
+    0x243C : 0xF020,    # ksta, tgc
+    0x243D : 0x9C9C,    # ksto_2, ksto_1
+    0x243E : 0x9C9C,    # ksto_4, ksto_3
+    0x243F : 0x2949,    # step, ct4, ct3, ksto_scale
+}
+
+# auxiliary RAM and registers read by MLX90640.read_state()
+_AUX_WORDS = {
+    0x0700 : 0x4B1E,    # ta_vbe
+    0x0708 : 0xFFB0,    # cp_sp_0
+    0x070A : 0x18EF,    # gain
+    0x0720 : 0x06AF,    # ta_ptat
+    0x0728 : 0xFFB2,    # cp_sp_1
+    0x072A : 0xCC6A,    # vdd_pix
+    0x800D : 0x1901,    # control register 1: chess, 18 bit, 2 Hz
+}
+
+def lcg_words(count, seed=1, mask=0xFFFF):
+    for _ in range(count):
+        seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+        yield (seed >> 8) & mask
+
+def pixel_words(seed=1):
+    # raw IR readings of a room temperature scene, in range -400..-200
+    return (w % 200 - 400 for w in lcg_words(IMAGE_SIZE, seed))
+
+def fake_camera(seed=1):
+    bus = FakeI2C()
+    bus.load(EEPROM_ADDRESS, lcg_words(EEPROM_SIZE, seed))
+    # clear outlier bits so that most pixels count as good
+    bus.load(PIX_CALIB_ADDRESS, lcg_words(IMAGE_SIZE, seed + 1, 0xFFFE))
+    for addr, word in _EEPROM_HEADER.items():
+        bus.mem[addr] = word
+    bus.load(PIX_DATA_ADDRESS, pixel_words(seed))
+    for addr, word in _AUX_WORDS.items():
+        bus.mem[addr] = word
+    return bus
+
+def time_us(fun, *args, repeat=1):
+    # average run time of fun(*args) in microseconds
+    start = utime.ticks_us()
+    for _ in range(repeat):
+        fun(*args)
+    return utime.ticks_diff(utime.ticks_us(), start) / repeat
@@ -0,0 +1,65 @@
+""" Host-side stand-in for a machine.I2C bus with a single MLX90640 on it.
+
+Memory is modelled as 16-bit words at 16-bit word addresses, which is how
+the camera exposes its RAM, EEPROM and registers. Every transfer is counted
+so that the number of transactions and bytes moved by the driver can be
+compared between read strategies without the physical camera.
+"""
+
+# bytes sent on the bus per transaction besides the data itself:
+# device address (W), two memory address bytes, device address (R)
+_XFER_OVERHEAD = const(4)
+
+class FakeI2C:
+    def __init__(self, addr=0x33):
+        self.addr = addr
+        self.mem = {}   # word address : 16-bit value
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.transactions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def load(self, mem_addr, words):
+        # fill consecutive words starting at mem_addr
+        for offset, word in enumerate(words):
+            self.mem[mem_addr + offset] = word & 0xFFFF
+
+    def bus_time_us(self, freq=400000):
+        # rough transfer time: 9 clocks per byte (8 data bits + ACK)
+        total = self.bytes_read + self.bytes_written + _XFER_OVERHEAD*self.transactions
+        return total * 9 * 1000000 // freq
+
+    ## machine.I2C interface
+
+    def scan(self):
+        return [self.addr]
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8):
+        self._check(addr, addrsize)
+        mem = self.mem
+        for offset in range(0, len(buf), 2):
+            word = mem.get(memaddr + offset//2, 0)
+            buf[offset] = word >> 8
+            buf[offset + 1] = word & 0xFF
+        self.transactions += 1
+        self.bytes_read += len(buf)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, *, addrsize=8):
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+        return bytes(buf)
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8):
+        self._check(addr, addrsize)
+        for offset in range(0, len(buf), 2):
+            self.mem[memaddr + offset//2] = buf[offset] << 8 | buf[offset + 1]
+        self.transactions += 1
+        self.bytes_written += len(buf)
+
+    def _check(self, addr, addrsize):
+        if addr != self.addr:
+            raise OSError(19)  # ENODEV, as machine.I2C reports a missing device
+        if addrsize != 16:
+            raise ValueError("MLX90640 uses 16-bit memory addresses")
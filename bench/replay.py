@@ -0,0 +1,109 @@
+""" Host-side replay of camera recordings made by mlx90640.recorder.Recorder.
+
+ReplayI2C serves a recording to MLX90640 as if it were the camera, so the
+whole pipeline can be run and timed on a PC or the MicroPython unix port.
+This module, like FakeI2C, isn't copied to the camera's board.
+"""
+
+import struct
+from array import array
+from fakebus import FakeI2C
+from mlx90640.recorder import (
+    RECORDING_MAGIC,
+    RECORDING_VERSION,
+    STATUS_ADDRESS,
+    CONTROL_ADDRESS,
+    _HEADER_FMT,
+    _RECORD_FMT,
+)
+from mlx90640.regmap import REG_SIZE, AUX_DATA_ADDRESS, AUX_DATA_SIZE, EEPROM_ADDRESS
+from mlx90640.image import PIX_DATA_ADDRESS, Window, get_pattern_by_id
+
+_DATA_AVAILABLE = const(0x0008)
+
+def _words(data):
+    return array('H', (data[i] << 8 | data[i + 1] for i in range(0, len(data), REG_SIZE)))
+
+def load_recording(path):
+    # returns (control word, EEPROM words, records), each record being
+    # (subpage, pattern ID, ticks_us(), auxiliary RAM words, pixel indices,
+    # pixel words)
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    magic, version, control, eeprom_size = struct.unpack_from(_HEADER_FMT, data, 0)
+    if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+        raise ValueError("not a camera recording")
+    pos = struct.calcsize(_HEADER_FMT)
+    eeprom = _words(data[pos:pos + eeprom_size * REG_SIZE])
+    pos += eeprom_size * REG_SIZE
+
+    records = []
+    windows = {}
+    head_size = struct.calcsize(_RECORD_FMT)
+    aux_bytes = AUX_DATA_SIZE * REG_SIZE
+    while pos + head_size <= len(data):
+        (sp_id, pattern_id, count, stamp,
+         row0, row1, col0, col1) = struct.unpack_from(_RECORD_FMT, data, pos)
+        pos += head_size
+        end = pos + aux_bytes + count * REG_SIZE
+        if end > len(data):
+            break   # truncated last record, e.g. power lost while recording
+        # the window's tables are shared by all the records read through it
+        bounds = (row0, row1, col0, col1)
+        window = windows.get(bounds)
+        if window is None:
+            window = windows[bounds] = Window((row0, row1), (col0, col1))
+        pix_idx = window.sp_range(get_pattern_by_id(pattern_id), sp_id)
+        aux = _words(data[pos:pos + aux_bytes])
+        pix = _words(data[pos + aux_bytes:end])
+        records.append((sp_id, pattern_id, stamp, aux, pix_idx, pix))
+        pos = end
+    return control, eeprom, records
+
+class ReplayI2C(FakeI2C):
+    # Serves a recording to MLX90640 as if it were the camera. Clearing the
+    # data_available flag moves on to the next record the next time the
+    # status register is read, so the auxiliary RAM read by read_state()
+    # after read_image() still belongs to the same subpage. Pixels which
+    # weren't recorded keep their previous values, as they would in the
+    # camera's RAM.
+    def __init__(self, path, addr=0x33, *, loop=False):
+        super().__init__(addr)
+        control, eeprom, self.records = load_recording(path)
+        self.loop = loop
+        self.load(EEPROM_ADDRESS, eeprom)
+        self.mem[CONTROL_ADDRESS] = control
+        self.mem[STATUS_ADDRESS] = 0
+
+        self.index = -1     # record being served
+        self.stamp = 0      # its ticks_us() time when it was recorded
+        self.finished = False
+        self._pending = True
+
+    def _advance(self):
+        self._pending = False
+        index = self.index + 1
+        if index >= len(self.records):
+            if not self.loop or not self.records:
+                self.finished = True
+                return
+            index = 0
+        self.index = index
+
+        sp_id, pattern_id, self.stamp, aux, pix_idx, pix = self.records[index]
+        self.load(AUX_DATA_ADDRESS, aux)
+        mem = self.mem
+        for word, idx in zip(pix, pix_idx):
+            mem[PIX_DATA_ADDRESS + idx] = word
+        mem[STATUS_ADDRESS] = mem[STATUS_ADDRESS] & ~0x0007 | _DATA_AVAILABLE | sp_id
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8):
+        if self._pending and memaddr == STATUS_ADDRESS:
+            self._advance()
+        super().readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8):
+        super().writeto_mem(addr, memaddr, buf, addrsize=addrsize)
+        if memaddr == STATUS_ADDRESS and not self.mem[STATUS_ADDRESS] & _DATA_AVAILABLE:
+            self._pending = True
@@ -0,0 +1,84 @@
+""" The five tasks of main.py run for hours in virtual time.
+
+The tasks have the names, priorities and periods given to them in main.py
+and yield the states of their state machines, but their run times come from
+a model instead of from motors and a camera: the camera task takes most of a
+subpage's worth of time to process a frame every few runs, the motor
+control tasks take a varying time and the others hardly any. The clock
+starts just before ticks_us() wraps around, so the run wraps it many times.
+The same seed gives the same printout every time:
+
+    MICROPYPATH=src micropython bench/sim_main.py
+
+A few seconds of pri_sched(), which polls, are run for comparison.
+"""
+
+import time
+import cotask
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:
+    ticks_ms = lambda: int(time.time() * 1000)
+    ticks_diff = lambda end, start: end - start
+
+HOURS = 4
+POLL_SECONDS = 5
+SEED = 405
+
+def camera_us(task, state):
+    # polling the status register, or labeling, locating and tracking
+    return 42000 if state == 4 else 1500
+
+MODEL = {"Start Button": 20,
+         "Thermal Camera": camera_us,
+         "Pitch Control": (250, 900),
+         "Yaw Control": (250, 900),
+         "Fire Nerf Gun": 60}
+
+def states(*sequence):
+    # a task which steps through the given states over and over
+    def run():
+        while True:
+            for state in sequence:
+                yield state
+    return run
+
+# (name, priority, period in ms, states), as set up in main.py
+TASKS = (("Start Button", 1, 100, states(1)),
+         ("Thermal Camera", 2, 100, states(3, 3, 4)),
+         ("Pitch Control", 3, 100, states(2)),
+         ("Yaw Control", 4, 100, states(3, 4, 4)),
+         ("Fire Nerf Gun", 5, 100, states(2, 2, 2, 3)))
+
+def simulate(sched_name, seconds, read_us=0):
+    clock = cotask.VirtualClock(MODEL, overhead_us=40, read_us=read_us,
+                                seed=SEED)
+    task_list = cotask.TaskList(clock)
+    for name, priority, period, run in TASKS:
+        task_list.append(cotask.Task(run, name=name, priority=priority,
+                                     period=period, profile=True))
+    sched = getattr(task_list, sched_name)
+    wraps = 0
+    last = clock.ticks_us()
+    end_us = seconds * 1000000
+    while clock.elapsed < end_us:
+        sched()
+        now = clock.ticks_us()
+        if now < last:
+            wraps += 1
+        last = now
+    return task_list, wraps
+
+if __name__ == "__main__":
+    for sched_name, seconds, read_us in (("deadline_sched", HOURS * 3600, 0),
+                                         ("pri_sched", POLL_SECONDS, 20)):
+        start = ticks_ms()
+        task_list, wraps = simulate(sched_name, seconds, read_us)
+        elapsed = ticks_diff(ticks_ms(), start) / 1000
+        print(f"{sched_name}: {seconds} s of virtual time in {elapsed:.1f} s, "
+              f"ticks_us() wrapped {wraps} times")
+        print(task_list)
+
+    first = str(simulate("deadline_sched", 600)[0])
+    print("reproducible:", first == str(simulate("deadline_sched", 600)[0]))
@@ -0,0 +1,83 @@
+"""!
+@file targeting.py
+This file contains the kernel which found the target in a thermal image for
+the aiming task before the blob labeler, localizer and tracker took over.
+It no longer runs on the board; it is kept with the benchmarks as the
+baseline which @c bench_targeting.py and @c bench_localize.py compare
+against.
+
+One pass over the image thresholds every pixel and accumulates the number
+of warm pixels, the sums of their column and row numbers and the hottest
+value in the image. Nothing is allocated: the results are written to an
+array owned by the caller, so the kernel can be run on every frame.
+
+@author Adam Westfall
+@author Jason Davis
+@author Conor Fraser
+@copyright Creative Commons CC BY: Please visit https://creativecommons.org/licenses/by/4.0/ to learn more
+"""
+
+import array
+import micropython
+from mlx90640.calibration import NUM_ROWS, NUM_COLS
+
+## Index in the result array of the number of pixels above the threshold
+MASS = 0
+## Index in the result array of the centroid column, in sensor order
+CX = 1
+## Index in the result array of the centroid row
+CY = 2
+## Index in the result array of the hottest value in the whole image
+PEAK = 3
+
+
+def new_result():
+    """!
+    @brief   Allocate an array to hold the results of @c find_target().
+    @returns An @c array('f') indexed by @c MASS, @c CX, @c CY and @c PEAK
+    """
+    return array.array('f', (0.0, 0.0, 0.0, 0.0))
+
+
+@micropython.native
+def find_target(values, threshold, result, width=NUM_COLS, height=NUM_ROWS):
+    """!
+    @brief   Find the centroid of the pixels at or above a threshold.
+    @details The values can be a temperature map from
+             @c MLX_Cam.get_temperatures(), in which case the threshold is
+             in degrees C, or @c ProcessedImage.buf with a threshold in the
+             same units. Columns are in sensor order; the image as seen from
+             behind the camera is mirrored, with column @c width - 1 - @c cx.
+             If no pixel is warm enough, the centroid is left at 0.
+    @param   values A flat array of pixel values in sensor order
+    @param   threshold The lowest value of a pixel which belongs to the target
+    @param   result An array from @c new_result() which receives the results
+    @param   width The width of the image in pixels
+    @param   height The height of the image in pixels
+    @returns The number of pixels at or above the threshold
+    """
+    mass = 0
+    sum_x = 0
+    sum_y = 0
+    peak = values[0]
+    idx = 0
+    for row in range(height):
+        for col in range(width):
+            v = values[idx]
+            if v >= threshold:
+                mass += 1
+                sum_x += col
+                sum_y += row
+            if v > peak:
+                peak = v
+            idx += 1
+
+    result[MASS] = mass
+    if mass:
+        result[CX] = sum_x / mass
+        result[CY] = sum_y / mass
+    else:
+        result[CX] = 0.0
+        result[CY] = 0.0
+    result[PEAK] = peak
+    return mass
@@ -2,15 +2,20 @@ from gc import collect
 from ucollections import namedtuple
 from mlx90640.regmap import (
     REGISTER_MAP,
+    AUX_REGISTER_MAP,
     EEPROM_MAP,
     RegisterMap,
     CameraInterface,
+    MemoryImage,
     REG_SIZE,
+    AUX_DATA_ADDRESS,
+    AUX_DATA_SIZE,
     EEPROM_ADDRESS,
     EEPROM_SIZE,
 )
-from mlx90640.calibration import CameraCalibration, TEMP_K
-from mlx90640.image import RawImage, ProcessedImage, Subpage, get_pattern_by_id
+from mlx90640.calibration import CameraCalibration, TEMP_K, NUM_ROWS, NUM_COLS
+from mlx90640.calib_cache import eeprom_checksum, load_calibration, save_calibration
+from mlx90640.image import RawImage, ProcessedImage, Subpage, Window, get_pattern_by_id
 
 class CameraDetectError(Exception): pass
 
@@ -49,24 +54,59 @@ class MLX90640:
     def __init__(self, i2c, addr):
         self.iface = CameraInterface(i2c, addr)
         self.registers = RegisterMap(self.iface, REGISTER_MAP)
+        self.aux_data = MemoryImage(AUX_DATA_ADDRESS, AUX_DATA_SIZE)
+        self.aux_registers = RegisterMap(self.aux_data, AUX_REGISTER_MAP, readonly=True)
         self.eeprom = RegisterMap(self.iface, EEPROM_MAP, readonly=True)
+        self.eeprom_image = None
         self.calib = None
         self.raw = None
         self.image = None
         self.last_read = None
+        self.window = None
+        # status register, decoded by poll() from a single read
+        self._status = bytearray(REG_SIZE)
+        self._status_address, self._status_fields = self.registers.struct('data_available', self._status)
+        self._ready = None
 
-    def setup(self, *, calib=None, raw=None, image=None):
+    def setup(self, *, calib=None, raw=None, image=None, eeprom_image=True, calib_cache=None):
         # We've been having some memory allocation errors which usually happen
         # as this method runs. As a workaround, run gc.collect() several times
         # to keep memory cleaned up, as when the process is finished, there is
         # a bunch of free memory (~27KB or more on STM32L476) available
         collect()
-        self.calib = calib or CameraCalibration(self.iface, self.eeprom)
+        self.calib = calib or self._load_calibration(eeprom_image, calib_cache)
         collect()
         self.raw = raw or RawImage()
         collect()
         self.image = image or ProcessedImage(self.calib)
 
+    def _load_calibration(self, eeprom_image, calib_cache):
+        # calib_cache is a file path; the cache is keyed by the EEPROM
+        # checksum and rewritten whenever it doesn't match this camera
+        if not (eeprom_image or calib_cache):
+            return CameraCalibration(self.iface, self.eeprom)
+
+        calib_iface = self.load_eeprom()
+        if not calib_cache:
+            return CameraCalibration(calib_iface, self.eeprom)
+
+        key = eeprom_checksum(self.eeprom_image)
+        cached = load_calibration(calib_cache, key)
+        calib = CameraCalibration(calib_iface, self.eeprom, cached=cached)
+        if cached is None:
+            collect()
+            save_calibration(calib_cache, key, calib)
+        return calib
+
+    def load_eeprom(self):
+        # Read the whole EEPROM in one transfer; from then on all calibration
+        # lookups are served from memory instead of the bus
+        image = MemoryImage(EEPROM_ADDRESS, EEPROM_SIZE)
+        image.update(self.iface)
+        self.eeprom_image = image
+        self.eeprom = RegisterMap(image, EEPROM_MAP, readonly=True)
+        return image
+
     @property
     def refresh_rate(self):
         return RefreshRate.get_freq(self.registers['refresh_rate'])
@@ -80,29 +120,23 @@ class MLX90640:
         self.registers['read_pattern'] = pat.pattern_id
 
     def read_vdd(self):
-        # supply voltage calculation (delta Vdd)
-        # type: (self) -> float
-        vdd_pix = self.registers['vdd_pix'] * self._adc_res_corr()
-        return float(vdd_pix - self.calib.vdd_25)/self.calib.k_vdd
+        return self._calc_vdd(self.registers['vdd_pix'], self.registers['adc_resolution'])
 
-    def _adc_res_corr(self):
-        # type: (self) -> float
-        res_exp = self.calib.res_ee - self.registers['adc_resolution']
-        return 1 << res_exp
+    def _calc_vdd(self, vdd_pix, adc_resolution):
+        # supply voltage calculation (delta Vdd)
+        # type: (self, int, int) -> float
+        res_corr = 1 << (self.calib.res_ee - adc_resolution)
+        return float(vdd_pix*res_corr - self.calib.vdd_25)/self.calib.k_vdd
 
     def read_ta(self):
+        return self._calc_ta(self.registers['ta_ptat'], self.registers['ta_vbe'], self.read_vdd())
+
+    def _calc_ta(self, v_ptat, v_be, vdd):
         # ambient temperature calculation (delta Ta in degC)
-        # type: (self) -> float
-        v_ptat = self.registers['ta_ptat']
-        v_be = self.registers['ta_vbe']
+        # type: (self, int, int, float) -> float
         v_ptat_art = v_ptat/(v_ptat*self.calib.alpha_ptat + v_be) * 262144
 
-        v_ta = v_ptat_art/(1.0 + self.calib.kv_ptat*self.read_vdd() - self.calib.ptat_25)
-
-        # print('v_ptat: ', v_ptat)
-        # print('v_be:', v_be)
-        # print('v_ptat_art: ', v_ptat_art)
-
+        v_ta = v_ptat_art/(1.0 + self.calib.kv_ptat*vdd - self.calib.ptat_25)
         return v_ta/self.calib.kt_ptat
 
     def read_gain(self):
@@ -112,11 +146,19 @@ class MLX90640:
 
     # tr - temperature of reflected environment
     def read_state(self, *, tr=None):
-        gain = self.read_gain()
-        cp_sp_0 = gain * self.registers['cp_sp_0']
-        cp_sp_1 = gain * self.registers['cp_sp_1']
+        # Snapshot the auxiliary RAM in one burst so that every value comes
+        # from the same measurement, then derive the state from memory.
+        # Together with control register 1 this is two bus transactions.
+        self.aux_data.update(self.iface)
+        aux = self.aux_registers
+        adc_resolution = self.registers['adc_resolution']
+
+        gain = self.calib.gain / aux['gain']
+        cp_sp_0 = gain * aux['cp_sp_0']
+        cp_sp_1 = gain * aux['cp_sp_1']
 
-        ta = self.read_ta()
+        vdd = self._calc_vdd(aux['vdd_pix'], adc_resolution)
+        ta = self._calc_ta(aux['ta_ptat'], aux['ta_vbe'], vdd)
 
         ta_abs = ta + 25
         if self.calib.emissivity == 1:
@@ -128,13 +170,22 @@ class MLX90640:
             ta_r = tr_k4 - (tr_k4 - ta_k4)/self.calib.emissivity
 
         return CameraState(
-            vdd = self.read_vdd(),
+            vdd = vdd,
             ta = ta,
             ta_r = ta_r,
             gain = gain,
             gain_cp = (cp_sp_0, cp_sp_1),
         )
 
+    def poll(self):
+        # Read the status register once and decode both fields: the ID of
+        # the subpage which is ready to be read, or -1 if there is no new
+        # data. read_image() reuses this read instead of polling again.
+        self.iface.read_into(self._status_address, self._status)
+        status = self._status_fields
+        self._ready = status['last_subpage'] if status['data_available'] else -1
+        return self._ready
+
     @property
     def has_data(self):
         return bool(self.registers['data_available'])
@@ -143,19 +194,35 @@ class MLX90640:
     def last_subpage(self):
         return self.registers['last_subpage']
 
-    def read_image(self, sp_id = None):
-        if not self.has_data:
+    def set_window(self, rows=None, cols=None):
+        # Region of interest for read_image() and process_image(); rows and
+        # cols are inclusive (first, last) pairs, None for the full extent.
+        # With neither given the whole frame is read again.
+        if rows is None and cols is None:
+            self.window = None
+        else:
+            self.window = Window(rows or (0, NUM_ROWS - 1), cols or (0, NUM_COLS - 1))
+
+    def read_image(self, sp_id = None, *, full = False):
+        # full=True reads the whole subpage even if a window is set
+        ready = self._ready
+        if ready is None or ready < 0:
+            ready = self.poll()
+        self._ready = None
+        if ready < 0:
             raise DataNotAvailableError
-        
+
         if sp_id is None:
-            sp_id = self.last_subpage
+            sp_id = ready
 
-        subpage = Subpage(self.get_pattern(), sp_id)
+        subpage = Subpage(self.get_pattern(), sp_id, None if full else self.window)
         self.last_read = subpage
 
         # print(f"read SP {subpage.id}")
         self.raw.read(self.iface, subpage.sp_range())
-        self.registers['data_available'] = 0
+        # clear data_available by writing back the status polled above
+        self._status_fields['data_available'] = 0
+        self.iface.write(self._status_address, self._status)
         return self.raw
 
     def process_image(self, sp_id = None, state = None):
@@ -169,8 +236,7 @@ class MLX90640:
         state = state or self.read_state()
 
         # print(f"process SP {subpage.id}")
-        raw_data = ((idx, self.raw[idx]) for idx in subpage.sp_range())
-        self.image.update(raw_data, subpage, state)
+        self.image.update(self.raw, subpage, state)
         return self.image
 
     # def dump_eeprom(self):
@@ -0,0 +1,179 @@
+"""!
+@file background.py
+This file contains a running model of the background seen by the thermal
+camera, used to ignore heat sources which don't move.
+
+Lamps, laptops and warm table edges can be as warm as a person. Each pixel
+keeps an exponential moving average and variance of its temperature, which
+are updated one subpage at a time as new data arrives. A pixel is in the
+foreground while it is warmer than its average by several standard
+deviations. The foreground mask is handed to @c blobs.BlobLabeler so that
+only pixels which have changed can become part of a target.
+
+The background should be learned from the empty scene with @c learn()
+before anyone steps into view. A pixel which has not been learned and is
+already hot when it is first seen isn't taken as background, since it may
+be a target which was in view from the start.
+
+@author Adam Westfall
+@author Jason Davis
+@author Conor Fraser
+@copyright Creative Commons CC BY: Please visit https://creativecommons.org/licenses/by/4.0/ to learn more
+"""
+
+import array
+import micropython
+from mlx90640.calibration import IMAGE_SIZE
+
+
+class BackgroundModel:
+    """!
+    @brief   Class which keeps a per-pixel background model and a mask of
+             the foreground pixels.
+    @details All buffers are allocated when the model is created: @c mean
+             and @c var hold the background temperature and its variance,
+             and @c mask holds 1 for each foreground pixel and 0 elsewhere.
+    """
+
+    def __init__(self, size=IMAGE_SIZE, rate=0.05, fg_rate=0.005, k=3.0,
+                 min_std=0.5, hot=None):
+        """!
+        @brief   Allocate the background model.
+        @param   size The number of pixels in the image
+        @param   rate The weight of a new value in the average of a
+                 background pixel; the background adapts within about
+                 1 / @c rate updates of each pixel
+        @param   fg_rate The weight of a new value in the average of a
+                 foreground pixel, so that something warm which stops
+                 moving slowly becomes background
+        @param   k The number of standard deviations by which a pixel must
+                 be warmer than the background to be foreground
+        @param   min_std The smallest standard deviation used, which keeps
+                 pixels that are very steady from being flagged by noise
+        @param   hot A temperature at or above which a pixel that has not
+                 been learned stays in the foreground instead of becoming
+                 background, or @c None to learn every first value
+        """
+        ## The weight of a new value for a background pixel
+        self.rate = rate
+        ## The weight of a new value for a foreground pixel
+        self.fg_rate = fg_rate
+        ## The threshold in standard deviations
+        self.k = k
+        ## The smallest standard deviation used
+        self.min_std = min_std
+        ## The temperature of pixels which are never learned as background
+        #  when first seen, or @c None
+        self.hot = hot
+
+        zeros = [0.0] * size
+        ## Per-pixel average background temperature
+        self.mean = array.array('f', zeros)
+        ## Per-pixel variance of the background temperature
+        self.var = array.array('f', zeros)
+        ## Per-pixel foreground flag, 1 for foreground
+        self.mask = bytearray(size)
+        # per-pixel flag set once the pixel has been seen
+        self._seen = bytearray(size)
+        ## The number of foreground pixels found by the latest update
+        self.count = 0
+
+
+    def reset(self):
+        """!
+        @brief   Forget the background, e.g. after the camera has moved.
+        """
+        for idx in range(len(self._seen)):
+            self._seen[idx] = 0
+            self.mask[idx] = 0
+
+
+    @micropython.native
+    def learn(self, values, update_idx):
+        """!
+        @brief   Learn newly measured pixels as background.
+        @details Used while the scene is known to be empty, such as before
+                 a duel starts, so that every heat source in view, however
+                 warm, becomes background. The mask of the pixels is cleared.
+        @param   values A flat array of pixel temperatures in sensor order
+        @param   update_idx The indices of the pixels which have new values,
+                 such as @c MLX_Cam.updated_idx()
+        """
+        mean = self.mean
+        var = self.var
+        mask = self.mask
+        seen = self._seen
+        rate = self.rate
+        min_var = self.min_std * self.min_std
+
+        for idx in update_idx:
+            v = values[idx]
+            mask[idx] = 0
+            if not seen[idx]:
+                seen[idx] = 1
+                mean[idx] = v
+                var[idx] = min_var
+                continue
+            d = v - mean[idx]
+            mean[idx] += rate*d
+            var[idx] = (1 - rate)*(var[idx] + rate*d*d)
+        self.count = 0
+
+
+    @micropython.native
+    def update(self, values, update_idx):
+        """!
+        @brief   Update the model and the mask with newly measured pixels.
+        @details Only the pixels in @c update_idx are touched, so the model
+                 can be updated with each subpage as it is processed. The
+                 first value seen of each pixel becomes its background,
+                 unless it is at least @c hot; such a pixel stays in the
+                 foreground until it has cooled below @c hot.
+        @param   values A flat array of pixel temperatures in sensor order
+        @param   update_idx The indices of the pixels which have new values,
+                 such as @c MLX_Cam.updated_idx()
+        @returns The number of foreground pixels among those updated
+        """
+        mean = self.mean
+        var = self.var
+        mask = self.mask
+        seen = self._seen
+        rate = self.rate
+        fg_rate = self.fg_rate
+        k2 = self.k * self.k
+        min_var = self.min_std * self.min_std
+        hot = self.hot
+        check_hot = hot is not None
+
+        count = 0
+        for idx in update_idx:
+            v = values[idx]
+            if not seen[idx]:
+                if check_hot and v >= hot:
+                    mask[idx] = 1
+                    count += 1
+                    continue
+                seen[idx] = 1
+                mean[idx] = v
+                var[idx] = min_var
+                mask[idx] = 0
+                continue
+
+            d = v - mean[idx]
+            spread = var[idx]
+            if spread < min_var:
+                spread = min_var
+            if d > 0 and d*d > k2*spread:
+                # a target's own deviation mustn't widen the background's
+                # spread, or a target which stands still would be absorbed
+                # within a few dozen updates instead of about 1 / fg_rate
+                mask[idx] = 1
+                count += 1
+                mean[idx] += fg_rate*d
+            else:
+                mask[idx] = 0
+                mean[idx] += rate*d
+                var[idx] = (1 - rate)*(var[idx] + rate*d*d)
+
+        self.count = count
+        return count
@@ -0,0 +1,287 @@
+"""!
+@file blobs.py
+This file contains a connected-component labeling engine which finds warm
+blobs in images from the MLX90640 thermal camera.
+
+Pixels at or above a threshold are grouped into blobs in two raster passes
+using a union-find table of provisional labels, with either 4- or
+8-connectivity on the 2-D sensor grid. All memory is allocated when the
+labeler is created; labeling a frame only overwrites those buffers, so it
+can run every frame in a @c cotask task without fragmenting the heap.
+
+@author Adam Westfall
+@author Jason Davis
+@author Conor Fraser
+@copyright Creative Commons CC BY: Please visit https://creativecommons.org/licenses/by/4.0/ to learn more
+"""
+
+import array
+import micropython
+from mlx90640.calibration import NUM_ROWS, NUM_COLS
+
+
+class BlobLabeler:
+    """!
+    @brief   Class which labels the warm blobs in a thermal image and keeps
+             statistics on each of them in a fixed-capacity table.
+    @details After @c label() has run, blob @c k (from 0 to @c count - 1)
+             is described by @c area[k], @c cx[k] and @c cy[k] (centroid
+             column and row), @c min_col[k], @c max_col[k], @c min_row[k],
+             @c max_row[k] (bounding box), @c peak[k] and @c peak_idx[k]
+             (hottest value and its pixel) and @c mean[k]. Pixels of blob
+             @c k are marked with @c k + 1 in @c labels; background and
+             blobs which didn't fit in the table are marked with 0.
+    """
+
+    def __init__(self, width=NUM_COLS, height=NUM_ROWS, connectivity=8,
+                 capacity=16):
+        """!
+        @brief   Allocate the label image, union-find table and blob table.
+        @param   width The width of the image in pixels
+        @param   height The height of the image in pixels
+        @param   connectivity 4 to join only horizontal and vertical
+                 neighbours, or 8 to join diagonal neighbours as well
+        @param   capacity The largest number of blobs to keep statistics on
+        """
+        if connectivity not in (4, 8):
+            raise ValueError("connectivity must be 4 or 8")
+
+        ## The width of the image in pixels
+        self.width = width
+        ## The height of the image in pixels
+        self.height = height
+        ## Either 4 or 8, the neighbourhood used to join pixels
+        self.connectivity = connectivity
+        ## The maximum number of blobs in the table
+        self.capacity = capacity
+
+        size = width * height
+        ## Per-pixel blob label, 0 for background
+        self.labels = array.array('H', (0 for _ in range(size)))
+
+        # A checkerboard is the worst case, needing one provisional label for
+        # every other pixel; label 0 is reserved for the background
+        max_labels = size // 2 + 2
+        self._parent = array.array('H', (0 for _ in range(max_labels)))
+        self._final = array.array('H', (0 for _ in range(max_labels)))
+
+        ## The number of blobs in the table after the last @c label()
+        self.count = 0
+        ## The number of blobs found which didn't fit in the table
+        self.overflow = 0
+
+        zeros = [0] * capacity
+        self.area = array.array('H', zeros)
+        self.cx = array.array('f', zeros)
+        self.cy = array.array('f', zeros)
+        self.min_col = array.array('B', zeros)
+        self.max_col = array.array('B', zeros)
+        self.min_row = array.array('B', zeros)
+        self.max_row = array.array('B', zeros)
+        self.peak = array.array('f', zeros)
+        self.peak_idx = array.array('H', zeros)
+        self.mean = array.array('f', zeros)
+        ## Blob indices in order of falling peak value, see @c ranked()
+        self.order = array.array('B', zeros)
+
+
+    @micropython.native
+    def _find(self, lbl):
+        """!
+        @brief   Find the root of a provisional label, halving the path.
+        """
+        parent = self._parent
+        while parent[lbl] != lbl:
+            parent[lbl] = parent[parent[lbl]]
+            lbl = parent[lbl]
+        return lbl
+
+
+    @micropython.native
+    def _union(self, a, b):
+        """!
+        @brief   Merge the sets of two provisional labels; the smaller root
+                 becomes the root of the merged set.
+        @returns The root of the merged set
+        """
+        a = self._find(a)
+        b = self._find(b)
+        if a < b:
+            self._parent[b] = a
+            return a
+        if b < a:
+            self._parent[a] = b
+        return b
+
+
+    @micropython.native
+    def label(self, values, threshold, mask=None):
+        """!
+        @brief   Find the blobs of pixels which are at least @c threshold.
+        @param   values A flat array of pixel values in sensor order, such
+                 as a temperature map in degrees C
+        @param   threshold The lowest value of a blob pixel; NaN and inf
+                 pixels are always background
+        @param   mask An optional sequence of per-pixel flags; pixels whose
+                 flag is 0 are treated as background, for example to keep
+                 only the foreground found by a background model
+        @returns The number of blobs in the table
+        """
+        width = self.width
+        height = self.height
+        labels = self.labels
+        parent = self._parent
+        diagonal = self.connectivity == 8
+
+        # First pass: provisional labels, recording equivalences. NaN and
+        # inf, e.g. from a pixel without a real temperature, are background
+        inf = float('inf')
+        next_label = 1
+        idx = 0
+        for row in range(height):
+            for col in range(width):
+                v = values[idx]
+                if not threshold <= v < inf or (mask is not None and not mask[idx]):
+                    labels[idx] = 0
+                    idx += 1
+                    continue
+
+                lbl = 0
+                if col > 0 and labels[idx - 1]:
+                    lbl = labels[idx - 1]
+                if row > 0:
+                    up = idx - width
+                    if labels[up]:
+                        lbl = self._union(lbl, labels[up]) if lbl else labels[up]
+                    if diagonal:
+                        if col > 0 and labels[up - 1]:
+                            n = labels[up - 1]
+                            lbl = self._union(lbl, n) if lbl else n
+                        if col < width - 1 and labels[up + 1]:
+                            n = labels[up + 1]
+                            lbl = self._union(lbl, n) if lbl else n
+
+                if not lbl:
+                    lbl = next_label
+                    parent[lbl] = lbl
+                    next_label += 1
+                labels[idx] = lbl
+                idx += 1
+
+        # Number the root labels consecutively from 1 in raster order
+        final = self._final
+        count = 0
+        overflow = 0
+        capacity = self.capacity
+        for lbl in range(1, next_label):
+            root = self._find(lbl)
+            if root == lbl:
+                if count < capacity:
+                    count += 1
+                    final[lbl] = count
+                else:
+                    overflow += 1
+                    final[lbl] = 0
+            else:
+                final[lbl] = final[root]
+
+        area = self.area
+        cx = self.cx
+        cy = self.cy
+        min_col = self.min_col
+        max_col = self.max_col
+        min_row = self.min_row
+        max_row = self.max_row
+        peak = self.peak
+        peak_idx = self.peak_idx
+        mean = self.mean
+        for k in range(count):
+            area[k] = 0
+            cx[k] = cy[k] = mean[k] = 0.0
+            min_col[k] = width
+            min_row[k] = height
+            max_col[k] = max_row[k] = 0
+
+        # Second pass: final labels and blob statistics
+        idx = 0
+        for row in range(height):
+            for col in range(width):
+                lbl = labels[idx]
+                if lbl:
+                    lbl = final[lbl]
+                    labels[idx] = lbl
+                if lbl:
+                    k = lbl - 1
+                    v = values[idx]
+                    if area[k] == 0 or v > peak[k]:
+                        peak[k] = v
+                        peak_idx[k] = idx
+                    area[k] += 1
+                    cx[k] += col
+                    cy[k] += row
+                    mean[k] += v
+                    if col < min_col[k]:
+                        min_col[k] = col
+                    if col > max_col[k]:
+                        max_col[k] = col
+                    if row < min_row[k]:
+                        min_row[k] = row
+                    if row > max_row[k]:
+                        max_row[k] = row
+                idx += 1
+
+        for k in range(count):
+            n = area[k]
+            cx[k] /= n
+            cy[k] /= n
+            mean[k] /= n
+
+        self.count = count
+        self.overflow = overflow
+        return count
+
+
+    def ranked(self):
+        """!
+        @brief   Order the blobs from hottest to coolest by peak value.
+        @details The order is kept in the preallocated @c order array, for
+                 consumers which take the most important blobs first such
+                 as @c tracker.Tracker.update().
+        @returns @c order, whose first @c count entries are blob indices
+        """
+        order = self.order
+        peak = self.peak
+        for k in range(self.count):
+            # insertion sort; the table holds only a few blobs
+            pos = k
+            while pos > 0 and peak[order[pos - 1]] < peak[k]:
+                order[pos] = order[pos - 1]
+                pos -= 1
+            order[pos] = k
+        return order
+
+
+    def largest(self):
+        """!
+        @brief   Find the blob with the most pixels.
+        @returns The index of the largest blob in the table, or -1 if no
+                 blobs were found
+        """
+        best = -1
+        for k in range(self.count):
+            if best < 0 or self.area[k] > self.area[best]:
+                best = k
+        return best
+
+
+    def hottest(self):
+        """!
+        @brief   Find the blob with the highest peak value.
+        @returns The index of the hottest blob in the table, or -1 if no
+                 blobs were found
+        """
+        best = -1
+        for k in range(self.count):
+            if best < 0 or self.peak[k] > self.peak[best]:
+                best = k
+        return best
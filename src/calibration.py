@@ -1,4 +1,5 @@
 from array import array
+from ucollections import namedtuple
 from mlx90640.utils import (
     Struct, 
     StructProto,
@@ -24,11 +25,11 @@ CC_PROTO = StructProto((
 ))
 
 def _read_cc_iter(iface, base, size):
-    buf = bytearray(REG_SIZE)
-    struct = Struct(buf, CC_PROTO)
-    for addr_off in range(size // 4):
-        cc_addr = base + addr_off
-        iface.read_into(cc_addr, buf)
+    # four coefficients per word, all words fetched in one transfer
+    data = bytearray(size // 4 * REG_SIZE)
+    iface.read_into(base, data)
+    for offset in range(0, len(data), REG_SIZE):
+        struct = Struct(data[offset:offset+REG_SIZE], CC_PROTO)
         yield struct['0']
         yield struct['1']
         yield struct['2']
@@ -59,16 +60,15 @@ class PixelCalibrationData:
         pix_count = NUM_ROWS * NUM_COLS
         self._data = bytearray(pix_count * REG_SIZE)
 
-        failed = []
-        buf = bytearray(REG_SIZE)
-        for idx in range(pix_count):
-            offset = idx * REG_SIZE
-            iface.read_into(PIX_CALIB_ADDRESS + offset, buf)
-            if buf != bytes(REG_SIZE):
-                self._data[offset:offset+REG_SIZE] = buf
-            else:
-                failed.append(idx)
-        self.failed = tuple(failed)
+        # one word per pixel at consecutive addresses, read as a single block
+        iface.read_into(PIX_CALIB_ADDRESS, self._data)
+
+        # an all-zero word marks a pixel that failed factory calibration
+        data = self._data
+        self.failed = tuple(
+            idx for idx in range(pix_count)
+            if not (data[idx*REG_SIZE] or data[idx*REG_SIZE + 1])
+        )
 
     def __len__(self):
         return len(self._data)//REG_SIZE
@@ -81,8 +81,15 @@ class PixelCalibrationData:
 
 TEMP_K = 273.15
 
+# Per-pixel arrays and range constants derived from the EEPROM. These make up
+# most of the work done by CameraCalibration and can be restored from a cache.
+CalibrationArrays = namedtuple('CalibrationArrays', (
+    'pix_os_ref', 'pix_kta', 'pix_alpha', 'il_offset', 'outliers',
+    'kv_avg', 'ksto', 'ct', 'alpha_ext',
+))
+
 class CameraCalibration:
-    def __init__(self, iface, eeprom, *, emissivity=1, use_tgc=False):
+    def __init__(self, iface, eeprom, *, emissivity=1, use_tgc=False, cached=None):
         self.emissivity = emissivity
 
         # restore VDD sensor parameters
@@ -103,21 +110,12 @@ class CameraCalibration:
 
         # pixel calibration data
         self.pix_data = PixelCalibrationData(iface)
-        self.pix_os_ref = array('h', self._calc_pix_os_ref(iface, eeprom))
-        self.outliers = tuple(idx for idx, data in enumerate(self.pix_data) if data['outlier'])
 
         # IR data compensation
         self.kta_scale_1 = 1 << (eeprom['kta_scale_1'] + 8)
         self.kta_scale_2 = 1 << eeprom['kta_scale_2']
-        self.pix_kta = array('f', self._calc_pix_kta(eeprom))
-
         self.kv_scale = 1 << eeprom['kv_scale']
-        self.kv_avg = (
-            # index by [row % 2][col % 2]
-            (eeprom['kv_avg_re_ce']/self.kv_scale, eeprom['kv_avg_re_co']/self.kv_scale),
-            (eeprom['kv_avg_ro_ce']/self.kv_scale, eeprom['kv_avg_ro_co']/self.kv_scale),
-        )
-        
+
         # IR gradient compensation
 
         # tgc only available for device type 'C'
@@ -134,7 +132,6 @@ class CameraCalibration:
             self.kv_cp = eeprom['kv_cp'] / self.kv_scale
 
         # sensitivity normalization
-        self.pix_alpha = array('f', self._calc_pix_alpha_ref(iface, eeprom))
         self.ksta = eeprom['ksta'] / 8192.0
 
         if use_tgc:
@@ -148,30 +145,68 @@ class CameraCalibration:
         self.il_chess_c1 = eeprom['il_chess_c1'] / 16.0
         self.il_chess_c2 = eeprom['il_chess_c2'] / 2.0
         self.il_chess_c3 = eeprom['il_chess_c3'] / 8.0
-        self.il_offset = array('f', self._calc_il_offset())
 
         # temperature calculation
         self.drift = 0  # temperature drift correction
-
         self.ksto_scale = 1 << (eeprom['ksto_scale'] + 8)
+
+        if cached is None:
+            cached = self._calc_arrays(iface, eeprom)
+        self.pix_os_ref = cached.pix_os_ref
+        self.pix_kta = cached.pix_kta
+        self.pix_alpha = cached.pix_alpha
+        self.il_offset = cached.il_offset
+        self.outliers = cached.outliers
+        self.kv_avg = cached.kv_avg
+        self.ksto = cached.ksto
+        self.ct = cached.ct
+        self.alpha_ext = cached.alpha_ext
+
+        # kv_avg expanded to one coefficient per pixel for the compensation loop
+        self.pix_kv = array('f', self._calc_pix_kv())
+
+    def get_arrays(self):
+        return CalibrationArrays(
+            self.pix_os_ref, self.pix_kta, self.pix_alpha, self.il_offset,
+            self.outliers, self.kv_avg, self.ksto, self.ct, self.alpha_ext,
+        )
+
+    def _calc_arrays(self, iface, eeprom):
+        pix_os_ref = array('h', self._calc_pix_os_ref(iface, eeprom))
+        outliers = tuple(idx for idx, data in enumerate(self.pix_data) if data['outlier'])
+        pix_kta = array('f', self._calc_pix_kta(eeprom))
+        pix_alpha = array('f', self._calc_pix_alpha_ref(iface, eeprom))
+        il_offset = array('f', self._calc_il_offset())
+
+        kv_avg = (
+            # index by [row % 2][col % 2]
+            (eeprom['kv_avg_re_ce']/self.kv_scale, eeprom['kv_avg_re_co']/self.kv_scale),
+            (eeprom['kv_avg_ro_ce']/self.kv_scale, eeprom['kv_avg_ro_co']/self.kv_scale),
+        )
+
         ksto1 = eeprom['ksto_1'] / self.ksto_scale
         ksto2 = eeprom['ksto_2'] / self.ksto_scale
         ksto3 = eeprom['ksto_3'] / self.ksto_scale
         ksto4 = eeprom['ksto_4'] / self.ksto_scale
-        self.ksto = (ksto1, ksto2, ksto3, ksto4)
+        ksto = (ksto1, ksto2, ksto3, ksto4)
 
         step = eeprom['step'] * 10
         ct1 = const(-40)
         ct2 = const(0)
         ct3 = eeprom['ct3'] * step
         ct4 = eeprom['ct4'] * step + ct3
-        self.ct = (ct1, ct2, ct3, ct4)
+        ct = (ct1, ct2, ct3, ct4)
 
         alpha_1 = 1.0/(1.0 + ksto1*(ct2 - ct1))
         alpha_2 = 1.0
         alpha_3 = (1.0 + ksto2*(ct3 - ct2))
         alpha_4 = alpha_3*(1.0 + ksto3*(ct4 - ct3))
-        self.alpha_ext = (alpha_1, alpha_2, alpha_3, alpha_4)
+        alpha_ext = (alpha_1, alpha_2, alpha_3, alpha_4)
+
+        return CalibrationArrays(
+            pix_os_ref, pix_kta, pix_alpha, il_offset, outliers,
+            kv_avg, ksto, ct, alpha_ext,
+        )
 
     def _calc_pix_os_ref(self, iface, eeprom):
         offset_avg = eeprom['pix_os_average']
@@ -226,6 +261,12 @@ class CameraCalibration:
                 kta_rc = kta_avg[row % 2][col % 2]
                 yield (kta_rc + kta_ee * self.kta_scale_2)/self.kta_scale_1
 
+    def _calc_pix_kv(self):
+        for row in range(NUM_ROWS):
+            kv_row = self.kv_avg[row % 2]
+            for col in range(NUM_COLS):
+                yield kv_row[col % 2]
+
     def _calc_il_offset(self):
         for idx in range(NUM_ROWS*NUM_COLS):
             il_pattern = idx//32 - (idx//64)*2
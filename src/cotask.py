@@ -28,9 +28,372 @@ ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
 SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
-import gc                              # Memory allocation garbage collector
-import utime                           # Micropython version of time library
-import micropython                     # This shuts up incorrect warnings
+import array                           # Compact arrays for profiling data
+import struct                          # Packing of binary profile dumps
+
+# The scheduler can also run under CPython, e.g. in virtual time for testing
+try:
+    import utime                       # Micropython version of time library
+except ImportError:
+    utime = None
+try:
+    import micropython                 # This shuts up incorrect warnings
+except ImportError:
+    class micropython:
+        native = staticmethod(lambda fun: fun)
+
+# machine.idle() waits for the next interrupt (WFI on an STM32), which comes
+# at least every millisecond from the SysTick timer; ports without it sleep
+try:
+    from machine import idle as _idle
+except ImportError:
+    _idle = None
+
+## The longest time in microseconds for which the deadline scheduler sleeps
+#  before checking again for tasks made ready by @c go() on ports which have
+#  no @c machine.idle()
+IDLE_STEP_US = 1000
+
+## The period of the microsecond tick counter, after which it wraps around
+#  to zero; this is @c utime.ticks_add(utime.ticks_max(), 1) on most ports
+TICKS_PERIOD = 1 << 30
+
+
+def _ticks_diff(end, start):
+    """!
+    Find the signed difference between two tick counts as does
+    @c utime.ticks_diff(), for clocks which don't use @c utime.
+    """
+    half = TICKS_PERIOD >> 1
+    return ((end - start + half) & (TICKS_PERIOD - 1)) - half
+
+
+def _ticks_add(ticks, delta):
+    """!
+    Add a number of ticks to a tick count as does @c utime.ticks_add(), for
+    clocks which don't use @c utime.
+    """
+    return (ticks + delta) & (TICKS_PERIOD - 1)
+
+
+class RealClock:
+    """!
+    A clock which gives the real time to the scheduler. On MicroPython the
+    @c utime tick functions are used directly; under CPython, a tick counter
+    with the same period is made from @c time.perf_counter_ns().
+
+    A clock has the methods @c ticks_us(), @c ticks_diff(), @c ticks_add()
+    and @c wait(us), which waits for up to a given number of microseconds
+    or until an interrupt, and the attribute @c virtual, which is @c True if
+    the clock's time only moves when told to.
+    """
+
+    ## Real time passes by itself
+    virtual = False
+
+    def __init__(self):
+        """!
+        Set up the clock's tick functions.
+        """
+        if utime is not None:
+            self.ticks_us = utime.ticks_us
+            self.ticks_diff = utime.ticks_diff
+            self.ticks_add = utime.ticks_add
+            self._sleep_us = utime.sleep_us
+        else:
+            import time
+            ns = time.perf_counter_ns
+            self.ticks_us = lambda: (ns() // 1000) & (TICKS_PERIOD - 1)
+            self.ticks_diff = _ticks_diff
+            self.ticks_add = _ticks_add
+            self._sleep_us = lambda us: time.sleep(us / 1000000)
+
+
+    def wait(self, us):
+        """!
+        Wait for at most the given time, returning early if an interrupt
+        occurs where @c machine.idle() is available.
+        @param us The longest time to wait in microseconds
+        """
+        if _idle is not None:
+            _idle()
+        else:
+            self._sleep_us(min(us, IDLE_STEP_US))
+
+
+class VirtualClock:
+    """!
+    A clock whose time only moves when tasks run or the scheduler waits, so
+    that hours of running a task list take seconds and give the same timing
+    every time.
+
+    The time taken by each run of a task is given by a run time model, and
+    is added to the clock just after the task yields, so that profiles and
+    traces show the modeled times. The model maps a task's name to either a
+    number of microseconds, a @c (shortest, longest) range from which a time
+    is drawn with a seeded pseudo-random generator, or a function
+    @c model(task, state) which returns the time. Waiting simply moves the
+    clock to the end of the wait. Schedulers which poll, such as
+    @c pri_sched(), need time to pass as they read the clock, which is
+    given by @c read_us. The tick count wraps around as the real
+    one does, and by default starts 10 seconds before it wraps.
+    """
+
+    ## Virtual time only passes when tasks run or the scheduler waits
+    virtual = True
+
+    def __init__(self, model=None, default_us=100, overhead_us=0, read_us=0,
+                 start=TICKS_PERIOD - 10000000, seed=1):
+        """!
+        Create a virtual clock.
+        @param model A dictionary mapping task names to run times, ranges of
+               run times or functions which return run times
+        @param default_us The run time of tasks which aren't in the model
+        @param overhead_us A time added to every task run to account for
+               the scheduler's own overhead
+        @param read_us A time added every time the clock is read
+        @param start The tick count at which the clock starts
+        @param seed The seed of the pseudo-random run time generator
+        """
+        self.model = model if model is not None else {}
+        self.default_us = default_us
+        self.overhead_us = overhead_us
+        self.read_us = read_us
+        self._now = start & (TICKS_PERIOD - 1)
+        self._seed = seed
+
+        ## The total virtual time which has passed in microseconds, which
+        #  unlike the tick count doesn't wrap around
+        self.elapsed = 0
+
+        self.ticks_diff = _ticks_diff
+        self.ticks_add = _ticks_add
+
+
+    def ticks_us(self):
+        """!
+        Get the virtual time.
+        @return The virtual tick count in microseconds
+        """
+        if self.read_us:
+            self.advance(self.read_us)
+        return self._now
+
+
+    def advance(self, us):
+        """!
+        Move the virtual time forward.
+        @param us The number of microseconds by which to move the time
+        """
+        self._now = (self._now + us) & (TICKS_PERIOD - 1)
+        self.elapsed += us
+
+
+    def wait(self, us):
+        """!
+        Wait by moving the time to the end of the wait.
+        @param us The time to wait in microseconds
+        """
+        self.advance(us)
+
+
+    def _random(self, low, high):
+        """!
+        Draw a reproducible pseudo-random integer from @c low to @c high.
+        """
+        self._seed = (self._seed * 1103515245 + 12345) & 0x7FFFFFFF
+        return low + (self._seed >> 8) % (high - low + 1)
+
+
+    def ran(self, task, state):
+        """!
+        Account for a run of a task by moving the time forward by its
+        modeled run time.
+        @param task The task which has just run
+        @param state The state which the task yielded
+        """
+        run_us = self.model.get(task.name, self.default_us)
+        if callable(run_us):
+            run_us = run_us(task, state)
+        elif isinstance(run_us, tuple):
+            run_us = self._random(run_us[0], run_us[1])
+        self.advance(run_us + self.overhead_us)
+
+
+## The clock used by tasks and task lists which aren't given one
+default_clock = RealClock()
+
+
+## The number of buckets in a @c LogHistogram. Values from 0 to 3 have a
+#  bucket each; above that, each doubling of the value is split into four
+#  buckets, up to 2 ** 22 microseconds (about 4 seconds)
+HIST_BUCKETS = 84
+
+## Identifies a binary profile dump written by @c TaskList.dump_profile()
+PROFILE_MAGIC = b'CTPF'
+
+## The version of the binary profile dump format
+PROFILE_VERSION = 1
+
+## Identifies a binary trace dump written by @c TaskList.dump_trace()
+TRACE_MAGIC = b'CTTR'
+
+## The version of the binary trace dump format
+TRACE_VERSION = 1
+
+## The number of state transitions kept by a traced task unless it's told
+#  otherwise
+TRACE_DEPTH = 32
+
+
+class LogHistogram:
+    """!
+    A histogram of times in microseconds with buckets whose width grows with
+    the time, so that a fixed, small number of counters covers times from a
+    few microseconds to seconds with a resolution of about a quarter.
+
+    The counts are kept in an array which is allocated when the histogram
+    is created, so adding a value doesn't allocate memory. Percentiles are
+    given as the largest value in the bucket which holds them, so they are
+    never optimistic.
+    """
+
+    def __init__(self):
+        """!
+        Create an empty histogram.
+        """
+        ## The number of values in each bucket
+        self.counts = array.array('I', bytes(4 * HIST_BUCKETS))
+
+        ## The number of values which have been added
+        self.count = 0
+
+
+    def clear(self):
+        """!
+        Empty the histogram without reallocating its counts.
+        """
+        counts = self.counts
+        for bucket in range(HIST_BUCKETS):
+            counts[bucket] = 0
+        self.count = 0
+
+
+    @micropython.native
+    def add(self, value):
+        """!
+        Count a value in its bucket; negative values count as zero and
+        values above the range count in the last bucket.
+        @param value The value, usually a time in microseconds
+        """
+        if value < 4:
+            bucket = value if value > 0 else 0
+        else:
+            # Shift the value down to 4...7, its top three bits; the number
+            # of shifts picks the group of four buckets and the two bits
+            # under the top one pick the bucket in the group
+            shift = 0
+            while value >= 8:
+                value >>= 1
+                shift += 1
+            bucket = 4 * shift + value
+            if bucket >= HIST_BUCKETS:
+                bucket = HIST_BUCKETS - 1
+        self.counts[bucket] += 1
+        self.count += 1
+
+
+    @staticmethod
+    def upper(bucket):
+        """!
+        Find the largest value which is counted in a bucket.
+        @param bucket The index of the bucket
+        @return The largest value in the bucket
+        """
+        if bucket < 4:
+            return bucket
+        shift = (bucket - 4) >> 2
+        return ((5 + (bucket & 3)) << shift) - 1
+
+
+    def percentile(self, percent):
+        """!
+        Find a percentile of the values in the histogram.
+        @param percent The percentage of values which are at most the
+               returned value, such as 50 for the median
+        @return The largest value of the bucket holding the percentile, or 0
+                if the histogram is empty
+        """
+        target = (self.count * percent + 99) // 100
+        total = 0
+        for bucket in range(HIST_BUCKETS):
+            total += self.counts[bucket]
+            if total >= target and total > 0:
+                return LogHistogram.upper(bucket)
+        return 0
+
+
+def load_profile(data):
+    """!
+    Read a binary profile dump written by @c TaskList.dump_profile(), for
+    example on a PC which has been sent the dump.
+    @param data The bytes of the dump
+    @return A dictionary mapping each task's name to a tuple of its run
+            time, lateness and jitter histograms
+    """
+    magic, version, buckets, num_tasks = struct.unpack_from('<4sBBH', data)
+    if magic != PROFILE_MAGIC or version != PROFILE_VERSION:
+        raise ValueError("not a task profile dump")
+    if buckets != HIST_BUCKETS:
+        raise ValueError("profile dump has a different number of buckets")
+
+    profiles = {}
+    pos = 8
+    for _ in range(num_tasks):
+        length = data[pos]
+        name = bytes(data[pos + 1:pos + 1 + length]).decode()
+        pos += 1 + length
+        hists = []
+        for _ in range(3):
+            hist = LogHistogram()
+            hist.counts = array.array('I', struct.unpack_from(
+                '<' + 'I' * HIST_BUCKETS, data, pos))
+            hist.count = sum(hist.counts)
+            pos += 4 * HIST_BUCKETS
+            hists.append(hist)
+        profiles[name] = tuple(hists)
+    return profiles
+
+
+def load_trace(data):
+    """!
+    Read a binary trace dump written by @c TaskList.dump_trace(), for
+    example on a PC which has been sent the dump.
+    @param data The bytes of the dump
+    @return A tuple of the clock's tick count when the dump was made and a
+            dictionary mapping each traced task's name to a tuple of its
+            total number of transitions, the tick count of its latest
+            transition and a list of its kept (time since the previous
+            transition, state) records, oldest first
+    """
+    magic, version, num_tasks, now = struct.unpack_from('<4sBxHI', data)
+    if magic != TRACE_MAGIC or version != TRACE_VERSION:
+        raise ValueError("not a task trace dump")
+
+    traces = {}
+    pos = 12
+    for _ in range(num_tasks):
+        length = data[pos]
+        name = bytes(data[pos + 1:pos + 1 + length]).decode()
+        pos += 1 + length
+        kept, count, last_time = struct.unpack_from('<HII', data, pos)
+        pos += 10
+        records = []
+        for _ in range(kept):
+            records.append(struct.unpack_from('<Ih', data, pos))
+            pos += 6
+        traces[name] = (count, last_time, records)
+    return now, traces
 
 
 class Task:
@@ -70,7 +433,8 @@ class Task:
 
 
     def __init__(self, run_fun, name="NoName", priority=0, period=None,
-                 profile=False, trace=False, shares=()):
+                 profile=False, trace=False, shares=(), clock=None,
+                 trace_depth=TRACE_DEPTH):
         """!
         Initialize a task object so it may be run by the scheduler.
 
@@ -88,10 +452,17 @@ class Task:
                The time can be given in a @c float or @c int; it will be 
                converted to microseconds for internal use by the scheduler.
         @param profile Set to @c True to enable run-time profiling 
-        @param trace Set to @c True to generate a list of transitions between
-               states. @b Note: This slows things down and allocates memory.
+        @param trace Set to @c True to keep a trace of the latest transitions
+               between states. The trace is kept in a ring buffer allocated
+               here, so tracing can be left on. States which aren't
+               integers that fit in 16 bits, such as @c None, are recorded
+               as -1.
+        @param trace_depth The number of transitions kept in the trace
         @param shares A list or tuple of shares and queues used by this task.
                If no list is given, no shares are passed to the task
+        @param clock The clock which times the task, by default the module's
+               @c default_clock. A task list gives its own clock to tasks
+               added to it.
         """
         # The function which is run to implement this task's code. Since it 
         # is a generator, we "run" it here, which doesn't actually run it but
@@ -104,6 +475,9 @@ class Task:
         ## The name of the task, hopefully a short and descriptive string.
         self.name = name
 
+        # The clock which gives the time for run times and profiling
+        self._clock = clock if clock is not None else default_clock
+
         ## The task's priority, an integer with higher numbers meaning higher 
         #  priority. 
         self.priority = int(priority)
@@ -115,25 +489,49 @@ class Task:
         #  @c go() method. 
         if period != None:
             self.period = int(period * 1000)
-            self._next_run = utime.ticks_us() + self.period
+            self._next_run = self._clock.ticks_add(self._clock.ticks_us(),
+                                                   self.period)
         else:
             self.period = period
             self._next_run = None
 
+        # The run time for which the task was last made ready, or None if it
+        # was started by go() or has run since
+        self._due = None
+
+        # The task list to which the task has been added, if any
+        self._task_list = None
+
         # Flag which causes the task to be profiled, in which the execution
         #  time of the @c run() method is measured and basic statistics kept. 
         self._prof = profile
+
+        # Histograms of run time, lateness and period-to-period jitter, kept
+        # only if profiling, and the start time of the last timed run
+        if profile:
+            self._run_hist = LogHistogram()
+            self._late_hist = LogHistogram()
+            self._jitter_hist = LogHistogram()
+        self._prev_start = None
         self.reset_profile()
 
         # The previous state in which the task last ran. It is used to watch
         # for and track state transitions.
         self._prev_state = 0
 
-        # If transition tracing has been enabled, create an empty list in 
-        # which to store transition (time, to-state) stamps
+        # If transition tracing has been enabled, create a ring buffer of
+        # (time since the previous transition, to-state) records. The head is
+        # where the next record goes and the count is of all transitions,
+        # including those which have been overwritten
         self._trace = trace
-        self._tr_data = []
-        self._prev_time = utime.ticks_us()
+        if trace:
+            self._tr_dt = array.array('I', bytes(4 * trace_depth))
+            self._tr_state = array.array('h', bytes(2 * trace_depth))
+        self._tr_head = 0
+        self._tr_count = 0
+
+        # The time of the latest transition, from which the next is timed
+        self._prev_time = self._clock.ticks_us()
 
         ## Flag which is set true when the task is ready to be run by the
         #  scheduler
@@ -150,52 +548,87 @@ class Task:
         @return @c True if the task ran or @c False if it did not
         """
         if self.ready():
-
-            # Reset the go flag for the next run
-            self.go_flag = False
-
-            # If profiling, save the start time
-            if self._prof:
-                stime = utime.ticks_us()
-
-            # Run the method belonging to the state which should be run next
-            curr_state = next(self._run_gen)
-
-            # If profiling or tracing, save timing data
-            if self._prof or self._trace:
-                etime = utime.ticks_us()
-
-            # If profiling, save timing data
-            if self._prof:
-                self._runs += 1
-                runt = utime.ticks_diff(etime, stime)
-                if self._runs > 2:
-                    self._run_sum += runt
-                    if runt > self._slowest:
-                        self._slowest = runt
-
-            # If transition logic tracing is on, record a transition; if not,
-            # ignore the state. If out of memory, switch tracing off and 
-            # run the memory allocation garbage collector
-            if self._trace:
-                try:
-                    if curr_state != self._prev_state:
-                        self._tr_data.append(
-                            (utime.ticks_diff(etime, self._prev_time),
-                             curr_state))
-                except MemoryError:
-                    self._trace = False
-                    gc.collect()
-
-                self._prev_state = curr_state
-                self._prev_time = etime
-
+            self._run()
             return True
-
         else:
             return False
 
 
+    def _run(self):
+        """!
+        Run the task's generator up to its next @c yield, keeping the
+        profile and trace if they're enabled. The scheduler calls this once
+        it has decided that the task is ready.
+        """
+        clock = self._clock
+
+        # Reset the go flag for the next run
+        self.go_flag = False
+
+        # If profiling, save the start time and, for a timed run, how late
+        # the task is starting
+        if self._prof:
+            stime = clock.ticks_us()
+            if self._due is not None:
+                late = clock.ticks_diff(stime, self._due)
+                self._late_sum += late
+                if late > self._latest:
+                    self._latest = late
+                self._late_hist.add(late)
+
+                # Jitter is how far the time between timed runs is from
+                # the period
+                if self._prev_start is not None:
+                    jitter = clock.ticks_diff(stime, self._prev_start) \
+                        - self.period
+                    self._jitter_hist.add(jitter if jitter > 0 else -jitter)
+                self._prev_start = stime
+        self._due = None
+
+        # Run the method belonging to the state which should be run next
+        curr_state = next(self._run_gen)
+
+        # In virtual time, the run takes as long as the run time model says
+        if clock.virtual:
+            clock.ran(self, curr_state)
+
+        # If profiling or tracing, save timing data
+        if self._prof or self._trace:
+            etime = clock.ticks_us()
+
+        # If profiling, save timing data
+        if self._prof:
+            self._runs += 1
+            runt = clock.ticks_diff(etime, stime)
+            if self._runs > 2:
+                self._run_sum += runt
+                if runt > self._slowest:
+                    self._slowest = runt
+                self._run_hist.add(runt)
+
+        # If transition logic tracing is on, record a transition in the ring
+        # buffer, overwriting the oldest; if not, ignore the state
+        if self._trace:
+            if curr_state != self._prev_state:
+                head = self._tr_head
+                self._tr_dt[head] = clock.ticks_diff(etime, self._prev_time)
+                # Only 16 bit integers fit in the buffer; anything else,
+                # such as None, is recorded as -1 rather than crash the task
+                if isinstance(curr_state, int) \
+                        and -32768 <= curr_state <= 32767:
+                    self._tr_state[head] = curr_state
+                else:
+                    self._tr_state[head] = -1
+                head += 1
+                if head >= len(self._tr_dt):
+                    head = 0
+                self._tr_head = head
+                self._tr_count += 1
+                self._prev_time = etime
+
+            self._prev_state = curr_state
+
+
     @micropython.native
     def ready(self) -> bool:
         """!
@@ -205,25 +638,35 @@ class Task:
         go. This method may be overridden in descendent classes to implement
         some other behavior.
         """
-        # If this task uses a timer, check if it's time to run run() again. If
-        # so, set go flag and set the timer to go off at the next run time
+        # If this task uses a timer, check if it's time to run run() again
         if self.period != None:
-            late = utime.ticks_diff(utime.ticks_us(), self._next_run)
-            if late > 0:
-                self.go_flag = True
-                self._next_run = utime.ticks_diff(self.period, 
-                                                  -self._next_run)
-
-                # If keeping a latency profile, record the data
-                if self._prof:
-                    self._late_sum += late
-                    if late > self._latest:
-                        self._latest = late
+            self._release(self._clock.ticks_us())
 
         # If the task doesn't use a timer, we rely on go_flag to signal ready
         return self.go_flag
 
 
+    @micropython.native
+    def _release(self, now) -> bool:
+        """!
+        This method makes a timed task ready if its run time has come.
+        If so, the go flag is set and the timer is set to go off at the next
+        run time. The lateness is profiled when the task starts running.
+        @param now The current time from the task's clock
+        @return @c True if the task's run time had come
+        """
+        late = self._clock.ticks_diff(now, self._next_run)
+        if late < 0:
+            return False
+
+        # Keep the earliest run time if the task is already waiting to run
+        if not self.go_flag or self._due is None:
+            self._due = self._next_run
+        self.go_flag = True
+        self._next_run = self._clock.ticks_add(self._next_run, self.period)
+        return True
+
+
     def set_period(self, new_period):
         """!
         This method sets the period between runs of the task to the given
@@ -233,8 +676,16 @@ class Task:
         """
         if new_period is None:
             self.period = None
+            self._next_run = None
         else:
             self.period = int(new_period) * 1000
+            self._next_run = self._clock.ticks_add(self._clock.ticks_us(),
+                                                   self.period)
+
+        # The new period counts from now, so the task list's order of run
+        # times must be updated
+        if self._task_list is not None:
+            self._task_list._reschedule(self)
 
 
     def reset_profile(self):
@@ -247,35 +698,82 @@ class Task:
         self._slowest = 0
         self._late_sum = 0
         self._latest = 0
+        self._prev_start = None
+        if self._prof:
+            self._run_hist.clear()
+            self._late_hist.clear()
+            self._jitter_hist.clear()
+
+
+    def trace_records(self):
+        """!
+        Get the transitions kept in the trace, oldest first.
+        @return A list of (time since the previous transition in
+                microseconds, state) tuples; a state of -1 stands for
+                @c None or a state which doesn't fit in 16 bits
+        """
+        if not self._trace:
+            return []
+        depth = len(self._tr_dt)
+        kept = min(self._tr_count, depth)
+        start = (self._tr_head - kept) % depth
+        return [(self._tr_dt[(start + k) % depth],
+                 self._tr_state[(start + k) % depth]) for k in range(kept)]
 
 
     def get_trace(self):
         """!
         This method returns a string containing the task's transition trace.
-        The trace is a set of tuples, each of which contains a time and the
-        states from and to which the system transitioned. 
-        @return A possibly quite large string showing state transitions
+        Each line shows the time, in seconds from the first transition kept,
+        and the states from and to which the task transitioned. If older
+        transitions have been overwritten, the first from-state is unknown.
+        @return A string showing the latest state transitions
         """
         tr_str = 'Task ' + self.name + ':'
         if self._trace:
+            records = self.trace_records()
+            dropped = self._tr_count - len(records)
+            if dropped:
+                tr_str += f' {dropped} older transitions overwritten'
             tr_str += '\n'
-            last_state = 0
+            last_state = '?' if dropped else 0
             total_time = 0.0
-            for item in self._tr_data:
-                total_time += item[0] / 1000000.0
-                tr_str += '{: 12.6f}: {: 2d} -> {:d}\n'.format (total_time, 
-                    last_state, item[1])
-                last_state = item[1]
+            for dt, state in records:
+                if dropped:
+                    dropped = 0
+                else:
+                    total_time += dt / 1000000.0
+                tr_str += '{: 12.6f}: {:>2} -> {:d}\n'.format (total_time,
+                    last_state, state)
+                last_state = state
         else:
             tr_str += ' not traced'
         return tr_str
 
 
+    def write_trace(self, stream):
+        """!
+        Write the task's trace to a binary stream as part of a dump made by
+        @c TaskList.dump_trace().
+        @param stream A stream, such as a file, opened for binary writing
+        """
+        name = self.name.encode()[:255]
+        records = self.trace_records()
+        stream.write(bytes((len(name),)) + name)
+        stream.write(struct.pack('<HII', len(records), self._tr_count,
+                                 self._prev_time))
+        for dt, state in records:
+            stream.write(struct.pack('<Ih', dt, state))
+
+
     def go(self):
         """!
         Method to set a flag so that this task indicates that it's ready to run.
         This method may be called from an interrupt service routine or from
-        another task which has data that this task needs to process soon.
+        another task which has data that this task needs to process soon;
+        shares and queues call it for tasks which have subscribed to them.
+        A timed task which is made ready this way runs as well as at its
+        run times.
         """
         self.go_flag = True
 
@@ -302,6 +800,40 @@ class Task:
         return rst
 
 
+    def percentiles(self):
+        """!
+        Show the median, 95th and 99th percentiles of the task's run time,
+        lateness and period-to-period jitter in milliseconds. Each is the
+        top of a histogram bucket, so it may be up to a quarter too high.
+        @return A line of text for the percentile table printed by the task
+                list, or just the task's name if it isn't profiled
+        """
+        rst = f"{self.name:<16s}"
+        if self._prof:
+            for hist in (self._run_hist, self._late_hist, self._jitter_hist):
+                if hist.count:
+                    for percent in (50, 95, 99):
+                        rst += f"{hist.percentile(percent) / 1000.0: 9.3f}"
+                else:
+                    rst += '        -' * 3
+        return rst
+
+
+    def write_profile(self, stream):
+        """!
+        Write the task's name and profile histograms to a binary stream as
+        part of a dump made by @c TaskList.dump_profile().
+        @param stream A stream, such as a file, opened for binary writing
+        """
+        name = self.name.encode()[:255]
+        stream.write(bytes((len(name),)) + name)
+        if self._prof:
+            for hist in (self._run_hist, self._late_hist, self._jitter_hist):
+                stream.write(hist.counts)
+        else:
+            stream.write(bytes(3 * 4 * HIST_BUCKETS))
+
+
 # =============================================================================
 
 class TaskList:
@@ -316,20 +848,39 @@ class TaskList:
     The task list is sorted by priority so that the scheduler can efficiently
     look through the list to find the highest priority task which is ready to
     run at any given time. Tasks can also be scheduled in a simpler
-    "round-robin" fashion.
+    "round-robin" fashion, or by @c deadline_sched(), which also keeps the
+    timed tasks in order of their next run times and sleeps while no task
+    is ready.
     """
 
-    def __init__(self):
+    def __init__(self, clock=None):
         """!
         Initialize the task list. This creates the list of priorities in
         which tasks will be organized by priority.
+        @param clock The clock which times the tasks, by default the module's
+               @c default_clock; a @c VirtualClock runs the tasks in
+               simulated time
         """
+        ## The clock which gives the time to the scheduler and the tasks
+        self.clock = clock if clock is not None else default_clock
+
         ## The list of priority lists. Each priority for which at least one 
         #  task has been created has a list whose first element is a task 
         #  priority and whose other elements are references to task objects at
         #  that priority. 
         self.pri_list = []
 
+        # All tasks, and the timed tasks in order of their next run times
+        self._tasks = []
+        self._timed = []
+
+        # Time spent by deadline_sched() in total, running tasks and idle,
+        # in microseconds, and the number of task runs it has dispatched
+        self._sched_us = 0
+        self._run_us = 0
+        self._idle_us = 0
+        self._dispatches = 0
+
 
     def append(self, task):
         """!
@@ -357,6 +908,49 @@ class TaskList:
         # Make sure the main list (of lists at each priority) is sorted
         self.pri_list.sort(key=lambda pri: pri[0], reverse=True)
 
+        # A task takes the list's clock, restarting its timing if it had
+        # another one
+        clock = self.clock
+        if task._clock is not clock:
+            task._clock = clock
+            task._prev_time = clock.ticks_us()
+            if task.period is not None:
+                task._next_run = clock.ticks_add(clock.ticks_us(), task.period)
+
+        task._task_list = self
+        self._tasks.append(task)
+        if task.period is not None:
+            self._insert(task)
+
+
+    def _reschedule(self, task):
+        """!
+        Move a task whose period has been changed to its place in the list
+        of timed tasks, taking it out if it no longer has a period.
+        @param task The task whose period has been changed
+        """
+        if task in self._timed:
+            self._timed.remove(task)
+        if task.period is not None:
+            self._insert(task)
+
+
+    @micropython.native
+    def _insert(self, task):
+        """!
+        Insert a timed task into the list of timed tasks, keeping it in order
+        of the tasks' next run times. Times are compared with
+        the clock's @c ticks_diff() so that the order survives wraparound.
+        @param task The task to be inserted
+        """
+        ticks_diff = self.clock.ticks_diff
+        timed = self._timed
+        idx = len(timed)
+        while idx > 0 and ticks_diff(task._next_run,
+                                     timed[idx - 1]._next_run) < 0:
+            idx -= 1
+        timed.insert(idx, task)
+
 
     @micropython.native
     def rr_sched(self):
@@ -403,9 +997,117 @@ class TaskList:
                     return
 
 
+    @micropython.native
+    def deadline_sched(self):
+        """!
+        Run tasks according to their run times and priorities, sleeping while
+        no task is ready.
+
+        Each time it is called, this scheduler reads the time once and makes
+        ready the timed tasks whose run times have come; as the timed tasks
+        are kept in order of their run times, only those which are due are
+        looked at. It then runs the highest priority task which is ready,
+        taking turns among tasks of the same priority. If no task is ready,
+        it sleeps until the next run time or until a task is made ready by
+        @c go(), e.g. from an interrupt. The time spent idle and in the
+        scheduler itself is shown by @c __repr__().
+        @return @c True if a task ran or @c False if the scheduler slept
+        """
+        ticks_us = self.clock.ticks_us
+        ticks_diff = self.clock.ticks_diff
+        start = ticks_us()
+
+        # Make ready the timed tasks which are due, earliest first
+        timed = self._timed
+        while timed and ticks_diff(start, timed[0]._next_run) >= 0:
+            task = timed.pop(0)
+            if task.period is not None:
+                task._release(start)
+                self._insert(task)
+
+        # Run the highest priority task which is ready, round-robin within
+        # each priority
+        for pri in self.pri_list:
+            length = len(pri)
+            idx = pri[1]
+            for _ in range(length - 2):
+                task = pri[idx]
+                idx += 1
+                if idx >= length:
+                    idx = 2
+                if task.go_flag:
+                    pri[1] = idx
+                    run_start = ticks_us()
+                    task._run()
+                    end = ticks_us()
+                    self._run_us += ticks_diff(end, run_start)
+                    self._sched_us += ticks_diff(end, start)
+                    self._dispatches += 1
+                    return True
+
+        # Nothing is ready, so sleep until something is
+        idle_start = ticks_us()
+        self._sleep(timed[0]._next_run if timed else None)
+        end = ticks_us()
+        self._idle_us += ticks_diff(end, idle_start)
+        self._sched_us += ticks_diff(end, start)
+        return False
+
+
+    def _sleep(self, deadline):
+        """!
+        Wait until a given time or until any task has been made ready by
+        @c go(), whichever comes first.
+        @param deadline The clock's @c ticks_us() time at which to wake up,
+               or @c None to wait only for @c go()
+        """
+        clock = self.clock
+        tasks = self._tasks
+        while True:
+            for task in tasks:
+                if task.go_flag:
+                    return
+            wait = IDLE_STEP_US
+            if deadline is not None:
+                wait = clock.ticks_diff(deadline, clock.ticks_us())
+                if wait <= 0:
+                    return
+            clock.wait(wait)
+
+
+    def dump_trace(self, stream):
+        """!
+        Write the traces of all the traced tasks to a binary stream, from
+        which @c load_trace() can read them back. The clock's tick count is
+        written too, so that the traces of all the tasks can be put on one
+        timeline; @c tools/trace_view.py does this on a PC.
+        @param stream A stream, such as a file, opened for binary writing
+        """
+        traced = [task for task in self._tasks if task._trace]
+        stream.write(struct.pack('<4sBxHI', TRACE_MAGIC, TRACE_VERSION,
+                                 len(traced), self.clock.ticks_us()))
+        for task in traced:
+            task.write_trace(stream)
+
+
+    def dump_profile(self, stream):
+        """!
+        Write the profile histograms of all the tasks to a binary stream,
+        from which @c load_profile() can read them back. Each task takes
+        about a kilobyte, much less than a printout of its histograms.
+        @param stream A stream, such as a file, opened for binary writing
+        """
+        stream.write(struct.pack('<4sBBH', PROFILE_MAGIC, PROFILE_VERSION,
+                                 HIST_BUCKETS, len(self._tasks)))
+        for task in self._tasks:
+            task.write_profile(stream)
+
+
     def __repr__(self):
         """!
         Create some diagnostic text showing the tasks in the task list.
+        If @c deadline_sched() has been used, the share of time spent idle
+        and in scheduler overhead is shown below the table.
         """
         ret_str = 'TASK             PRI    PERIOD    RUNS   AVG DUR   MAX ' \
             'DUR  AVG LATE  MAX LATE\n'
@@ -413,6 +1115,20 @@ class TaskList:
             for task in pri[2:]:
                 ret_str += str(task) + '\n'
 
+        ret_str += '\nPERCENTILES ms    RUN p50      p95      p99 LATE p50' \
+            '      p95      p99  JIT p50      p95      p99\n'
+        for pri in self.pri_list:
+            for task in pri[2:]:
+                ret_str += task.percentiles() + '\n'
+
+        if self._sched_us > 0:
+            overhead = self._sched_us - self._run_us - self._idle_us
+            ret_str += (f"IDLE {100 * self._idle_us / self._sched_us:5.1f}%"
+                        f"   OVERHEAD {100 * overhead / self._sched_us:5.1f}%")
+            if self._dispatches:
+                ret_str += f" ({overhead / self._dispatches:.0f} us per run)"
+            ret_str += '\n'
+
         return ret_str
 
 
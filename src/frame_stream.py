@@ -0,0 +1,456 @@
+"""!
+@file frame_stream.py
+This file contains a compact binary format for streaming thermal images,
+with a writer which runs on the MicroPython board and a decoder which runs
+on the host computer.
+
+Printing images as CSV text takes far longer than acquiring them. Each
+binary frame is a fixed header, a payload of quantized pixels and a CRC:
+
+@code
+  offset  size  field
+       0     4  magic b'MLXF'
+       4     1  format version
+       5     1  flags: FLAG_INT16, FLAG_DELTA, FLAG_RLE
+       6     1  subpage ID
+       7     1  reserved, always 0
+       8     4  sequence number
+      12     4  ticks_us() time stamp
+      16     4  for a delta frame, the sequence number of the frame it is
+                relative to
+      20     2  number of pixels
+      22     2  payload length in bytes
+      24    32  vdd, ta, ta_r, gain, gain_cp[0], gain_cp[1], offset, scale
+      56     n  payload
+    56+n     4  CRC32 of the header and the payload
+@endcode
+
+All fields are little-endian. Pixels are quantized as @c uint8 or @c int16,
+with value = @c offset + q * @c scale. A delta frame holds the difference
+from the previous frame's quantized pixels, modulo 2**8 or 2**16, and is
+only sent when the quantization hasn't changed; the writer sends a full
+key frame every so often so that a decoder can start or recover. The
+payload may be run-length coded with PackBits, which shrinks the mostly
+zero deltas of a quiet scene a great deal.
+
+This module runs under both MicroPython and CPython, so the host decoder
+can import it from the @c src directory.
+
+@author Adam Westfall
+@author Jason Davis
+@author Conor Fraser
+@copyright Creative Commons CC BY: Please visit https://creativecommons.org/licenses/by/4.0/ to learn more
+"""
+
+import array
+import struct
+import sys
+from binascii import crc32
+try:
+    from ucollections import namedtuple
+except ImportError:
+    from collections import namedtuple
+
+try:
+    import micropython
+except ImportError:
+    # CPython on the host: run the native functions as plain Python
+    class micropython:
+        @staticmethod
+        def native(fun):
+            return fun
+
+
+## The first bytes of every frame
+MAGIC = b'MLXF'
+## The version of the frame format
+VERSION = 1
+
+## Flag: pixels are quantized as @c int16 rather than @c uint8
+FLAG_INT16 = 0x01
+## Flag: pixels are differences from the previous frame
+FLAG_DELTA = 0x02
+## Flag: the payload is run-length coded with PackBits
+FLAG_RLE = 0x04
+
+## The layout of the frame header for @c struct; the reserved byte is an
+#  explicit @c B field, as not every MicroPython port's @c struct has @c x
+HEADER_FMT = '<4sBBBBIIIHH8f'
+## The size of the frame header in bytes
+HEADER_SIZE = struct.calcsize(HEADER_FMT)
+## The size of the CRC which follows the payload
+CRC_SIZE = 4
+
+## All the flags which a frame may have
+FLAGS_KNOWN = FLAG_INT16 | FLAG_DELTA | FLAG_RLE
+## The most pixels a decoder accepts in a frame by default
+MAX_SIZE = 768
+
+## A decoded frame; @c state holds the camera state sent with it
+Frame = namedtuple('Frame', ('seq', 'ticks', 'subpage', 'state', 'values'))
+## The camera state sent with a frame, with the fields of @c CameraState
+FrameState = namedtuple('FrameState', ('vdd', 'ta', 'ta_r', 'gain', 'gain_cp'))
+
+
+@micropython.native
+def _quantize(values, prev, raw, offset, inv_scale, wide, delta):
+    """!
+    @brief   Quantize pixels into payload bytes, optionally as deltas.
+    @details The new quantized values replace those in @c prev.
+    """
+    top = 32767 if wide else 255
+    bottom = -32768 if wide else 0
+    pos = 0
+    for idx in range(len(values)):
+        # clamped before int(), so NaN becomes the bottom value
+        x = (values[idx] - offset)*inv_scale + 0.5
+        if x >= top:
+            q = top
+        elif x > bottom:
+            q = int(x)
+        else:
+            q = bottom
+        d = q - prev[idx] if delta else q
+        prev[idx] = q
+        raw[pos] = d & 0xFF
+        pos += 1
+        if wide:
+            raw[pos] = (d >> 8) & 0xFF
+            pos += 1
+    return pos
+
+
+def max_payload(size, flags):
+    """!
+    @brief   Find the longest payload which a frame can have.
+    @details PackBits adds at most one count byte per 128 bytes, plus one.
+    @param   size The number of pixels in the frame
+    @param   flags The flags of the frame
+    @returns The greatest payload length in bytes
+    """
+    count = size * (2 if flags & FLAG_INT16 else 1)
+    if flags & FLAG_RLE:
+        return count + count // 128 + 1
+    return count
+
+
+@micropython.native
+def _value_range(values):
+    """!
+    @brief   Find the lowest and highest finite values in an image.
+    @returns A (low, high) tuple, (0.0, 0.0) if no value is finite
+    """
+    low = high = 0.0
+    found = False
+    for idx in range(len(values)):
+        v = values[idx]
+        if v - v != 0.0:
+            continue
+        if not found:
+            low = high = v
+            found = True
+        elif v < low:
+            low = v
+        elif v > high:
+            high = v
+    return low, high
+
+
+@micropython.native
+def _packbits(src, count, dst):
+    """!
+    @brief   Run-length code bytes with PackBits.
+    @details Runs of 3 to 128 equal bytes become a count byte of 1 - n
+             (as an unsigned byte) and the byte; other bytes go out in
+             literal runs of up to 128, after a count byte of n - 1.
+    @returns The number of bytes written to @c dst
+    """
+    i = 0
+    out = 0
+    while i < count:
+        value = src[i]
+        end = i + 1
+        while end < count and end - i < 128 and src[end] == value:
+            end += 1
+        if end - i >= 3:
+            dst[out] = (257 - (end - i)) & 0xFF
+            dst[out + 1] = value
+            out += 2
+            i = end
+            continue
+
+        start = i
+        while i < count and i - start < 128:
+            if i + 2 < count and src[i] == src[i + 1] and src[i] == src[i + 2]:
+                break
+            i += 1
+        dst[out] = i - start - 1
+        out += 1
+        for j in range(start, i):
+            dst[out] = src[j]
+            out += 1
+    return out
+
+
+def unpackbits(data, size):
+    """!
+    @brief   Decode PackBits run-length coded bytes.
+    @param   data The coded bytes
+    @param   size The number of decoded bytes expected
+    @returns The decoded bytes as a @c bytearray
+    @raises  ValueError if the data doesn't decode to @c size bytes
+    """
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        n = data[i]
+        i += 1
+        if n < 128:
+            out += data[i:i + n + 1]
+            i += n + 1
+        elif n > 128:
+            out += bytes((data[i],)) * (257 - n)
+            i += 1
+    if len(out) != size:
+        raise ValueError("run-length coded payload has the wrong size")
+    return out
+
+
+class FrameWriter:
+    """!
+    @brief   Class which writes thermal images to a stream as binary frames.
+    @details The header, payload and CRC buffers and the views of them are
+             allocated when the writer is created. A frame allocates only
+             a few small objects, such as the view of the payload's length
+             and the CRC value; nothing grows with the image, so a frame
+             can be sent after every subpage.
+    """
+
+    def __init__(self, stream, size=768, *, int16=False, scale=0.01,
+                 limits=None, delta=False, rle=True, key_interval=16):
+        """!
+        @brief   Set up a frame writer.
+        @param   stream An object with a @c write() method, such as
+                 @c pyb.USB_VCP() or a file opened in binary mode
+        @param   size The number of pixels in an image
+        @param   int16 @c True to quantize pixels as @c int16 in steps of
+                 @c scale, or @c False to quantize them as @c uint8
+        @param   scale The size of an @c int16 step, in degrees C by default
+        @param   limits For @c uint8 frames, the (low, high) values mapped to
+                 0 and 255, or @c None to use the range of each image
+        @param   delta @c True to send differences from the previous frame
+                 whenever the quantization is unchanged
+        @param   rle @c True to run-length code the payload
+        @param   key_interval The greatest number of delta frames sent in a
+                 row before a full key frame
+        """
+        ## The stream to which frames are written
+        self.stream = stream
+        ## Whether pixels are sent as @c int16
+        self.int16 = int16
+        ## The size of an @c int16 step
+        self.scale = scale
+        ## The fixed range of @c uint8 frames, or @c None
+        self.limits = limits
+        ## Whether delta frames are sent
+        self.delta = delta
+        ## Whether the payload is run-length coded
+        self.rle = rle
+        ## The greatest number of delta frames in a row
+        self.key_interval = key_interval
+
+        width = 2 if int16 else 1
+        self._size = size
+        self._prev = array.array('h' if int16 else 'B', (0 for _ in range(size)))
+        self._raw = bytearray(size * width)
+        self._packed = bytearray(max_payload(size, FLAG_RLE | (FLAG_INT16 if int16 else 0)))
+        self._raw_mv = memoryview(self._raw)
+        self._packed_mv = memoryview(self._packed)
+        self._header = bytearray(HEADER_SIZE)
+        self._crc = bytearray(CRC_SIZE)
+        self._since_key = -1
+        # quantization and sequence number of the previous frame
+        self._last_offset = self._last_scale = None
+        self._last_seq = 0
+
+
+    def write(self, values, seq, ticks, state, subpage=0):
+        """!
+        @brief   Quantize an image and write it to the stream as one frame.
+        @details NaN pixels are sent as the lowest level, and the range of
+                 an automatically scaled @c uint8 frame ignores them.
+        @param   values A flat array of @c size pixel values, usually
+                 temperatures in degrees C
+        @param   seq The sequence number of the image, such as @c MLX_Cam.seq
+        @param   ticks The @c ticks_us() time at which the image was taken
+        @param   state The @c CameraState with which the image was processed
+        @param   subpage The ID of the subpage which was last processed
+        @returns The number of bytes written
+        """
+        if self.int16:
+            offset, scale = 0.0, self.scale
+        else:
+            if self.limits is None:
+                low, high = _value_range(values)
+            else:
+                low, high = self.limits
+            offset = low
+            scale = (high - low)/255 if high > low else 1.0
+
+        flags = FLAG_INT16 if self.int16 else 0
+        delta = (self.delta and 0 <= self._since_key < self.key_interval
+                 and offset == self._last_offset and scale == self._last_scale)
+        if delta:
+            flags |= FLAG_DELTA
+            self._since_key += 1
+        else:
+            self._since_key = 0
+        ref = self._last_seq
+        self._last_offset = offset
+        self._last_scale = scale
+        self._last_seq = seq
+
+        count = _quantize(values, self._prev, self._raw, offset, 1/scale,
+                          self.int16, delta)
+        payload = self._raw_mv
+        if self.rle:
+            flags |= FLAG_RLE
+            count = _packbits(self._raw, count, self._packed)
+            payload = self._packed_mv
+        payload = payload[:count]
+
+        struct.pack_into(HEADER_FMT, self._header, 0, MAGIC, VERSION, flags,
+                         subpage, 0, seq, ticks, ref, self._size, count,
+                         state.vdd, state.ta, state.ta_r, state.gain,
+                         state.gain_cp[0], state.gain_cp[1], offset, scale)
+        struct.pack_into('<I', self._crc, 0, crc32(payload, crc32(self._header)))
+
+        stream = self.stream
+        stream.write(self._header)
+        stream.write(payload)
+        stream.write(self._crc)
+        return HEADER_SIZE + count + CRC_SIZE
+
+
+class FrameDecoder:
+    """!
+    @brief   Class which rebuilds images from a stream of binary frames.
+    @details Bytes can be fed in pieces of any size as they arrive. Bytes
+             which are not part of a valid frame, such as text printed by
+             the board, are skipped. A header whose size or length no
+             frame can have is taken for noise which happens to hold the
+             magic bytes, and the search goes on from the next byte rather
+             than waiting for a payload which will never come. Delta frames
+             are dropped until a key frame has been decoded, and again
+             after a frame goes missing.
+    """
+
+    def __init__(self, max_size=MAX_SIZE):
+        """!
+        @brief   Set up a decoder with an empty input buffer.
+        @param   max_size The most pixels which a frame may have
+        """
+        self._max_size = max_size
+        self._buf = bytearray()
+        self._prev = None
+        self._prev_seq = None
+        ## The number of bytes skipped while looking for frames
+        self.skipped = 0
+        ## The number of frames which were dropped because of a bad CRC or
+        #  a missing key frame
+        self.dropped = 0
+
+
+    def feed(self, data):
+        """!
+        @brief   Add received bytes and decode the complete frames in them.
+        @param   data Bytes received from the stream
+        @returns A list of @c Frame tuples, whose @c values are an
+                 @c array('f') of pixel values
+        """
+        buf = self._buf
+        buf += data
+        frames = []
+        while True:
+            start = buf.find(MAGIC)
+            if start < 0:
+                keep = len(MAGIC) - 1
+                self.skipped += max(len(buf) - keep, 0)
+                del buf[:max(len(buf) - keep, 0)]
+                break
+            if start:
+                self.skipped += start
+                del buf[:start]
+            if len(buf) < HEADER_SIZE:
+                break
+
+            header = struct.unpack_from(HEADER_FMT, buf, 0)
+            flags = header[2]
+            size = header[8]
+            length = header[9]
+            total = HEADER_SIZE + length + CRC_SIZE
+            if (header[1] != VERSION or flags & ~FLAGS_KNOWN
+                    or size > self._max_size
+                    or length > max_payload(size, flags)):
+                # not a frame after all; look for the next magic
+                self.skipped += 1
+                del buf[:1]
+                continue
+            if len(buf) < total:
+                break
+
+            crc = struct.unpack_from('<I', buf, HEADER_SIZE + length)[0]
+            if crc32(bytes(buf[:HEADER_SIZE + length])) != crc:
+                self.dropped += 1
+                self.skipped += 1
+                del buf[:1]
+                continue
+
+            frame = self._decode(header, bytes(buf[HEADER_SIZE:HEADER_SIZE + length]))
+            del buf[:total]
+            if frame is None:
+                self.dropped += 1
+            else:
+                frames.append(frame)
+        return frames
+
+
+    def _decode(self, header, payload):
+        """!
+        @brief   Rebuild the pixel values of one frame.
+        @returns A @c Frame, or @c None if it is a delta frame which can't
+                 be decoded
+        """
+        (_, _, flags, subpage, _, seq, ticks, ref, size, _,
+         vdd, ta, ta_r, gain, gain_cp_0, gain_cp_1, offset, scale) = header
+        wide = flags & FLAG_INT16
+        width = 2 if wide else 1
+        if flags & FLAG_RLE:
+            payload = unpackbits(payload, size * width)
+
+        if wide:
+            q = array.array('h')
+            q.frombytes(payload)
+            if sys.byteorder == 'big':
+                q.byteswap()
+        else:
+            q = array.array('B', payload)
+
+        if flags & FLAG_DELTA:
+            if self._prev is None or len(self._prev) != size or ref != self._prev_seq:
+                self._prev = None
+                return None
+            prev = self._prev
+            if wide:
+                for i in range(size):
+                    v = (prev[i] + q[i]) & 0xFFFF
+                    q[i] = v - 0x10000 if v & 0x8000 else v
+            else:
+                for i in range(size):
+                    q[i] = (prev[i] + q[i]) & 0xFF
+        self._prev = q
+        self._prev_seq = seq
+
+        values = array.array('f', (offset + v*scale for v in q))
+        state = FrameState(vdd, ta, ta_r, gain, (gain_cp_0, gain_cp_1))
+        return Frame(seq, ticks, subpage, state, values)
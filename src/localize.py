@@ -0,0 +1,195 @@
+"""!
+@file localize.py
+This file contains code which finds the position of a hot spot in a thermal
+image to a fraction of a pixel.
+
+Each pixel of the MLX90640 covers about 1.7 degrees, so aiming at whole
+pixels moves the gun in coarse steps. Two estimates are made from a
+temperature map. Intensity-weighted moments of the pixels of a blob give its
+weighted centroid and spread. A fit of a parabola (or a Gaussian) through
+the hottest pixel and its neighbours in each direction gives the position
+and value of the true maximum. A confidence from 0 to 1 tells how far the
+result can be trusted.
+
+@author Adam Westfall
+@author Jason Davis
+@author Conor Fraser
+@copyright Creative Commons CC BY: Please visit https://creativecommons.org/licenses/by/4.0/ to learn more
+"""
+
+import array
+import math
+import micropython
+from mlx90640.calibration import NUM_ROWS, NUM_COLS
+
+## Peak fit through three points with a parabola
+QUADRATIC = 0
+## Peak fit through three points with a Gaussian, i.e. a parabola through
+#  the logarithms of the values above the floor
+GAUSSIAN = 1
+
+## Index in the result array of the fitted column of the peak
+X = 0
+## Index in the result array of the fitted row of the peak
+Y = 1
+## Index in the result array of the confidence, from 0 to 1
+CONF = 2
+## Index in the result array of the fitted peak value
+PEAK = 3
+## Index in the result array of the intensity-weighted centroid column
+MX = 4
+## Index in the result array of the intensity-weighted centroid row
+MY = 5
+
+
+@micropython.native
+def _fit3(left, centre, right, floor, fit):
+    """!
+    @brief   Fit a peak through three equally spaced values.
+    @returns The offset of the peak from the centre value, between -0.5 and
+             0.5, or @c None if the values have no maximum near the centre
+    """
+    if fit == GAUSSIAN:
+        if left <= floor or centre <= floor or right <= floor:
+            return None
+        left = math.log(left - floor)
+        centre = math.log(centre - floor)
+        right = math.log(right - floor)
+    curve = left - 2*centre + right
+    if curve >= 0:
+        return None
+    offset = 0.5*(left - right)/curve
+    if offset < -0.5 or offset > 0.5:
+        return None
+    return offset
+
+
+class Localizer:
+    """!
+    @brief   Class which finds a hot spot in a temperature map to sub-pixel
+             precision.
+    @details The results of @c locate() are kept in the preallocated array
+             @c result, indexed by @c X, @c Y, @c CONF, @c PEAK, @c MX and
+             @c MY. Columns are in sensor order, as in @c blobs.BlobLabeler.
+    """
+
+    def __init__(self, width=NUM_COLS, height=NUM_ROWS, fit=QUADRATIC,
+                 noise=0.5):
+        """!
+        @brief   Set up a localizer.
+        @param   width The width of the image in pixels
+        @param   height The height of the image in pixels
+        @param   fit The peak fit to use, @c QUADRATIC or @c GAUSSIAN
+        @param   noise The typical pixel noise, in the units of the image;
+                 peaks which rise only this far above the floor get half
+                 the confidence of a very strong peak
+        """
+        ## The width of the image in pixels
+        self.width = width
+        ## The height of the image in pixels
+        self.height = height
+        ## Either @c QUADRATIC or @c GAUSSIAN
+        self.fit = fit
+        ## The typical pixel noise in the units of the image
+        self.noise = noise
+        ## The results of the latest @c locate()
+        self.result = array.array('f', (0.0 for _ in range(6)))
+
+
+    @micropython.native
+    def locate(self, values, peak_idx, floor, labels=None, label=0):
+        """!
+        @brief   Find the position of a hot spot to a fraction of a pixel.
+        @details Pixels are weighted by how far they rise above @c floor.
+                 If @c labels is given, only the pixels marked with @c label
+                 are part of the spot, as from @c blobs.BlobLabeler; if not,
+                 every pixel above the floor is. The peak is fitted along
+                 the row and the column through @c peak_idx. Along a
+                 direction where the fit fails, for example at the edge of
+                 the image, the weighted centroid is used instead and the
+                 confidence is halved.
+
+                 The confidence is the product of how strongly the peak
+                 rises above the noise, @c rise / (@c rise + @c noise), and
+                 of how well the fitted peak agrees with the weighted
+                 centroid given the spread of the spot.
+        @param   values A flat array of pixel values in sensor order, usually
+                 temperatures in degrees C
+        @param   peak_idx The index of the hottest pixel of the spot
+        @param   floor The value below which pixels don't count, such as the
+                 threshold used to find the blob
+        @param   labels An optional array of per-pixel labels
+        @param   label The label of the pixels of the spot in @c labels
+        @returns The confidence, from 0 to 1; 0 if no pixel rises above the
+                 floor
+        """
+        width = self.width
+        result = self.result
+
+        # Intensity-weighted moments
+        total = 0.0
+        sum_x = sum_y = sum_xx = sum_yy = 0.0
+        idx = 0
+        for row in range(self.height):
+            for col in range(width):
+                if labels is None or labels[idx] == label:
+                    w = values[idx] - floor
+                    if w > 0:
+                        total += w
+                        sum_x += w*col
+                        sum_y += w*row
+                        sum_xx += w*col*col
+                        sum_yy += w*row*row
+                idx += 1
+
+        if total <= 0:
+            for i in range(len(result)):
+                result[i] = 0.0
+            return 0.0
+
+        mx = sum_x/total
+        my = sum_y/total
+        spread = sum_xx/total - mx*mx + sum_yy/total - my*my
+        result[MX] = mx
+        result[MY] = my
+
+        # Peak fit along the row and the column through the hottest pixel
+        row = peak_idx // width
+        col = peak_idx - row*width
+        centre = values[peak_idx]
+        conf = 1.0
+        peak = centre
+
+        dx = None
+        if 0 < col < width - 1:
+            left = values[peak_idx - 1]
+            right = values[peak_idx + 1]
+            dx = _fit3(left, centre, right, floor, self.fit)
+        if dx is None:
+            result[X] = mx
+            conf *= 0.5
+        else:
+            result[X] = col + dx
+            peak += 0.25*(right - left)*dx
+
+        dy = None
+        if 0 < row < self.height - 1:
+            up = values[peak_idx - width]
+            down = values[peak_idx + width]
+            dy = _fit3(up, centre, down, floor, self.fit)
+        if dy is None:
+            result[Y] = my
+            conf *= 0.5
+        else:
+            result[Y] = row + dy
+            peak += 0.25*(down - up)*dy
+
+        rise = peak - floor
+        conf *= rise/(rise + self.noise)
+        ex = result[X] - mx
+        ey = result[Y] - my
+        conf /= 1.0 + (ex*ex + ey*ey)/(spread + 0.25)
+
+        result[PEAK] = peak
+        result[CONF] = conf
+        return conf
@@ -38,6 +38,7 @@ import math
 import pyb
 import cotask
 import task_share, encoder, motor_driver, closed_loop_controller, utime, mlx_cam
+import background, blobs, localize, tracker
 
 
 def task1_start_button(shares):
@@ -73,7 +74,7 @@ def task1_start_button(shares):
             start = True
             shares.put(start)
 
-        yield
+        yield state
 
 def task2_thermal_camera(shares):
     '''!  @brief                              Controls the thermal camera functionality.
@@ -95,75 +96,121 @@ def task2_thermal_camera(shares):
 
             # Create the camera object and set it up in default mode
             camera = mlx_cam.MLX_Cam(i2c_bus)
+            # set True to stream the temperatures of every subpage over USB
+            # for live monitoring with tools/stream_view.py; the viewer
+            # skips the text printed on the same port
+            stream_frames = False
+            if stream_frames:
+                camera.start_streaming(pyb.USB_VCP(), delta=True)
+            # non-blocking acquisition, advanced one step per run of this task
+            acquisition = camera.acquire()
+            # targets are pixels warmer than this
+            threshold = 30  # degrees C; a person is warmer than the room but cooler than skin at this range
+            # background model which keeps static heat sources out of the
+            # targets; a pixel already this hot when first seen may be the
+            # opponent, so it isn't taken as background
+            scene = background.BackgroundModel(hot=threshold)
+            # blob labeling and sub-pixel localization, preallocated once
+            labeler = blobs.BlobLabeler()
+            localizer = localize.Localizer()
+            # tracks targets across images to aim where they will be; the
+            # time for the yaw motor to reach an angle is a fixed estimate,
+            # never measured as the full assembly was unable to be put together
+            targets = tracker.Tracker(move_us=100000)
+            # whether only a window around the target is being read
+            windowed = False
             state = 1
 
         elif state == 1:
-            # wait for start: wait for start to be true
+            # wait for start: wait for start to be true, meanwhile learning
+            # the empty scene so that lamps and other static heat sources
+            # are background before the opponent steps into view
+            result = next(acquisition)
+            if result == mlx_cam.ACQ_SUBPAGE or result == mlx_cam.ACQ_FRAME:
+                scene.learn(camera.get_temperatures(), camera.updated_idx())
             if start.get() == True:
+                start_time = utime.ticks_ms()
                 state = 2
 
         elif state == 2:
             # wait: this state waits for 5 seconds for the duel to actually start
-            # this is attempting to be somewhat cooperative and not completely blocking may need some adjustment
-            total_time = 5 # seconds
-            wait_time = .1 # seconds
-
-            i = total_time/wait_time 
-            while i > 0:
-                utime.sleep(.1)
-                i -= 1
-                yield
-            state = 3
+            # the time is checked on every run so that the scheduler is never blocked;
+            # the background model keeps following the scene in the meantime
+            result = next(acquisition)
+            if result == mlx_cam.ACQ_SUBPAGE or result == mlx_cam.ACQ_FRAME:
+                scene.update(camera.get_temperatures(), camera.updated_idx())
+            total_time = 5000 # milliseconds
+            if utime.ticks_diff(utime.ticks_ms(), start_time) >= total_time:
+                state = 3
 
         elif state == 3:
-            # get image: get the image from the thermal camera
-            image = camera.get_image()
-            pix_array = camera.get_array(image.buf)
-            
-            state = 4
+            # get image: step the acquisition until a subpage is processed and
+            # feed every subpage to the background model; once a full frame
+            # has been seen every half frame is acted on
+            result = next(acquisition)
+            if result == mlx_cam.ACQ_SUBPAGE or result == mlx_cam.ACQ_FRAME:
+                temps = camera.get_temperatures()
+                scene.update(temps, camera.updated_idx())
+                if result == mlx_cam.ACQ_FRAME or camera.seq > 2:
+                    state = 4
 
         elif state == 4:
             # get output vector: get the angle for the yaw to move
             
-            # finding approx x location of the brightest pixels
-            # reshape to 2-D list
-            img = [pix_array[i:i+camera._width] for i in range(0, len(pix_array), camera._width)]  
-            threshold = 75  # adjust as needed we were unable to test this fully but this value was working woutside of the full assembly
-            # apply threshold
-            binary_img = [[1 if pixel > threshold else 0 for pixel in row] for row in img] 
-            # find center of mass
-            total_mass = 0
-            center_mass = 0
-            for y, row in enumerate(binary_img):
-                mass = sum(row)
-                total_mass += mass
-                center_mass += y * mass
-            if total_mass > 0:
-                center_y = center_mass / total_mass
+            # finding the hottest blob of changed pixels warmer than the threshold
+            labeler.label(temps, threshold, scene.mask)
+            blob = labeler.hottest()
+            if blob >= 0:
+                # refining the position of its hot spot to a fraction of a pixel
+                localizer.locate(temps, labeler.peak_idx[blob], threshold,
+                                 labeler.labels, blob + 1)
+                labeler.cx[blob] = localizer.result[localize.X]
+                labeler.cy[blob] = localizer.result[localize.Y]
+
+            # following the blobs from image to image and predicting where
+            # the target will be once the gun has turned to it
+            # hottest blobs first, as they are the most likely targets; the
+            # measured processing time refines the latency of the aim
+            targets.update(camera.timestamp, labeler.cx, labeler.cy, labeler.count,
+                           labeler.ranked())
+            targets.add_latency(utime.ticks_diff(utime.ticks_us(), camera.timestamp))
+
+            track = targets.aim()
+            if track < 0:
+                # no target seen in enough images yet, look at the next image
+                # and read the whole of it if the target was lost
+                if windowed:
+                    camera.set_window()
+                    windowed = False
+                state = 3
             else:
-                center_y = None
-            
-            # all real world distances needed these were never measured as the full assembly was unable to be put together
-            Field_x_len = 24 # distance of the camera field of view at the table edge in inches
-            dist_from_pivot = 2 # distance from pivot value in inches
-            
-            # converting from an x index to the inches value
-            x_dist = center_y * (Field_x_len/camera._width)
+                # from now on read only the rows around the target, which is
+                # much faster on the I2C bus
+                camera.follow(targets.x[track], targets.y[track])
+                windowed = True
+
+                # the image is mirrored as seen from behind the camera
+                center_x = camera._width - 1 - targets.aim_x
+
+                # all real world distances needed these were never measured as the full assembly was unable to be put together
+                Field_x_len = 24 # distance of the camera field of view at the table edge in inches
+                dist_from_pivot = 2 # distance from pivot value in inches
 
-            # solving for the distance from the centerline of the person
-            x = (Field_x_len/2) - x_dist
+                # converting from an x index to the inches value
+                x_dist = center_x * (Field_x_len/camera._width)
 
-            # getting the angle
-            if x > 0:
+                # solving for the distance from the centerline of the person
+                x = (Field_x_len/2) - x_dist
+
+                # getting the angle, negative to one side of the centerline
                 angle = math.atan(x/dist_from_pivot)
-            elif x < 0:
-                angle = -math.atan(abs(x)/dist_from_pivot)
-            
-            # not sure if we need this but could be good to check the angle
-            yaw_angle.put(angle)
-            state = 1
 
-        yield
+                # the yaw task follows every new angle while it moves
+                yaw_angle.put(angle)
+                # keep tracking so that the aim follows the target
+                state = 3
+
+        yield state
 
 def task3_pitch_control(shares):
     '''!  @brief                              Controls the pitch DC motors functionality.
@@ -219,10 +266,11 @@ def task3_pitch_control(shares):
             motor_2.set_duty(duty)
             # check that the duty cycle is very small so it is almost done
             # might be able to just check zero but this is here just in case
-            if abs(duty) < 0.001:
+            # the flag is only put when it changes, as putting it wakes the gun task
+            if abs(duty) < 0.001 and not pitch_done_share.get():
                 pitch_done_share.put(True)
 
-        yield
+        yield state
 
 def task4_yaw_control(shares):
     '''!  @brief                              Controls the yaw DC motors functionality.
@@ -293,8 +341,9 @@ def task4_yaw_control(shares):
                 state = 4
 
         elif state == 4:
-            # move to angle: once an angle is recieved move to the angle
-            
+            # move to angle: once an angle is recieved move to the angle,
+            # following each new angle as the camera keeps tracking the target
+            angle = yaw_angle_share.get()
             deg_2_encoder = 20 # need to find this value   
             setpoint = angle*deg_2_encoder 
             Kp = 0.06        # might need to tune this
@@ -307,10 +356,15 @@ def task4_yaw_control(shares):
             # check that the duty cycle is very small so it is basically done
             # might be able to just check zero but this is here just in case
             small_duty = 0.005 
+            # the flag is only put when it changes, as putting it wakes the gun
+            # task; it is cleared again if a new angle moves the gun away
             if abs(duty) < small_duty:
-                yaw_done_share.put(True)
+                if not yaw_done_share.get():
+                    yaw_done_share.put(True)
+            elif yaw_done_share.get():
+                yaw_done_share.put(False)
                 
-        yield
+        yield state
 
 def task5_nerf_gun(shares):
     '''!  @brief                              Controls the gun firing sequence.
@@ -359,7 +413,7 @@ def task5_nerf_gun(shares):
                 plunger_pin.low()
             motor_pin.low()
 
-        yield
+        yield state
 # This code creates a share, a queue, and two tasks, then starts the tasks. The
 # tasks run until somebody presses ENTER, at which time the scheduler stops and
 # printouts show diagnostic information about the tasks, share, and queue.
@@ -381,21 +435,21 @@ if __name__ == "__main__":
 
  
 
-    # Create the tasks. If trace is enabled for any task, memory will be
-    # allocated for state transition tracing, and the application will run out
-    # of memory after a while and quit. Therefore, use tracing only for 
-    # debugging and set trace to False when it's not needed
+    # Create the tasks. If trace is enabled for a task, a ring buffer of its
+    # latest state transitions is allocated here, so tracing doesn't use up
+    # memory as the tasks run and can stay on. The traces are saved when the
+    # program is stopped and can be shown with tools/trace_view.py
     
     task1 = cotask.Task(task1_start_button, name="Start Button", priority=1, period=100,
-                        profile=True, trace=False, shares=(start))
+                        profile=True, trace=True, shares=(start))
     task2 = cotask.Task(task2_thermal_camera, name="Thermal Camera", priority=2, period=100,
-                         profile=True, trace=False, shares=(start,yaw_angle))
+                         profile=True, trace=True, shares=(start,yaw_angle))
     task3 = cotask.Task(task3_pitch_control, name="Pitch Control", priority=3, period=100,
-                         profile=True, trace=False, shares=(start,pitch_done))
+                         profile=True, trace=True, shares=(start,pitch_done))
     task4 = cotask.Task(task4_yaw_control, name="Yaw Control", priority=4, period=100,
-                         profile=True, trace=False, shares=(start,yaw_angle,yaw_done))
+                         profile=True, trace=True, shares=(start,yaw_angle,yaw_done))
     task5 = cotask.Task(task5_nerf_gun, name="Fire Nerf Gun", priority=5, period=100,
-                         profile=True, trace=False, shares=(start,pitch_done,yaw_done))
+                         profile=True, trace=True, shares=(start,pitch_done,yaw_done))
     
     cotask.task_list.append(task1)
     cotask.task_list.append(task2)
@@ -403,13 +457,25 @@ if __name__ == "__main__":
     cotask.task_list.append(task4)
     cotask.task_list.append(task5)
 
+    # Wake the yaw task as soon as the camera has a new angle, and the gun
+    # task as soon as a motion is done, rather than at their next run times
+    yaw_angle.subscribe(task4)
+    pitch_done.subscribe(task5)
+    yaw_done.subscribe(task5)
+
     # Run the memory garbage collector to ensure memory is as defragmented as
     # possible before the real-time scheduler is started
     gc.collect()
 
-    # Run the scheduler with the chosen scheduling algorithm. Quit if ^C pressed
+    # Run the scheduler with the chosen scheduling algorithm. Quit if ^C pressed.
+    # The deadline scheduler sleeps between run times instead of polling
     while True:
         try:
-            cotask.task_list.pri_sched()
+            cotask.task_list.deadline_sched()
         except KeyboardInterrupt:
-            break
\ No newline at end of file
+            break
+
+    # Print a table of task data and save the state traces
+    print('\n' + str (cotask.task_list))
+    with open('trace.bin', 'wb') as trace_file:
+        cotask.task_list.dump_trace(trace_file)
\ No newline at end of file
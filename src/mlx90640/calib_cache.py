@@ -0,0 +1,107 @@
+""" Persistent cache of derived calibration arrays.
+
+The cache file is keyed by the CRC32 of the raw EEPROM image, so a cache
+written for a different camera (or a corrupted file) is rejected and the
+calibration is computed from scratch instead. Arrays are stored in native
+byte order, as the cache is only meant to be read back by the device which
+wrote it.
+"""
+
+import struct
+from array import array
+from binascii import crc32
+from mlx90640.utils import array_filled
+from mlx90640.calibration import CalibrationArrays, IMAGE_SIZE
+
+CACHE_MAGIC = b'MLXC'
+CACHE_VERSION = const(1)
+
+# magic, version, pixel count, EEPROM crc, payload crc
+_HEADER_FMT = '<4sHHII'
+# kv_avg, ksto, ct, alpha_ext, outlier count
+_CONST_FMT = '<4d4d4h4dH'
+
+def eeprom_checksum(eeprom_image):
+    return crc32(eeprom_image.data)
+
+def _payload(calib):
+    values = (
+        tuple(calib.kv_avg[0]) + tuple(calib.kv_avg[1]) + tuple(calib.ksto)
+        + tuple(calib.ct) + tuple(calib.alpha_ext) + (len(calib.outliers),)
+    )
+    consts = struct.pack(_CONST_FMT, *values)
+    return (
+        consts,
+        array('H', calib.outliers),
+        calib.pix_os_ref,
+        calib.pix_kta,
+        calib.pix_alpha,
+        calib.il_offset,
+    )
+
+def save_calibration(path, key, calib):
+    # returns False if the cache could not be written, e.g. read-only flash
+    payload = _payload(calib.get_arrays())
+    payload_crc = 0
+    for part in payload:
+        payload_crc = crc32(part, payload_crc)
+
+    header = struct.pack(_HEADER_FMT, CACHE_MAGIC, CACHE_VERSION, IMAGE_SIZE, key, payload_crc)
+    try:
+        with open(path, 'wb') as file:
+            file.write(header)
+            for part in payload:
+                file.write(part)
+    except OSError:
+        return False
+    return True
+
+def _read_exact(file, buf, nbytes):
+    return file.readinto(buf) == nbytes
+
+def load_calibration(path, key):
+    # returns CalibrationArrays, or None if the cache is missing or invalid
+    try:
+        with open(path, 'rb') as file:
+            return _load(file, key)
+    except OSError:
+        return None
+
+def _load(file, key):
+    header = bytearray(struct.calcsize(_HEADER_FMT))
+    if not _read_exact(file, header, len(header)):
+        return None
+    magic, version, size, cache_key, payload_crc = struct.unpack(_HEADER_FMT, header)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION or size != IMAGE_SIZE or cache_key != key:
+        return None
+
+    consts = bytearray(struct.calcsize(_CONST_FMT))
+    if not _read_exact(file, consts, len(consts)):
+        return None
+    values = struct.unpack(_CONST_FMT, consts)
+
+    outliers = array_filled('H', values[-1])
+    pix_os_ref = array_filled('h', IMAGE_SIZE)
+    pix_kta = array_filled('f', IMAGE_SIZE, 0.0)
+    pix_alpha = array_filled('f', IMAGE_SIZE, 0.0)
+    il_offset = array_filled('f', IMAGE_SIZE, 0.0)
+
+    crc = crc32(consts)
+    for part, itemsize in ((outliers, 2), (pix_os_ref, 2), (pix_kta, 4), (pix_alpha, 4), (il_offset, 4)):
+        if len(part) and not _read_exact(file, part, len(part) * itemsize):
+            return None
+        crc = crc32(part, crc)
+    if crc != payload_crc:
+        return None
+
+    return CalibrationArrays(
+        pix_os_ref = pix_os_ref,
+        pix_kta = pix_kta,
+        pix_alpha = pix_alpha,
+        il_offset = il_offset,
+        outliers = tuple(outliers),
+        kv_avg = (values[0:2], values[2:4]),
+        ksto = values[4:8],
+        ct = values[8:12],
+        alpha_ext = values[12:16],
+    )
@@ -1,5 +1,6 @@
 import math
 import struct
+import micropython
 from array import array
 from ucollections import namedtuple
 from mlx90640.utils import (
@@ -10,18 +11,34 @@ from mlx90640.utils import (
 )
 
 from mlx90640.regmap import REG_SIZE
-from mlx90640.calibration import NUM_COLS, IMAGE_SIZE, TEMP_K
+from mlx90640.calibration import NUM_ROWS, NUM_COLS, IMAGE_SIZE, TEMP_K
 
 PIX_STRUCT_FMT = '>h'
 PIX_DATA_ADDRESS = const(0x0400)
 
+# number of pixel RAM rows fetched per I2C transaction in block read mode
+BLOCK_ROWS = const(4)
+# largest gap, in words, between wanted pixels which is read through rather
+# than starting a new transaction (each costs about 4 bytes of overhead)
+MAX_GAP = const(4)
+
 class _BasePattern:
+    # ascending pixel indices of each subpage, built on first use and shared
+    _sp_tables = None
+
     @classmethod
     def sp_range(cls, sp_id):
-        return (
-            idx for idx, sp in enumerate(cls.iter_sp()) 
-            if sp == sp_id
-        )
+        tables = cls._sp_tables
+        if tables is None:
+            tables = cls._sp_tables = cls._build_sp_tables()
+        return tables[sp_id]
+
+    @classmethod
+    def _build_sp_tables(cls):
+        tables = (array('H'), array('H'))
+        for idx, sp in enumerate(cls.iter_sp()):
+            tables[sp].append(idx)
+        return tables
 
     @classmethod
     def iter_sp(cls):
@@ -51,78 +68,383 @@ def get_pattern_by_id(pattern_id):
     return _READ_PATTERNS.get(pattern_id)
 
 
+class Window:
+    # Rectangular region of interest; rows and cols are inclusive
+    # (first, last) pairs. The pixels of each subpage inside the window
+    # are tabulated on first use.
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self._tables = {}
+
+    def __contains__(self, idx):
+        row = idx // NUM_COLS
+        col = idx - row*NUM_COLS
+        return self.rows[0] <= row <= self.rows[1] and self.cols[0] <= col <= self.cols[1]
+
+    def sp_range(self, pattern, sp_id):
+        key = (pattern.pattern_id, sp_id)
+        table = self._tables.get(key)
+        if table is None:
+            table = self._tables[key] = array('H', (
+                idx for idx in pattern.sp_range(sp_id) if idx in self
+            ))
+        return table
+
 class Subpage:
-    def __init__(self, pattern, sp_id):
+    def __init__(self, pattern, sp_id, window=None):
         self.pattern = pattern
         self.id = sp_id
+        self.window = window
 
     def sp_range(self):
+        if self.window is not None:
+            return self.window.sp_range(self.pattern, self.id)
         return self.pattern.sp_range(self.id)
 
 
 ## Image Buffers
 
 class RawImage:
-    def __init__(self):
+    def __init__(self, *, block_rows=BLOCK_ROWS, max_gap=MAX_GAP):
         self.pix = array_filled('h', IMAGE_SIZE)
 
+        # block mode pulls runs of up to block_rows rows of pixel RAM per
+        # transaction into a preallocated buffer; block_rows=0 selects the
+        # per-pixel fallback
+        self.block_rows = block_rows
+        self.max_gap = max_gap
+        if block_rows:
+            self._block = bytearray(block_rows * NUM_COLS * REG_SIZE)
+            self._block_mv = memoryview(self._block)
+        else:
+            self._block = None
+
     def __getitem__(self, idx):
         return self.pix[idx]
 
     def read(self, iface, update_idx = None):
+        if update_idx is None:
+            update_idx = range(IMAGE_SIZE)
+        if self._block is not None:
+            self._read_block(iface, update_idx)
+        else:
+            self._read_pixels(iface, update_idx)
+
+    def _read_pixels(self, iface, update_idx):
         buf = bytearray(REG_SIZE)
-        update_idx = update_idx or range(IMAGE_SIZE)
         for offset in update_idx:
             iface.read_into(PIX_DATA_ADDRESS + offset, buf)
             self.pix[offset] = struct.unpack(PIX_STRUCT_FMT, buf)[0]
 
+    def _read_block(self, iface, update_idx):
+        # update_idx must be an ascending sequence, which all subpage and
+        # window ranges are. Pixels no more than max_gap words apart are
+        # coalesced into runs, each fetched in one transaction, so a window
+        # costs one transaction per row but a whole subpage still comes in
+        # blocks of rows.
+        pix = self.pix
+        buf = self._block
+        block_words = len(buf) // REG_SIZE
+        max_gap = self.max_gap
+        count = len(update_idx)
+        first = 0
+        while first < count:
+            base = last = update_idx[first]
+            end = first + 1
+            while end < count:
+                idx = update_idx[end]
+                if idx - last > max_gap or idx - base >= block_words:
+                    break
+                last = idx
+                end += 1
+            iface.read_into(PIX_DATA_ADDRESS + base, self._block_view(last - base + 1))
+
+            for i in range(first, end):
+                # decode big-endian int16 in place, without a temporary
+                idx = update_idx[i]
+                offset = (idx - base) * REG_SIZE
+                word = buf[offset] << 8 | buf[offset + 1]
+                pix[idx] = word - 0x10000 if word & 0x8000 else word
+            first = end
+
+    def _block_view(self, words):
+        if words * REG_SIZE == len(self._block):
+            return self._block_mv
+        return self._block_mv[:words * REG_SIZE]
+
 
 ImageLimits = namedtuple('ScaleLimits', ('min_h', 'max_h', 'min_idx', 'max_idx'))
 
+def exclusion_mask(exclude_idx):
+    # one bit per pixel, set for pixels which statistics should skip
+    mask = bytearray(IMAGE_SIZE // 8)
+    for idx in exclude_idx:
+        mask[idx >> 3] |= 1 << (idx & 7)
+    return mask
+
+class ImageStats:
+    # Single-pass statistics over a frame (ProcessedImage.buf or a temperature
+    # map): min, max, mean, variance, argmin/argmax and a histogram with fixed
+    # bins over [lo, hi). Values outside the range count towards the end bins;
+    # NaN and inf are skipped like excluded pixels.
+    # All buffers are allocated up front, update() only overwrites them.
+    def __init__(self, exclude_idx=(), *, bins=16, lo=0.0, hi=100.0):
+        self.exclude_idx = exclude_idx
+        self.mask = exclusion_mask(exclude_idx)
+        self.hist = array_filled('H', bins)
+        self.lo = lo
+        self.hi = hi
+        self._bin_scale = bins / (hi - lo)
+
+        self.count = 0
+        self.min = self.max = None
+        self.min_idx = self.max_idx = None
+        self.mean = self.var = None
+
+    @classmethod
+    def from_calibration(cls, calib, **kwargs):
+        # skip the outliers and pixels that failed factory calibration
+        return cls(calib.outliers + calib.pix_data.failed, **kwargs)
+
+    @micropython.native
+    def update(self, values):
+        mask = self.mask
+        hist = self.hist
+        bins = len(hist)
+        for i in range(bins):
+            hist[i] = 0
+
+        lo = self.lo
+        bin_scale = self._bin_scale
+        count = 0
+        min_v = max_v = shift = 0.0
+        min_idx = max_idx = 0
+        # sums are taken relative to the first value to keep float precision
+        total = total_sq = 0.0
+
+        for idx in range(len(values)):
+            if mask[idx >> 3] & (1 << (idx & 7)):
+                continue
+            v = values[idx]
+            if v - v != 0.0:
+                # NaN or inf, e.g. a pixel without a real temperature
+                continue
+            if count == 0:
+                min_v = max_v = shift = v
+                min_idx = max_idx = idx
+            elif v < min_v:
+                min_v, min_idx = v, idx
+            elif v > max_v:
+                max_v, max_idx = v, idx
+            count += 1
+
+            d = v - shift
+            total += d
+            total_sq += d*d
+
+            b = int((v - lo)*bin_scale)
+            if b < 0:
+                b = 0
+            elif b >= bins:
+                b = bins - 1
+            hist[b] += 1
+
+        self.count = count
+        if count == 0:
+            self.min = self.max = self.min_idx = self.max_idx = None
+            self.mean = self.var = None
+            return self
+
+        mean_d = total/count
+        self.min, self.max = min_v, max_v
+        self.min_idx, self.max_idx = min_idx, max_idx
+        self.mean = shift + mean_d
+        self.var = max(total_sq/count - mean_d*mean_d, 0.0)
+        return self
+
+    def limits(self):
+        return ImageLimits(self.min, self.max, self.min_idx, self.max_idx)
+
 _INTERP_NEIGHBOURS = tuple(
-    row * NUM_COLS + col
+    (row, col)
     for row in (-1, 0, 1)
     for col in (-1, 0, 1)
     if row != 0 or col != 0
 )
 
+class RepairMap:
+    # Bad pixel repair table, built once. Each bad pixel is replaced by the
+    # mean of its good neighbours within the image (no wrap across row
+    # edges). The neighbours of bad pixel i are neighbours[start[i]:start[i+1]]
+    # and each carries the same precomputed weight, weights[i].
+    def __init__(self, bad_pixels):
+        self.source = bad_pixels
+        bad_set = set(bad_pixels)
+        bad = sorted(bad_set)
+        self.bad_idx = array('H', bad)
+        self.start = array_filled('H', len(bad) + 1)
+        self.weights = array_filled('f', len(bad), 0.0)
+        self.neighbours = array('H')
+
+        for i, bad_idx in enumerate(bad):
+            row, col = divmod(bad_idx, NUM_COLS)
+            count = 0
+            for d_row, d_col in _INTERP_NEIGHBOURS:
+                r, c = row + d_row, col + d_col
+                idx = r*NUM_COLS + c
+                if 0 <= r < NUM_ROWS and 0 <= c < NUM_COLS and idx not in bad_set:
+                    self.neighbours.append(idx)
+                    count += 1
+            self.start[i + 1] = self.start[i] + count
+            if count:
+                self.weights[i] = 1/count
+
+    @classmethod
+    def from_calibration(cls, calib):
+        return cls(calib.outliers + calib.pix_data.failed)
+
+    def repair(self, values):
+        _repair(self.bad_idx, self.start, self.neighbours, self.weights, values)
+        return values
+
+@micropython.native
+def _repair(bad_idx, start, neighbours, weights, values):
+    # pixels without good neighbours are left as they are
+    for i in range(len(bad_idx)):
+        first = start[i]
+        end = start[i + 1]
+        if first == end:
+            continue
+        total = 0.0
+        for j in range(first, end):
+            total += values[neighbours[j]]
+        values[bad_idx[i]] = total*weights[i]
+
+@micropython.native
+def _compensate(update_idx, pix, v_ir_out, alpha_out, buf_out,
+                pix_os_ref, pix_kta, pix_kv, pix_alpha, il_offset,
+                gain, ta, vdd, inv_emissivity, os_cp, alpha_cp, alpha_scale):
+    # IR data compensation (offset, Vdd, Ta, emissivity, gradient) and
+    # sensitivity normalization over flat calibration arrays. The compensated
+    # alpha is kept for the temperature calculation.
+    if il_offset is None:
+        for idx in update_idx:
+            offset = pix_os_ref[idx]*(1 + pix_kta[idx]*ta)*(1 + pix_kv[idx]*vdd)
+            v_ir = (pix[idx]*gain - offset)*inv_emissivity - os_cp
+            alpha = (pix_alpha[idx] - alpha_cp)*alpha_scale
+            v_ir_out[idx] = v_ir
+            alpha_out[idx] = alpha
+            buf_out[idx] = v_ir/alpha
+    else:
+        for idx in update_idx:
+            offset = pix_os_ref[idx]*(1 + pix_kta[idx]*ta)*(1 + pix_kv[idx]*vdd)
+            v_ir = (pix[idx]*gain - offset + il_offset[idx])*inv_emissivity - os_cp
+            alpha = (pix_alpha[idx] - alpha_cp)*alpha_scale
+            v_ir_out[idx] = v_ir
+            alpha_out[idx] = alpha
+            buf_out[idx] = v_ir/alpha
+
+@micropython.native
+def _temperature_frame(v_ir_arr, alpha_arr, out, ta_r, drift, ksto1, alpha_k, ct, ksto, alpha_ext):
+    # a pixel whose reading has no real temperature, such as a dead or
+    # saturated one at the rail, becomes NaN instead of raising
+    sqrt = math.sqrt
+    nan = float('nan')
+    if ct is not None:
+        ct1, ct2, ct3, ct4 = ct
+    for idx in range(len(out)):
+        v_ir = v_ir_arr[idx]
+        alpha = alpha_arr[idx]
+        alpha_3 = alpha*alpha*alpha
+        radicand = v_ir*alpha_3 + ta_r*alpha_3*alpha
+        if not radicand >= 0.0:
+            out[idx] = nan
+            continue
+        s_x = sqrt(sqrt(radicand))*ksto1
+        radicand = v_ir/(alpha*alpha_k + s_x) + ta_r
+        if not radicand >= 0.0:
+            out[idx] = nan
+            continue
+        to = sqrt(sqrt(radicand)) - TEMP_K + drift
+        if ct is None:
+            out[idx] = to
+            continue
+
+        # extended range: find the band by direct comparison with the corner
+        # temperatures, then redo the calculation with that band's constants
+        if to < ct2:
+            if to < ct1:
+                out[idx] = ct1
+                continue
+            band = 0
+        elif to < ct3:
+            band = 1
+        elif to < ct4:
+            band = 2
+        else:
+            band = 3
+        to_ext = v_ir/(alpha*alpha_ext[band]*(1 + ksto[band]*(to - ct[band]))) + ta_r
+        if not to_ext >= 0.0:
+            out[idx] = nan
+            continue
+        out[idx] = sqrt(sqrt(to_ext)) - TEMP_K + drift
+
 class ProcessedImage:
-    def __init__(self, calib):
+    def __init__(self, calib, *, vectorize=False, repair=False):
         # pix_data should be a sequence of ints
         self.calib = calib
         self.v_ir = array_filled('f', IMAGE_SIZE, 0.0)
         self.alpha = array_filled('f', IMAGE_SIZE, 1.0)
         self.buf = array_filled('f', IMAGE_SIZE, 1.0)
 
-    def update(self, pix_data, subpage, state):
-        if self.calib.use_tgc:
-            pix_os_cp = self._calc_os_cp(subpage, state)
-            pix_alpha_cp = self.calib.pix_alpha_cp[subpage.id]
-
-        for idx, raw in pix_data:
-            ## IR data compensation - offset, Vdd, and Ta
-            kta = self.calib.pix_kta[idx]
-
-            row, col = divmod(idx, NUM_COLS)
-            kv = self.calib.kv_avg[row % 2][col % 2]
-            
-            offset = self.calib.pix_os_ref[idx]
-            offset *= (1 + kta*state.ta)*(1 + kv*state.vdd)
-
-            v_os = raw*state.gain - offset
-            if subpage.pattern is InterleavedPattern:
-                v_os += self.calib.il_offset[idx]
-            v_ir = v_os / self.calib.emissivity
-
-            ## IR data gradient compensation
-            if self.calib.use_tgc:
-                v_ir -= self.calib.tgc*pix_os_cp
-
-            # preserve v_ir for temperature calculations
-            self.v_ir[idx] = v_ir
+        self._limit_stats = None
+
+        # repair=True patches the outliers and failed pixels after every
+        # update and in every temperature frame
+        self.repair_map = RepairMap.from_calibration(calib) if repair else None
+        self._interp_map = None
+
+        # optional ulab/NumPy backend for the compensation pass
+        self._vector = None
+        if vectorize:
+            from mlx90640.ndkernel import VectorKernel
+            self._vector = VectorKernel(calib)
+
+    def update(self, raw_image, subpage, state, update_idx=None):
+        # update_idx restricts the pass to some of the subpage's pixels,
+        # e.g. those in a region of interest
+        calib = self.calib
+
+        # constants for the whole subpage, hoisted out of the pixel loop
+        if calib.use_tgc:
+            os_cp = calib.tgc*self._calc_os_cp(subpage, state)
+            alpha_cp = calib.tgc*calib.pix_alpha_cp[subpage.id]
+        else:
+            os_cp = alpha_cp = 0.0
+
+        if update_idx is None:
+            # the vector kernel always covers whole subpages
+            if self._vector is not None and subpage.window is None:
+                self._vector.update(raw_image, subpage, state, os_cp, alpha_cp, self.v_ir, self.alpha, self.buf)
+                self._repair_buf()
+                return
+            update_idx = subpage.sp_range()
+
+        # the interleaved pattern needs an extra per-pixel offset
+        il_offset = calib.il_offset if subpage.pattern is InterleavedPattern else None
+
+        _compensate(
+            update_idx, raw_image.pix, self.v_ir, self.alpha, self.buf,
+            calib.pix_os_ref, calib.pix_kta, calib.pix_kv, calib.pix_alpha, il_offset,
+            state.gain, state.ta, state.vdd, 1.0/calib.emissivity,
+            os_cp, alpha_cp, 1 + calib.ksta*state.ta,
+        )
+        self._repair_buf()
 
-            alpha = self._calc_alpha(idx, state.ta)
-            self.buf[idx] = v_ir/alpha
+    def _repair_buf(self):
+        if self.repair_map is not None:
+            self.repair_map.repair(self.buf)
 
     def _calc_os_cp(self, subpage, state):
         pix_os_cp = self.calib.pix_os_cp[subpage.id]
@@ -182,27 +504,33 @@ class ProcessedImage:
     def _get_range_band(self, t):
         return sum(1 for ct in self.calib.ct if t >= ct) - 1
 
+    def calc_temperature_frame(self, state, out, *, extended=False):
+        # Object temperature in degC of every pixel, written into out (an
+        # array('f') of IMAGE_SIZE). Uses the alpha compensated by the last
+        # update of each pixel; state supplies the reflected temperature.
+        calib = self.calib
+        ksto = calib.ksto
+        _temperature_frame(
+            self.v_ir, self.alpha, out, state.ta_r, calib.drift,
+            ksto[1], 1 - TEMP_K*ksto[1],
+            calib.ct if extended else None, ksto, calib.alpha_ext,
+        )
+        if self.repair_map is not None:
+            self.repair_map.repair(out)
+        return out
+
     def calc_limits(self, *, exclude_idx=()):
-        # find min/max in place to keep mem usage down
-        min_h, min_idx = None, None
-        max_h, max_idx = None, None
-        for idx, h in enumerate(self.buf):
-            if idx in exclude_idx:
-                continue
-            if min_h is None or h < min_h:
-                min_h, min_idx = h, idx
-            if max_h is None or h > max_h:
-                max_h, max_idx = h, idx
-        return ImageLimits(min_h, max_h, min_idx, max_idx)
+        # single pass with an exclusion bitmask, rebuilt only when a
+        # different exclusion sequence is passed in
+        stats = self._limit_stats
+        if stats is None or stats.exclude_idx is not exclude_idx:
+            stats = self._limit_stats = ImageStats(exclude_idx, bins=1)
+        return stats.update(self.buf).limits()
 
     def interpolate_bad_pixels(self, bad_pixels):
-        for bad_idx in bad_pixels:
-            count = 0
-            total = 0
-            for offset in _INTERP_NEIGHBOURS:
-                idx = bad_idx + offset
-                if idx in range(IMAGE_SIZE) and idx not in bad_pixels:
-                    count += 1
-                    total += self.buf[idx]
-            if count > 0:
-                self.buf[bad_idx] = total/count
+        # the repair table is rebuilt only when a different sequence of bad
+        # pixels is passed in
+        repair_map = self._interp_map
+        if repair_map is None or repair_map.source is not bad_pixels:
+            repair_map = self._interp_map = RepairMap(bad_pixels)
+        repair_map.repair(self.buf)
@@ -24,10 +24,46 @@ example.
 
 import utime as time
 from machine import Pin, I2C
-from mlx90640 import MLX90640
+from mlx90640 import MLX90640, DataNotAvailableError
 from mlx90640.calibration import NUM_ROWS, NUM_COLS, IMAGE_SIZE, TEMP_K
-from mlx90640.image import ChessPattern, InterleavedPattern
+from mlx90640.image import ChessPattern, InterleavedPattern, ImageStats
 import array
+import micropython
+
+
+## Result of an acquisition step: no new data from the camera yet
+ACQ_WAIT = 0
+## Result of an acquisition step: raw subpage read, processing pending
+ACQ_BUSY = 1
+## Result of an acquisition step: a subpage has been processed
+ACQ_SUBPAGE = 2
+## Result of an acquisition step: both subpages of a frame are processed
+ACQ_FRAME = 3
+
+## Fractional bits of the fixed-point pixels scaled by @c normalize()
+NORM_FRAC_BITS = 8
+
+
+@micropython.native
+def _normalize(in_array, order, out, lo, span, scale, top):
+    """!
+    @brief   Scale pixels into integer levels, reordered through a table.
+    @details Each value is offset by @c lo, keeping its fraction. Offsets
+             from 0 to @c span are converted once to fixed point with
+             @c NORM_FRAC_BITS fractional bits, then rounded and shifted
+             with integer arithmetic; other offsets, and NaN, become 0 or
+             @c top without being converted.
+    """
+    half = 1 << (NORM_FRAC_BITS - 1)
+    for pos in range(len(order)):
+        d = in_array[order[pos]] - lo
+        if not d > 0.0:
+            pix = 0
+        elif d >= span:
+            pix = top
+        else:
+            pix = (int(d * scale) + half) >> NORM_FRAC_BITS
+        out[pos] = pix
 
 
 class MLX_Cam:
@@ -67,6 +103,86 @@ class MLX_Cam:
         ## A local reference to the image object within the camera driver
         self._image = self._camera.image
 
+        ## The camera state (Ta, Vdd, gain) read with the latest subpage
+        self._state = None
+
+        ## Preallocated per-pixel temperatures in degrees C
+        self._temps = array.array('f', (0.0 for _ in range(IMAGE_SIZE)))
+        # subpage sequence number and range option of the temperatures in
+        # self._temps, so that they are computed once per subpage
+        self._temps_seq = -1
+        self._temps_extended = False
+
+        ## Sequence number of the latest processed subpage, counting from 1
+        self.seq = 0
+        ## The @c ticks_us() time at which the latest subpage was found ready
+        self.timestamp = None
+        ## The ID (0 or 1) of the latest processed subpage
+        self.subpage = None
+        ## Per-pixel sequence number (modulo 2**16) of the subpage which last
+        #  refreshed that pixel; see @c pixel_age()
+        self.pix_seq = array.array('H', (0 for _ in range(IMAGE_SIZE)))
+
+        ## Index of the sensor pixel shown at each position of the mirrored
+        #  image, row by row
+        self._mirror = array.array('H', (row * width + (width - col - 1)
+                                         for row in range(height)
+                                         for col in range(width)))
+        ## Single-pass statistics used to find the range of an image, which
+        #  skip the outliers and the pixels that failed calibration so that
+        #  a dead or hot pixel doesn't set the display range
+        self._stats = ImageStats.from_calibration(self._camera.calib, bins=1)
+        ## Preallocated image scaled from 0 to 255 by @c normalize()
+        self._norm = bytearray(width * height)
+
+        ## While a window is set, the number of subpages read through the
+        #  window between full-frame refreshes
+        self.refresh_period = 16
+        # subpages read through the window since the last refresh, and the
+        # number of subpages of the current refresh still to be read
+        self._since_refresh = 0
+        self._refresh_left = 0
+        # centre of the window set by follow(), or -1 if none was set by it
+        self._win_row = self._win_col = -1
+
+        ## Recorder which saves every subpage read, or @c None
+        self.recorder = None
+        ## Frame writer which streams every processed subpage, or @c None
+        self.writer = None
+
+
+    def normalize(self, in_array, out=None, levels=256, stats=None):
+        """!
+        @brief   Scale an image into integer levels for display.
+        @details The range of the image is found in one statistics pass,
+                 without the camera's known bad pixels, which are clamped
+                 to the ends of the range.
+                 Pixels are then converted once to fixed point and rounded
+                 with integer arithmetic into a preallocated buffer,
+                 mirrored so that the image looks as it would to someone
+                 standing behind the camera. The lowest pixel becomes 0 and
+                 the highest becomes @c levels - 1, however small the
+                 range; an image with no contrast becomes all 0.
+        @param   in_array An array of (self._width * self._height) pixel values
+        @param   out A @c bytearray of (self._width * self._height) bytes to
+                 fill, or @c None to use a buffer owned by this object
+        @param   levels The number of output levels; more than 256 are
+                 clamped to 256
+        @param   stats An @c ImageStats already updated with @c in_array, to
+                 skip the statistics pass, or @c None
+        @returns The buffer of scaled pixels, mirrored, row by row
+        """
+        if out is None:
+            out = self._norm
+        if stats is None:
+            stats = self._stats.update(in_array)
+        top = min(levels, 256) - 1
+        span = stats.max - stats.min
+        scale = (top << NORM_FRAC_BITS) / span if span > 0 else 0.0
+        _normalize(in_array, self._mirror, out, stats.min, span, scale,
+                   top if span > 0 else 0)
+        return out
+
 
     def ascii_image(self,in_array, pixel="██", textcolor="0;180;0"):
         """!
@@ -100,12 +216,12 @@ class MLX_Cam:
                  letter representing the intensity of red, green, and blue from
                  0 to 255
         """
-        minny = min(in_array)
-        scale = 255.0 / (max(in_array) - minny)
+        norm = self.normalize(in_array)
+        pos = 0
         for row in range(self._height):
             for col in range(self._width):
-                pix = int((in_array[row * self._width + (self._width - col - 1)]
-                           - minny) * scale)
+                pix = norm[pos]
+                pos += 1
                 print(f"\033[38;2;{pix};{pix};{pix}m{pixel}", end='')
             print(f"\033[38;2;{textcolor}m")
 
@@ -144,26 +260,31 @@ class MLX_Cam:
         @details This function generates a set of lines, each having one row of
                  image data in Comma Separated Variable format. The lines can
                  be printed or saved to a file using a @c for loop.
+                 Scaled data is taken from @c normalize(); limits which span
+                 more than 256 values are reached in 256 evenly spaced
+                 steps. For live monitoring,
+                 @c frame_stream.FrameWriter sends images in a compact
+                 binary form instead.
         @param  in_array The array of data to be presented
-        @param   limits A 2-iterable containing the maximum and minimum values
+        @param   limits A 2-iterable containing the minimum and maximum values
                  to which the data should be scaled, or @c None for no scaling
         """
+        width = self._width
         if limits and len(limits) == 2:
-            scale = (limits[1] - limits[0]) / (max(in_array) - min(in_array))
-            offset = limits[0] - min(in_array)
+            low = int(limits[0])
+            span = int(limits[1]) - low
+            top = min(span, 255) or 1
+            norm = self.normalize(in_array, levels=top + 1)
+            for row in range(self._height):
+                start = row * width
+                yield ",".join(str(low + norm[pos] * span // top)
+                               for pos in range(start, start + width))
         else:
-            offset = 0.0
-            scale = 1.0
-        for row in range(self._height):
-            line = ""
-            for col in range(self._width):
-                pix = int((in_array[row * self._width + (self._width - col - 1)]
-                          * scale) + offset)
-                if col:
-                    line += ","
-                line += f"{pix}"
-#             line += "\r\n"
-            yield line
+            mirror = self._mirror
+            for row in range(self._height):
+                start = row * width
+                yield ",".join(str(int(in_array[mirror[pos]]))
+                               for pos in range(start, start + width))
         return
 
 
@@ -172,36 +293,266 @@ class MLX_Cam:
         @brief   Get one image from a MLX90640 camera.
         @details Grab one image from the given camera and return it. Both
                  subframes (the odd checkerboard portions of the image) are
-                 grabbed and combined. This assumes that the camera is in the
-                 ChessPattern (default) mode as it probably should be.
+                 grabbed and combined. This function blocks until the image
+                 is complete; tasks should use @c acquire() instead.
         @returns A reference to the image object we've just filled with data
         """
-        for subpage in (0, 1):
-            while not self._camera.has_data:
-                time.sleep_ms(50)
-                print('.', end='')
-            self._camera.read_image(subpage)
+        acquisition = self.acquire()
+        while True:
+            result = next(acquisition)
+            if result == ACQ_FRAME:
+                return self._image
+            if result == ACQ_WAIT:
+                time.sleep_ms(5)
+
+
+    def acquire(self):
+        """!
+        @brief   Generator which acquires images without ever blocking.
+        @details Each call to @c next() does a short, bounded piece of work
+                 and returns what happened, so a @c cotask task can drive
+                 the acquisition once per run:
+                 - @c ACQ_WAIT: the camera has no new subpage; only the
+                   status register was read, once
+                 - @c ACQ_BUSY: a subpage and its camera state were read;
+                   processing happens on the next call
+                 - @c ACQ_SUBPAGE: a subpage has been processed into the
+                   image
+                 - @c ACQ_FRAME: a subpage has been processed and both
+                   subpages of the frame are now up to date
+                 The subpage which the camera reports as last measured is
+                 read, and the camera clears its flag, so no subpage is read
+                 twice. The camera does not queue subpages, though: if the
+                 generator is not stepped within a subpage period, the
+                 older subpage is overwritten and lost.
+                 Every processed subpage is published at once: @c seq,
+                 @c timestamp, @c subpage and @c pix_seq are updated before
+                 @c ACQ_SUBPAGE or @c ACQ_FRAME is returned, so consumers can
+                 act on half frames as well as full ones.
+        @returns A generator yielding one of the @c ACQ_ codes per step
+        """
+        done = 0
+        while True:
+            sp_id = self._camera.poll()
+            if sp_id < 0:
+                yield ACQ_WAIT
+                continue
+
+            stamp = time.ticks_us()
+            self._camera.read_image(sp_id, full=self._refresh_due())
             state = self._camera.read_state()
-            image = self._camera.process_image(subpage, state)
+            if self.recorder is not None:
+                self.recorder.record(self._camera, stamp)
+            yield ACQ_BUSY
+
+            self._camera.process_image(sp_id, state)
+            self._publish(sp_id, stamp, state)
+            if self.writer is not None:
+                self.writer.write(self.get_temperatures(), self.seq, stamp,
+                                  state, sp_id)
+            done |= 1 << sp_id
+            if done == 0b11:
+                done = 0
+                yield ACQ_FRAME
+            else:
+                yield ACQ_SUBPAGE
+
+
+    def start_recording(self, stream):
+        """!
+        @brief   Save the data of every subpage read from now on.
+        @details The EEPROM and every subpage's pixels and auxiliary data
+                 are written to the stream, so that the recording can be
+                 replayed on a PC through @c ReplayI2C in @c bench/replay.py.
+                 No extra data is read from the camera for each subpage.
+                 The recorder is only imported here, so that it takes no
+                 memory on the board unless something is recorded.
+        @param   stream A file opened for binary writing
+        """
+        from mlx90640.recorder import Recorder
+        self.recorder = Recorder(self._camera, stream)
+
+
+    def start_streaming(self, stream, **options):
+        """!
+        @brief   Send the temperatures of every processed subpage as binary
+                 frames.
+        @details A @c frame_stream.FrameWriter writes each frame when
+                 @c acquire() has published a subpage. The temperatures are
+                 those returned by @c get_temperatures(), which computes
+                 them only once per subpage, so a task which also uses them
+                 doesn't convert the image twice. Frames can be shown on a
+                 PC with @c tools/stream_view.py. The writer is only
+                 imported here, so that it takes no memory on the board
+                 unless something is streamed.
+        @param   stream An object with a @c write() method, such as
+                 @c pyb.USB_VCP() or a file opened in binary mode
+        @param   options Keyword arguments for the @c FrameWriter, such as
+                 @c int16, @c delta or @c limits
+        """
+        from frame_stream import FrameWriter
+        self.writer = FrameWriter(stream, IMAGE_SIZE, **options)
+
 
-        return image
+    def stop_streaming(self):
+        """!
+        @brief   Stop sending frames. The stream is left open.
+        """
+        self.writer = None
+
+
+    def stop_recording(self):
+        """!
+        @brief   Stop saving subpages and close the recording.
+        @returns The number of subpages which were recorded
+        """
+        records = 0
+        if self.recorder is not None:
+            records = self.recorder.records
+            self.recorder.stream.close()
+            self.recorder = None
+        return records
+
+
+    def set_window(self, rows=None, cols=None):
+        """!
+        @brief   Read and process only a region of interest of the image.
+        @details Only the pixel RAM rows which hold the window are read over
+                 I2C and only its pixels are processed, so each subpage
+                 takes much less time on the bus. Pixels outside the window
+                 keep their old values until a full-frame refresh, which is
+                 done every @c refresh_period subpages.
+        @param   rows The first and last rows of the window, or @c None for
+                 all rows
+        @param   cols The first and last columns of the window in sensor
+                 order, or @c None for all columns; with neither @c rows
+                 nor @c cols the whole image is read again
+        """
+        self._camera.set_window(rows, cols)
+        self._win_row = self._win_col = -1
+        self._since_refresh = 0
+
+
+    def follow(self, x, y, half_rows=3, half_cols=5):
+        """!
+        @brief   Keep a window centred on a moving target.
+        @details The window keeps its size at the edges of the image. It is
+                 only moved when the target reaches another pixel, so it can
+                 be called with every new position.
+        @param   x The column of the target in sensor order
+        @param   y The row of the target
+        @param   half_rows The number of rows in the window above and below
+                 the target
+        @param   half_cols The number of columns in the window on each side
+                 of the target
+        """
+        row = int(y + 0.5)
+        col = int(x + 0.5)
+        if row == self._win_row and col == self._win_col:
+            return
+        first_row = min(max(row - half_rows, 0), self._height - 2*half_rows - 1)
+        first_col = min(max(col - half_cols, 0), self._width - 2*half_cols - 1)
+        self._camera.set_window((first_row, first_row + 2*half_rows),
+                                (first_col, first_col + 2*half_cols))
+        self._win_row = row
+        self._win_col = col
+
+
+    def _refresh_due(self):
+        """!
+        @brief   Decide whether the next subpage is read in full.
+        @details While a window is set, both subpages of a frame are read in
+                 full after every @c refresh_period windowed subpages.
+        @returns @c True to read the whole subpage
+        """
+        if self._camera.window is None:
+            return True
+        if self._refresh_left == 0 and self._since_refresh >= self.refresh_period:
+            self._refresh_left = 2
+        if self._refresh_left:
+            self._refresh_left -= 1
+            self._since_refresh = 0
+            return True
+        self._since_refresh += 1
+        return False
+
+
+    def get_temperatures(self, out=None, extended=False):
+        """!
+        @brief   Compute the temperature of every pixel of the latest image.
+        @details All 768 pixels are converted in a single pass, with the
+                 per-frame constants computed once, into a preallocated
+                 array so that no memory is allocated per frame. The pixels
+                 are in sensor order, not mirrored as in @c get_array().
+                 Into the buffer owned by this object they are converted
+                 only once per subpage; later calls return the same values.
+        @param   out An @c array('f') of @c IMAGE_SIZE to fill, or @c None to
+                 use a buffer owned by this object
+        @param   extended Set to @c True to use the extended temperature
+                 range calculation, which is more accurate above about 80 C
+        @returns The array of pixel temperatures in degrees Celsius
+        @raises  DataNotAvailableError if no subpage has been processed yet
+        """
+        if self._state is None:
+            raise DataNotAvailableError("no subpage has been processed yet")
+        if out is not None:
+            return self._image.calc_temperature_frame(self._state, out,
+                                                      extended=extended)
+        if self._temps_seq != self.seq or self._temps_extended != extended:
+            self._image.calc_temperature_frame(self._state, self._temps,
+                                               extended=extended)
+            self._temps_seq = self.seq
+            self._temps_extended = extended
+        return self._temps
     
-    def get_array(self,in_array):
+    def _publish(self, sp_id, stamp, state):
+        """!
+        @brief   Record the sequence number and time of a processed subpage.
+        @param   sp_id The ID of the subpage which was just processed
+        @param   stamp The @c ticks_us() time at which its data was ready
+        @param   state The camera state which was used to process it
+        """
+        self._state = state
+        self.seq += 1
+        self.timestamp = stamp
+        self.subpage = sp_id
+        seq = self.seq & 0xFFFF
+        pix_seq = self.pix_seq
+        for idx in self._camera.last_read.sp_range():
+            pix_seq[idx] = seq
+
+
+    def updated_idx(self):
+        """!
+        @brief   Get the indices of the pixels refreshed by the latest subpage.
+        @returns An iterable of pixel indices in sensor order
+        """
+        return self._camera.last_read.sp_range()
+
+
+    def pixel_age(self, idx):
+        """!
+        @brief   Find how many subpages ago a pixel was last refreshed.
+        @param   idx The index of the pixel in sensor order
+        @returns 0 if the pixel belongs to the latest subpage, 1 if it was
+                 refreshed by the one before it, and so on
+        """
+        return (self.seq - self.pix_seq[idx]) & 0xFFFF
+
+
+    def get_array(self, in_array, out=None):
         """!
         @brief    Show camera image as an array of values from 0 to 255
-        @return   Returns an array of pixels from 0 to 255
+        @details  The image is mirrored as in @c ascii_image(). No memory is
+                  allocated; unless @c out is given, the returned buffer is
+                  reused by the next call.
+        @param    in_array An array of (self._width * self._height) pixel values
+        @param    out A @c bytearray to fill, or @c None to use a buffer owned
+                  by this object
+        @return   Returns a bytearray of pixels from 0 to 255
 
         """
-        minny = min(in_array)
-        scale = 255.0 / (max(in_array) - minny)
-        pix_array = array.array('B')
-        for row in range(self._height):
-            for col in range(self._width):
-                pix = int((in_array[row * self._width + (self._width - col - 1)]
-                        - minny) * scale)
-                pix_array.append(pix)
-       
-        return pix_array
+        return self.normalize(in_array, out)
                 
 def dfs(i, data):
     '''!  @brief                              Finds the location of the hottest spot.
@@ -209,6 +560,8 @@ def dfs(i, data):
        @param i                               Index for checking through data.
        @param data                            The outputted pixel data from the thermal camera.
        @return                                Returns the location of the heat blob as an array.
+       @note                                  This search only follows pixels along a row; @c blobs.BlobLabeler
+                                              labels whole 2-D blobs in one pass and should be used instead.
     '''
    
     if i < 0 or i >= len(data):
@@ -0,0 +1,69 @@
+""" Array-at-a-time compensation pass for ProcessedImage.
+
+Uses ulab on the device or NumPy on the host. Both subpages are computed
+over the whole frame and merged into the output with where() and a boolean
+subpage mask, which sticks to the operations ulab and NumPy have in common
+and keeps a NaN or inf in one subpage out of the other. The result matches
+the scalar pixel loop within float32 rounding (relative error below 1e-5).
+"""
+
+try:
+    from ulab import numpy as np
+except ImportError:
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+from mlx90640.calibration import IMAGE_SIZE
+from mlx90640.image import InterleavedPattern
+
+if np is not None:
+    # ulab's float is the port's native float, which matches array('f')
+    _FLOAT = getattr(np, 'float32', None) or np.float
+
+class VectorKernel:
+    def __init__(self, calib):
+        if np is None:
+            raise ImportError("vectorized compensation needs ulab or numpy")
+
+        self.calib = calib
+        self.pix_os_ref = np.array(calib.pix_os_ref, dtype=_FLOAT)
+        self.pix_kta = np.array(calib.pix_kta, dtype=_FLOAT)
+        self.pix_kv = np.array(calib.pix_kv, dtype=_FLOAT)
+        self.pix_alpha = np.array(calib.pix_alpha, dtype=_FLOAT)
+        self.il_offset = np.array(calib.il_offset, dtype=_FLOAT)
+        self._masks = {}
+
+    def _get_mask(self, subpage):
+        # boolean mask which is True for the pixels of a subpage
+        key = (subpage.pattern.pattern_id, subpage.id)
+        mask = self._masks.get(key)
+        if mask is None:
+            ones = np.zeros(IMAGE_SIZE, dtype=_FLOAT)
+            for idx in subpage.sp_range():
+                ones[idx] = 1.0
+            mask = self._masks[key] = ones > 0.5
+        return mask
+
+    def update(self, raw_image, subpage, state, os_cp, alpha_cp, v_ir_out, alpha_out, buf_out):
+        calib = self.calib
+        raw = np.array(raw_image.pix, dtype=_FLOAT)
+
+        offset = self.pix_os_ref*(1.0 + self.pix_kta*state.ta)*(1.0 + self.pix_kv*state.vdd)
+        v_os = raw*state.gain - offset
+        if subpage.pattern is InterleavedPattern:
+            v_os = v_os + self.il_offset
+        v_ir = v_os*(1.0/calib.emissivity) - os_cp
+        alpha = (self.pix_alpha - alpha_cp)*(1 + calib.ksta*state.ta)
+        buf = v_ir/alpha
+
+        # select rather than blend: 0*NaN would spread a bad pixel of one
+        # subpage into the stored values of the other
+        mask = self._get_mask(subpage)
+        v_ir_view = np.frombuffer(v_ir_out, dtype=_FLOAT)
+        alpha_view = np.frombuffer(alpha_out, dtype=_FLOAT)
+        buf_view = np.frombuffer(buf_out, dtype=_FLOAT)
+        v_ir_view[:] = np.where(mask, v_ir, v_ir_view)
+        alpha_view[:] = np.where(mask, alpha, alpha_view)
+        buf_view[:] = np.where(mask, buf, buf_view)
@@ -0,0 +1,91 @@
+""" Recording of camera data for replay on a PC.
+
+A recording holds the EEPROM and control register 1 once, then one record
+per subpage with everything MLX90640 reads for it: the pixel words of the
+subpage and the auxiliary RAM snapshot used by read_state(). Only the
+pixels which were read are recorded; when a window is set, its bounds are
+in the record and pixels outside it are left out. Words are stored
+big-endian, as they come off the bus:
+
+    header  '<4sHHH'    magic, version, control register 1, EEPROM words
+            EEPROM words
+    record  '<BBHIBBBB' subpage, pattern ID, pixel word count, ticks_us(),
+                        first and last row, first and last column read
+            auxiliary RAM words (AUX_DATA_SIZE)
+            pixel words read, in Window.sp_range() order
+
+Recording adds no bus traffic, as the data is taken from the driver's own
+buffers after read_image() and read_state(). The recording is replayed
+through ReplayI2C in bench/replay.py, which is host-side code and is not
+copied to the camera's board.
+"""
+
+import struct
+from mlx90640.regmap import (
+    REG_SIZE,
+    EEPROM_ADDRESS,
+    EEPROM_SIZE,
+    MemoryImage,
+)
+from mlx90640.calibration import IMAGE_SIZE, NUM_ROWS, NUM_COLS
+
+RECORDING_MAGIC = b'MLXR'
+RECORDING_VERSION = const(2)
+
+STATUS_ADDRESS = const(0x8000)
+CONTROL_ADDRESS = const(0x800D)
+
+_HEADER_FMT = '<4sHHH'
+_RECORD_FMT = '<BBHIBBBB'
+
+class Recorder:
+    def __init__(self, camera, stream):
+        # stream is a file opened for binary writing; the header is written
+        # at once, reading the EEPROM if the camera has no image of it
+        self.stream = stream
+        self.records = 0
+
+        eeprom = camera.eeprom_image
+        if eeprom is None:
+            eeprom = MemoryImage(EEPROM_ADDRESS, EEPROM_SIZE)
+            eeprom.update(camera.iface)
+        control = bytearray(REG_SIZE)
+        camera.iface.read_into(CONTROL_ADDRESS, control)
+
+        stream.write(struct.pack(_HEADER_FMT, RECORDING_MAGIC, RECORDING_VERSION,
+                                 control[0] << 8 | control[1], EEPROM_SIZE))
+        stream.write(eeprom.data)
+
+        self._head = bytearray(struct.calcsize(_RECORD_FMT))
+        self._pix = bytearray(IMAGE_SIZE * REG_SIZE)
+        self._pix_mv = memoryview(self._pix)
+
+    def record(self, camera, stamp=0):
+        # call after read_image() and read_state() of a subpage; only the
+        # pixels read through the window, if any, are recorded
+        subpage = camera.last_read
+        update_idx = subpage.sp_range()
+        window = subpage.window
+        if window is None:
+            rows = (0, NUM_ROWS - 1)
+            cols = (0, NUM_COLS - 1)
+        else:
+            rows = window.rows
+            cols = window.cols
+        pix = camera.raw.pix
+        buf = self._pix
+        offset = 0
+        for idx in update_idx:
+            word = pix[idx]
+            buf[offset] = (word >> 8) & 0xFF
+            buf[offset + 1] = word & 0xFF
+            offset += REG_SIZE
+
+        struct.pack_into(_RECORD_FMT, self._head, 0, subpage.id,
+                         subpage.pattern.pattern_id, len(update_idx), stamp,
+                         rows[0], rows[1], cols[0], cols[1])
+        stream = self.stream
+        stream.write(self._head)
+        stream.write(camera.aux_data.data)
+        stream.write(self._pix_mv[:offset])
+        self.records += 1
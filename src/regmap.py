@@ -49,6 +49,16 @@ REGISTER_MAP = {
     0x072A : field_desc('vdd_pix',      FD_WORD, signed=True),
 }
 
+# Auxiliary RAM: ambient temperature, supply voltage, gain and compensation
+# pixel readings, all covered by a single read from 0x0700 to 0x072A
+AUX_DATA_ADDRESS = const(0x0700)
+AUX_DATA_SIZE    = const(0x2B)
+
+AUX_REGISTER_MAP = {
+    address : fields for address, fields in REGISTER_MAP.items()
+    if AUX_DATA_ADDRESS <= address < AUX_DATA_ADDRESS + AUX_DATA_SIZE
+}
+
 # Calibration Data
 EEPROM_ADDRESS = const(0x2400)
 EEPROM_SIZE    = const(0x340)
@@ -154,6 +164,34 @@ class CameraInterface:
 
 class ReadOnlyError(Exception): pass
 
+class MemoryImage:
+    # In-memory copy of a contiguous block of camera memory. It stands in for
+    # a CameraInterface, so RegisterMap and the calibration readers can be
+    # served from RAM after a single bulk transfer.
+    def __init__(self, base, size):
+        self.base = base    # first word address
+        self.size = size    # number of words
+        self.data = bytearray(size * REG_SIZE)
+        self._mv = memoryview(self.data)
+
+    def update(self, iface):
+        iface.read_into(self.base, self.data)
+
+    def _offset(self, mem_addr, nbytes):
+        offset = (mem_addr - self.base) * REG_SIZE
+        if offset < 0 or offset + nbytes > len(self.data):
+            raise ValueError(f"address 0x{mem_addr:04X} is outside of memory image")
+        return offset
+
+    def read(self, mem_addr):
+        offset = self._offset(mem_addr, REG_SIZE)
+        return self.data[offset:offset+REG_SIZE]
+    def read_into(self, mem_addr, buf):
+        offset = self._offset(mem_addr, len(buf))
+        buf[:] = self._mv[offset:offset+len(buf)]
+    def write(self, mem_addr, buf):
+        raise ReadOnlyError(f"can't write to 0x{mem_addr:04X}: memory image is read only")
+
 class RegisterMap:
     def __init__(self, iface, register_map, readonly=False):
         # register_map should be a dict of { I2C address : FieldDesc(s) }
@@ -183,6 +221,13 @@ class RegisterMap:
     def __contains__(self, name):
         return name in self._fields
 
+    def struct(self, name, buf):
+        # Struct over buf laid out as the register which holds the named
+        # field, so that all of its fields can be decoded from a single
+        # read into buf; returned with the register's address
+        address, proto = self._fields[name]
+        return address, Struct(buf, proto)
+
     def __getitem__(self, name):
         address, proto = self._fields[name]
 
@@ -24,8 +24,22 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import array
 import gc
-import pyb
-import micropython
+
+# Shares can also be used under CPython, e.g. in simulations of a task list,
+# where there are no interrupts to disable
+try:
+    from pyb import disable_irq, enable_irq
+except ImportError:
+    try:
+        from machine import disable_irq, enable_irq
+    except ImportError:
+        disable_irq = lambda: None
+        enable_irq = lambda state: None
+try:
+    import micropython
+except ImportError:
+    class micropython:
+        native = staticmethod(lambda fun: fun)
 
 
 ## This is a system-wide list of all the queues and shared variables. It is
@@ -71,10 +85,28 @@ class BaseShare:
         self._type_code = type_code
         self._thread_protect = thread_protect
 
+        # Tasks which are made ready to run whenever data is put in
+        self._subscribers = []
+
         # Add this queue to the global share and queue list
         share_list.append (self)
 
 
+    def subscribe (self, task):
+        """!
+        Make a task ready to run whenever data is put into this queue or
+        share, so that it can react to new data at once rather than at its
+        next run time.
+
+        The task's @c go() method is called by @c put(), so the scheduler
+        runs the task as soon as no higher priority task is ready. A task
+        which only reacts to data can be created with no period at all.
+        @param task The task to be made ready by @c put()
+        """
+        if task not in self._subscribers:
+            self._subscribers.append (task)
+
+
 # ============================================================================
 
 class Queue (BaseShare):
@@ -196,7 +228,7 @@ class Queue (BaseShare):
 
         # Prevent data corruption by blocking interrupts during data transfer
         if self._thread_protect and not in_ISR:
-            _irq_state = pyb.disable_irq ()
+            _irq_state = disable_irq ()
 
         # Write the data and advance the counts and pointers
         self._buffer[self._wr_idx] = item
@@ -211,7 +243,11 @@ class Queue (BaseShare):
 
         # Re-enable interrupts
         if self._thread_protect and not in_ISR:
-            pyb.enable_irq (_irq_state)
+            enable_irq (_irq_state)
+
+        # Wake up the tasks waiting for this data
+        for task in self._subscribers:
+            task.go ()
 
 
     @micropython.native
@@ -241,7 +277,7 @@ class Queue (BaseShare):
 
         # Prevent data corruption by blocking interrupts during data transfer
         if self._thread_protect and not in_ISR:
-            irq_state = pyb.disable_irq ()
+            irq_state = disable_irq ()
 
         # Get the item to be returned from the queue
         to_return = self._buffer[self._rd_idx]
@@ -256,7 +292,7 @@ class Queue (BaseShare):
 
         # Re-enable interrupts
         if self._thread_protect and not in_ISR:
-            pyb.enable_irq (irq_state)
+            enable_irq (irq_state)
 
         return (to_return)
 
@@ -408,13 +444,17 @@ class Share (BaseShare):
 
         # Disable interrupts before writing the data
         if self._thread_protect and not in_ISR:
-            irq_state = pyb.disable_irq ()
+            irq_state = disable_irq ()
 
         self._buffer[0] = data
 
         # Re-enable interrupts
         if self._thread_protect and not in_ISR:
-            pyb.enable_irq (irq_state)
+            enable_irq (irq_state)
+
+        # Wake up the tasks waiting for this data
+        for task in self._subscribers:
+            task.go ()
 
 
     @micropython.native
@@ -429,13 +469,13 @@ class Share (BaseShare):
         """
         # Disable interrupts before reading the data
         if self._thread_protect and not in_ISR:
-            irq_state = pyb.disable_irq ()
+            irq_state = disable_irq ()
 
         to_return = self._buffer[0]
 
         # Re-enable interrupts
         if self._thread_protect and not in_ISR:
-            pyb.enable_irq (irq_state)
+            enable_irq (irq_state)
 
         return (to_return)
 
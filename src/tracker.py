@@ -0,0 +1,218 @@
+"""!
+@file tracker.py
+This file contains a tracker which follows warm targets from one thermal
+image to the next and predicts where they will be.
+
+A small, fixed set of tracks is kept, each with an alpha-beta filter of
+position and velocity in pixels and pixels per second. Blobs from a new
+image are matched to the tracks by the nearest predicted position within a
+gate; blobs which match no track start new ones, and tracks which go
+unmatched for too long are dropped. The aim point is the position of the
+best track predicted for the time at which the gun will get there, which
+is the time the image was taken plus the measured latency of processing
+and a fixed time for moving the gun.
+
+@author Adam Westfall
+@author Jason Davis
+@author Conor Fraser
+@copyright Creative Commons CC BY: Please visit https://creativecommons.org/licenses/by/4.0/ to learn more
+"""
+
+import array
+import micropython
+import utime
+
+
+class Tracker:
+    """!
+    @brief   Class which tracks several targets with alpha-beta filters.
+    @details Track @c k is in use if @c hits[k] is not 0. Its filtered
+             position is (@c x[k], @c y[k]) in pixels at @c ticks_us() time
+             @c stamp[k] and its velocity is (@c vx[k], @c vy[k]) in pixels
+             per second. The latest aim point is kept in @c aim_x and
+             @c aim_y.
+    """
+
+    def __init__(self, max_tracks=4, alpha=0.85, beta=0.3, gate=4.0,
+                 max_misses=4, min_hits=2, latency_us=50000, move_us=0):
+        """!
+        @brief   Allocate the tracks.
+        @param   max_tracks The largest number of targets which are tracked
+        @param   alpha The alpha-beta filter gain for position; 1 follows
+                 the measurements exactly
+        @param   beta The alpha-beta filter gain for velocity
+        @param   gate The greatest distance, in pixels, from the predicted
+                 position of a track to a blob which is matched to it
+        @param   max_misses The number of images in a row in which a track
+                 may go unmatched before it is dropped
+        @param   min_hits The number of matches a track needs before it can
+                 be aimed at
+        @param   latency_us The initial estimate of the time from taking an
+                 image to the aim being sent to the gun, in microseconds;
+                 see @c add_latency()
+        @param   move_us The time the gun takes to turn to a new aim, in
+                 microseconds, which is added once to the measured latency
+        """
+        ## The gain of the filter for position
+        self.alpha = alpha
+        ## The gain of the filter for velocity
+        self.beta = beta
+        ## The greatest distance from a track to a matching blob, in pixels
+        self.gate = gate
+        ## The number of unmatched images after which a track is dropped
+        self.max_misses = max_misses
+        ## The number of matches a track needs before it is aimed at
+        self.min_hits = min_hits
+        ## Estimated time from taking an image to the aim being sent
+        self.latency_us = latency_us
+        ## Time for the gun to turn to a new aim
+        self.move_us = move_us
+
+        zeros = [0] * max_tracks
+        self.x = array.array('f', zeros)
+        self.y = array.array('f', zeros)
+        self.vx = array.array('f', zeros)
+        self.vy = array.array('f', zeros)
+        self.stamp = array.array('l', zeros)
+        self.hits = array.array('H', zeros)
+        self.misses = array.array('H', zeros)
+        # flags of the tracks matched in the current update
+        self._matched = bytearray(max_tracks)
+
+        ## The predicted column of the aim point
+        self.aim_x = 0.0
+        ## The predicted row of the aim point
+        self.aim_y = 0.0
+
+
+    def add_latency(self, sample_us, weight=0.25):
+        """!
+        @brief   Refine the latency estimate with a measured sample.
+        @param   sample_us A measured time from taking an image to the aim
+                 being sent to the gun, in microseconds, not counting
+                 @c move_us
+        @param   weight The weight of the new sample in the running average
+        """
+        self.latency_us += int((sample_us - self.latency_us) * weight)
+
+
+    @micropython.native
+    def update(self, stamp, xs, ys, count, order=None):
+        """!
+        @brief   Match the blobs found in a new image to the tracks.
+        @details Blobs are matched in the order given, each to the nearest
+                 unmatched track whose prediction lies within the gate, so
+                 the most important blobs should come first.
+        @param   stamp The @c ticks_us() time at which the image was taken
+        @param   xs The columns of the blobs, such as @c BlobLabeler.cx
+        @param   ys The rows of the blobs, such as @c BlobLabeler.cy
+        @param   count The number of blobs
+        @param   order The indices of the blobs in order of importance, such
+                 as @c BlobLabeler.ranked(), or @c None to take them in the
+                 order of @c xs and @c ys
+        """
+        x = self.x
+        y = self.y
+        vx = self.vx
+        vy = self.vy
+        hits = self.hits
+        misses = self.misses
+        matched = self._matched
+        tracks = len(hits)
+        alpha = self.alpha
+        beta = self.beta
+        gate2 = self.gate * self.gate
+
+        for k in range(tracks):
+            matched[k] = 0
+
+        for n in range(count):
+            if order is not None:
+                n = order[n]
+            zx = xs[n]
+            zy = ys[n]
+
+            # nearest unmatched track within the gate
+            best = -1
+            best_d2 = gate2
+            for k in range(tracks):
+                if hits[k] == 0 or matched[k]:
+                    continue
+                dt = utime.ticks_diff(stamp, self.stamp[k]) / 1000000
+                ex = zx - (x[k] + vx[k]*dt)
+                ey = zy - (y[k] + vy[k]*dt)
+                d2 = ex*ex + ey*ey
+                if d2 <= best_d2:
+                    best = k
+                    best_d2 = d2
+
+            if best >= 0:
+                k = best
+                dt = utime.ticks_diff(stamp, self.stamp[k]) / 1000000
+                px = x[k] + vx[k]*dt
+                py = y[k] + vy[k]*dt
+                rx = zx - px
+                ry = zy - py
+                x[k] = px + alpha*rx
+                y[k] = py + alpha*ry
+                if dt > 0:
+                    vx[k] += beta*rx/dt
+                    vy[k] += beta*ry/dt
+                if hits[k] < 0xFFFF:
+                    hits[k] += 1
+                misses[k] = 0
+            else:
+                # start a new track in a free slot, if there is one
+                for k in range(tracks):
+                    if hits[k] == 0:
+                        break
+                else:
+                    continue
+                x[k] = zx
+                y[k] = zy
+                vx[k] = vy[k] = 0.0
+                hits[k] = 1
+                misses[k] = 0
+            self.stamp[k] = stamp
+            matched[k] = 1
+
+        for k in range(tracks):
+            if hits[k] and not matched[k]:
+                misses[k] += 1
+                if misses[k] > self.max_misses:
+                    hits[k] = 0
+
+
+    def best(self):
+        """!
+        @brief   Find the track to aim at.
+        @returns The index of the track with the most matches of those
+                 which have at least @c min_hits and were matched in the
+                 latest image, or -1 if there is none
+        """
+        best = -1
+        for k in range(len(self.hits)):
+            if self.hits[k] >= self.min_hits and self.misses[k] == 0:
+                if best < 0 or self.hits[k] > self.hits[best]:
+                    best = k
+        return best
+
+
+    def aim(self, at=None):
+        """!
+        @brief   Predict where the best track will be when the gun gets there.
+        @details The prediction is stored in @c aim_x and @c aim_y.
+        @param   at The @c ticks_us() time for which to predict, or @c None
+                 for the time of the track's latest image plus the latency
+                 and the time to move the gun
+        @returns The index of the track aimed at, or -1 if there is none
+        """
+        k = self.best()
+        if k >= 0:
+            if at is None:
+                dt = (self.latency_us + self.move_us) / 1000000
+            else:
+                dt = utime.ticks_diff(at, self.stamp[k]) / 1000000
+            self.aim_x = self.x[k] + self.vx[k]*dt
+            self.aim_y = self.y[k] + self.vy[k]*dt
+        return k
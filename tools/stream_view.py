@@ -0,0 +1,60 @@
+""" Show thermal images streamed by frame_stream.FrameWriter on the host.
+
+Reads frames from a serial port (needs pyserial) or from a capture file and
+prints one status line per frame, optionally with the image as ASCII art:
+
+    python3 tools/stream_view.py /dev/ttyACM0 [--ascii]
+    python3 tools/stream_view.py capture.bin [--ascii]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+from frame_stream import FrameDecoder
+
+WIDTH = 32
+SHADES = " -.:=+*#%@"
+
+def open_source(path):
+    if os.path.isfile(path):
+        return open(path, "rb")
+    import serial
+    return serial.Serial(path, 115200, timeout=0.05)
+
+def ascii_art(values):
+    low, high = min(values), max(values)
+    scale = (len(SHADES) - 1) / (high - low) if high > low else 0.0
+    for start in range(0, len(values), WIDTH):
+        # mirrored, as MLX_Cam.ascii_image() shows it
+        row = values[start:start + WIDTH][::-1]
+        print("".join(SHADES[int((v - low) * scale)] * 2 for v in row))
+
+def main(argv):
+    if not argv:
+        print(__doc__)
+        return 1
+    show = "--ascii" in argv
+    source = open_source(argv[0])
+    decoder = FrameDecoder()
+    frames = 0
+    start = time.monotonic()
+    while True:
+        data = source.read(4096)
+        if not data:
+            if os.path.isfile(argv[0]):
+                break
+            continue
+        for frame in decoder.feed(data):
+            frames += 1
+            rate = frames / max(time.monotonic() - start, 1e-6)
+            print(f"seq {frame.seq:6d}  sp {frame.subpage}  Ta {frame.state.ta + 25:5.1f} C  "
+                  f"min {min(frame.values):6.2f}  max {max(frame.values):6.2f}  "
+                  f"{rate:5.1f} frames/s  dropped {decoder.dropped}")
+            if show:
+                ascii_art(frame.values)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
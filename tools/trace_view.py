@@ -0,0 +1,53 @@
+""" Show the state traces saved by cotask.TaskList.dump_trace() on the host.
+
+The transitions of all the traced tasks are put on one timeline, in seconds
+before the dump was made, and printed in order:
+
+    python3 tools/trace_view.py trace.bin
+
+A task whose oldest transitions were overwritten in its ring buffer starts
+from an unknown state, shown as '?'. State -1 stands for a yield of None
+or of a state which isn't a 16 bit integer.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+from cotask import TICKS_PERIOD, load_trace
+
+def ticks_diff(end, start):
+    half = TICKS_PERIOD >> 1
+    return ((end - start + half) & (TICKS_PERIOD - 1)) - half
+
+def timeline(now, traces):
+    # (time in us relative to the dump, task, from-state, to-state), oldest
+    # first; each task's records are walked back from its latest transition
+    events = []
+    for name, (count, last_time, records) in traces.items():
+        time = -ticks_diff(now, last_time)
+        for k in range(len(records) - 1, -1, -1):
+            dt, state = records[k]
+            if k > 0:
+                from_state = records[k - 1][1]
+            else:
+                from_state = "?" if count > len(records) else 0
+            events.append((time, name, from_state, state))
+            time -= dt
+    events.sort(key=lambda event: event[0])
+    return events
+
+def main(argv):
+    if not argv:
+        print(__doc__)
+        return 1
+    with open(argv[0], "rb") as file:
+        now, traces = load_trace(file.read())
+    for name, (count, last_time, records) in traces.items():
+        print(f"{name}: {count} transitions, {len(records)} kept")
+    for time, name, from_state, state in timeline(now, traces):
+        print(f"{time / 1e6: 12.6f}  {name:<16s}{from_state:>3} -> {state}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))